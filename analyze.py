@@ -0,0 +1,239 @@
+"""Batch analytics over session logs.
+
+Each log is streamed once into columnar NumPy arrays (one entry per key
+event), and the metrics are computed on whole columns:
+    - time spent on each page outside the map trials (instructions etc.)
+    - per trial (map): time shown, moves, moves per second, score gained,
+      and whether the game was covered by the overlay
+    - per session: moves per second while the game was visible vs covered,
+      inter-key intervals between 2048 moves, final score
+
+Sessions are spread over a process pool, one file per task. Logs converted
+with sessionfile.py (.lems) are read column by column without any parsing.
+
+Example:
+    python analyze.py logs/*.jsonl --output summary.json --trials-csv trials.csv
+    python analyze.py logs/*.lems
+
+Requires NumPy (the experiment itself does not).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+import sessionfile
+
+COLUMNS = ("t", "page", "map", "overlay", "move", "score")
+
+
+def _session_info(path, events):
+    info = {"path": path, "start_t": None, "end_t": None, "seed": None, "pages": None}
+    for event in events:
+        kind = event["event"]
+        if kind == "session_start":
+            info["start_t"] = event["t"]
+            info["pages"] = event.get("pages")
+        elif kind == "session_end":
+            info["end_t"] = event["t"]
+        elif kind == "game_start":
+            info["seed"] = event["seed"]
+    return info
+
+
+def _load_lems(path):
+    session = sessionfile.SessionFile(path)
+    flags = session.column("flags")
+    arrays = {
+        "t": session.column("t"),
+        "page": session.column("page"),
+        "map": session.column("map"),
+        "overlay": (flags & sessionfile.OVERLAY) != 0,
+        "move": (flags & sessionfile.MOVE) != 0,
+        "score": session.column("score"),
+    }
+    events = session.events()
+    return _with_switches(arrays, events), _session_info(path, events)
+
+
+def load_session(path):
+    """Key events (and synced step switches) of one log as a dict of equal-length arrays, plus session info.
+
+    t is perf_counter_ns; map is -1 outside the map trials; move marks arrow
+    keys that reached the game, and score is the game score after them
+    (carried forward over other rows).
+    """
+    if path.endswith(".lems"):
+        return _load_lems(path)
+    columns = {name: [] for name in COLUMNS}
+    other = []
+    score = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            if event["event"] == "key":
+                move = "before" in event
+                if move:
+                    score = event["score"]
+                columns["t"].append(event["t"])
+                columns["page"].append(event["page"])
+                columns["map"].append(event["map_index"])
+                columns["overlay"].append(event["overlay"])
+                columns["move"].append(move)
+                columns["score"].append(score)
+            else:
+                other.append(event)
+    arrays = {
+        "t": np.array(columns["t"], dtype=np.int64),
+        "page": np.array(columns["page"], dtype=np.int16),
+        "map": np.array(columns["map"], dtype=np.int16),
+        "overlay": np.array(columns["overlay"], dtype=bool),
+        "move": np.array(columns["move"], dtype=bool),
+        "score": np.array(columns["score"], dtype=np.int64),
+    }
+    return _with_switches(arrays, other), _session_info(path, other)
+
+
+def _with_switches(arrays, events):
+    """Adds the step switches made through the sync service ("sync_step" events) as rows with no move.
+
+    With linked stations a key only asks for a step, and the partner's keys
+    are not in this log at all, so these rows are where the pages change.
+    """
+    switches = [event for event in events if event["event"] == "sync_step" and "page" in event]
+    if not switches:
+        return arrays
+    added = {"t": [e["t"] for e in switches], "page": [e["page"] for e in switches],
+             "map": [e["map_index"] for e in switches], "overlay": [e["overlay"] for e in switches],
+             "move": [False] * len(switches), "score": [0] * len(switches)}
+    order = np.argsort(np.concatenate([arrays["t"], added["t"]]), kind="stable")
+    merged = {name: np.concatenate([arrays[name], np.array(added[name], arrays[name].dtype)])[order]
+              for name in COLUMNS}
+    # A switch carries the score of the key before it
+    from_keys = order < len(arrays["t"])
+    last_key = np.maximum.accumulate(np.where(from_keys, np.arange(len(order)), -1))
+    merged["score"] = np.where(last_key >= 0, merged["score"][np.maximum(last_key, 0)], 0)
+    return merged
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else None
+
+
+def analyze_session(path):
+    """Returns (session summary dict, list of per-trial dicts) for one log."""
+    cols, info = load_session(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    t = cols["t"]
+    start_t = info["start_t"] if info["start_t"] is not None else (t[0] if len(t) else 0)
+    end_t = info["end_t"] if info["end_t"] is not None else (t[-1] if len(t) else start_t)
+
+    # Segments: runs of events showing the same (page, map). The state before
+    # the first key is the welcome page with no map, entered at session start.
+    state = cols["page"].astype(np.int64) * 65536 + (cols["map"].astype(np.int64) + 1)
+    previous = np.concatenate([[0], state[:-1]])  # Page 0, map -1
+    change = state != previous
+    segment = np.concatenate([[0], np.cumsum(change)])  # segment of the gap before each event, then of each event
+    seg_start = np.concatenate([[start_t], t[change]])
+    seg_end = np.concatenate([seg_start[1:], [end_t]])
+    seconds = (seg_end - seg_start) / 1e9
+    seg_page = np.concatenate([[0], cols["page"][change]])
+    seg_map = np.concatenate([[-1], cols["map"][change]])
+    seg_overlay = np.concatenate([[False], cols["overlay"][change]])
+
+    event_segment = segment[1:]
+    n = len(seconds)
+    moves = np.bincount(event_segment, weights=cols["move"], minlength=n).astype(np.int64)
+    score_end = np.zeros(n, dtype=np.int64)
+    last = np.flatnonzero(np.diff(event_segment, append=-1))  # Last event of each segment (segments only grow)
+    score_end[event_segment[last]] = cols["score"][last]
+    score_start = np.concatenate([[0], score_end[:-1]])
+
+    # Time on the pages outside the trials
+    pages = info["pages"]
+    outside = seg_map < 0
+    page_seconds = np.bincount(seg_page[outside], weights=seconds[outside])
+    page_seconds = {(pages[i] if pages and i < len(pages) else str(i)): round(float(s), 3)
+                    for i, s in enumerate(page_seconds) if s > 0}
+
+    # Trials, merged over revisits of the same map (Q back and forth)
+    trial = ~outside
+    trials = []
+    for index in np.unique(seg_map[trial]):
+        mask = trial & (seg_map == index)
+        duration = float(seconds[mask].sum())
+        count = int(moves[mask].sum())
+        trials.append({
+            "session": name, "map": int(index), "overlay": bool(seg_overlay[mask][0]),
+            "visits": int(mask.sum()), "seconds": round(duration, 3), "moves": count,
+            "moves_per_s": round(count / duration, 3) if duration > 0 else None,
+            "score_gained": int((score_end[mask] - score_start[mask]).sum()),
+            "score_end": int(score_end[mask][-1]),
+        })
+
+    def rate(mask):
+        duration = seconds[mask].sum()
+        return round(float(moves[mask].sum() / duration), 3) if duration > 0 else None
+
+    # Inter-key intervals between consecutive moves within the same segment
+    move_t = t[cols["move"]]
+    move_segment = event_segment[cols["move"]]
+    intervals = np.diff(move_t)[np.diff(move_segment) == 0] / 1e6
+
+    session = {
+        "session": name, "seed": info["seed"], "seconds": round((end_t - start_t) / 1e9, 3),
+        "moves": int(cols["move"].sum()), "final_score": int(cols["score"][-1]) if len(t) else 0,
+        "moves_per_s_visible": rate(trial & ~seg_overlay),
+        "moves_per_s_covered": rate(trial & seg_overlay),
+        "interkey_ms": {"count": len(intervals), "mean": float(intervals.mean()) if len(intervals) else None,
+                        "p50": _percentile(intervals, 50), "p90": _percentile(intervals, 90)},
+        "page_seconds": page_seconds,
+        "score_by_trial": [trial_row["score_end"] for trial_row in trials],
+    }
+    return session, trials
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise session logs")
+    parser.add_argument("logs", nargs="+", help="session .jsonl or .lems files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="write the summary JSON here instead of stdout")
+    parser.add_argument("--trials-csv", help="also write one row per session and map to this CSV")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    sessions = []
+    trials = []
+    with Pool(min(args.workers, len(args.logs))) as pool:
+        chunk = max(1, len(args.logs) // (args.workers * 8))
+        for session, session_trials in pool.imap(analyze_session, args.logs, chunksize=chunk):
+            sessions.append(session)
+            trials.extend(session_trials)
+            print(f"\r{len(sessions)}/{len(args.logs)} sessions", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+    if args.trials_csv:
+        fields = ("session", "map", "overlay", "visits", "seconds", "moves", "moves_per_s", "score_gained", "score_end")
+        with open(args.trials_csv, "w") as f:
+            f.write(",".join(fields) + "\n")
+            f.writelines(",".join("" if row[k] is None else str(row[k]) for k in fields) + "\n" for row in trials)
+
+    summary = {
+        "sessions": sessions,
+        "trials": trials,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    text = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
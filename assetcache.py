@@ -0,0 +1,182 @@
+"""Offline compilation of stimulus images into a pre-scaled, memory-mappable cache.
+
+Decoding a big PNG and scaling it to the screen is the slow part of showing a
+map. This step does both ahead of time for a given display: every asset is
+scaled to fit each target size and stored as raw premultiplied ARGB32 pixels
+(the format QPixmap uses natively), so at run time a stimulus is an mmap and
+one copy out of it (the QImage outlives the mapping and crosses threads, so it
+has to own its pixels), with no PNG inflate and no resample.
+
+Build the cache for the sizes the stimuli are shown at, e.g. for the default
+1000x600 window:
+    python assetcache.py --size 486x578 --size 1000x600
+
+Entries are keyed by the source file's SHA-256, so editing an image and
+rebuilding replaces exactly the entries for that image. At run time the
+source is hashed again and the app falls back to the PNG if it no longer
+matches the manifest. Each source is hashed once per run (and again if its
+size or mtime changes), so copying or checking out the files, which changes
+mtimes but not contents, keeps the cache valid.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+
+from PyQt6 import sip
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+
+CACHE_FOLDER = "asset_cache"
+MANIFEST_NAME = "manifest.json"
+IMAGE_FORMAT = QImage.Format.Format_ARGB32_Premultiplied
+DEFAULT_ASSETS = ["maps/*.png", "maps/*.jpg", "2048_image.png",
+                  "welcome.png", "instructions.png", "map_task.png", "game_task.png"]
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def entry_key(path, width, height, dpr):
+    return f"{os.path.normpath(path)}|{width}x{height}@{dpr:g}"
+
+
+def _read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def build(paths, sizes, dpr=1.0, folder=CACHE_FOLDER):
+    """Compiles every path at every (width, height) target size.
+
+    Returns the number of cache files written (unchanged entries are skipped).
+    """
+    os.makedirs(folder, exist_ok=True)
+    old = _read_manifest(folder)
+    manifest = {}
+    written = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        source = None
+        for width, height in sizes:
+            key = entry_key(path, width, height, dpr)
+            entry = old.get(key)
+            if entry and entry["sha256"] == digest and os.path.exists(os.path.join(folder, entry["file"])):
+                manifest[key] = entry
+                continue
+            if source is None:
+                source = QImage.fromData(data)
+                if source.isNull():
+                    raise ValueError(f"could not decode {path}")
+            image = source.scaled(round(width * dpr), round(height * dpr), Qt.AspectRatioMode.KeepAspectRatio,
+                                  Qt.TransformationMode.SmoothTransformation).convertToFormat(IMAGE_FORMAT)
+            name = f"{digest[:16]}_{width}x{height}@{dpr:g}.argb"
+            bits = image.constBits()
+            bits.setsize(image.sizeInBytes())
+            with open(os.path.join(folder, name), "wb") as f:
+                f.write(bytes(bits))
+            manifest[key] = {
+                "source": os.path.normpath(path), "sha256": digest, "file": name, "width": image.width(), "height": image.height(),
+                "bytes_per_line": image.bytesPerLine(), "dpr": dpr,
+            }
+            written += 1
+
+    # Keep entries for other sizes/ dprs of sources that still exist unchanged
+    digests = {}
+    for key, entry in old.items():
+        if key not in manifest and os.path.exists(entry["source"]):
+            if entry["source"] not in digests:
+                digests[entry["source"]] = file_digest(entry["source"])
+            if digests[entry["source"]] == entry["sha256"]:
+                manifest[key] = entry
+
+    used = {entry["file"] for entry in manifest.values()}
+    for name in os.listdir(folder):
+        if name.endswith(".argb") and name not in used:
+            os.remove(os.path.join(folder, name))
+    _write_manifest(folder, manifest)
+    return written
+
+
+class CompiledAssets:
+    """Read-only view of a compiled cache; safe to share with worker threads."""
+
+    def __init__(self, folder=CACHE_FOLDER):
+        self.folder = folder
+        self.manifest = _read_manifest(folder)
+        self.digests = {}  # path -> (size, mtime_ns, sha256) of the sources hashed so far
+
+    def digest(self, path):
+        """SHA-256 of path, hashed again only if its size or mtime changed since the last call."""
+        stat = os.stat(path)
+        known = self.digests.get(path)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        digest = file_digest(path)
+        self.digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def lookup(self, path, width, height, dpr):
+        """Manifest entry for path at this target size, or None if missing or stale."""
+        entry = self.manifest.get(entry_key(path, width, height, dpr))
+        if entry is None:
+            return None
+        try:
+            digest = self.digest(path)
+        except OSError:
+            return None
+        if digest != entry["sha256"]:
+            return None
+        return entry
+
+    def load_image(self, path, width, height, dpr):
+        """Pre-scaled QImage from the cache, or None if it has to come from the source."""
+        entry = self.lookup(path, width, height, dpr)
+        if entry is None:
+            return None
+        try:
+            with open(os.path.join(self.folder, entry["file"]), "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                image = QImage(sip.voidptr(mm), entry["width"], entry["height"], entry["bytes_per_line"], IMAGE_FORMAT)
+                return image.copy()  # Detach from the mapping before it closes
+        except (OSError, ValueError):
+            return None
+
+
+def _parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-scale stimulus images for a target display")
+    parser.add_argument("--size", type=_parse_size, action="append", required=True,
+                        help="target box WIDTHxHEIGHT in logical pixels (repeatable)")
+    parser.add_argument("--dpr", type=float, default=1.0, help="device pixel ratio of the target display")
+    parser.add_argument("--folder", default=CACHE_FOLDER)
+    parser.add_argument("assets", nargs="*", help="image files (default: maps and instruction images)")
+    args = parser.parse_args(argv)
+
+    paths = args.assets or sorted(p for pattern in DEFAULT_ASSETS for p in glob.glob(pattern))
+    written = build(paths, args.size, args.dpr, args.folder)
+    print(f"{len(paths)} assets x {len(args.size)} sizes, {written} files written to {args.folder}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Vectorized 2048 simulator that advances many boards per call with NumPy.
+
+Boards are held as a uint64 array in the same packed layout as bitboard.py,
+and moves go through the same row tables, so the rules match Grid exactly.
+Up/down moves work on the transposed boards, so each step is a handful of
+whole-array operations no matter how the moves are mixed.
+
+Requires NumPy (the GUI does not).
+"""
+from collections import namedtuple
+
+import numpy as np
+
+import bitboard
+
+LEFT, RIGHT, UP, DOWN = range(4)  # move codes, in bitboard.DIRECTIONS order
+
+_ROWS = np.arange(65536, dtype=np.uint32)
+_REVERSE = (((_ROWS >> 12) & 0xF) | ((_ROWS >> 4) & 0xF0)
+            | ((_ROWS << 4) & 0xF00) | ((_ROWS << 12) & 0xF000)).astype(np.uint16)
+_SCORE = np.array(bitboard.SCORE_TABLE, dtype=np.int64)
+# Left table followed by right table, so one gather handles both directions
+_ROW_TABLE = np.concatenate([np.array(bitboard.LEFT_TABLE, dtype=np.uint16),
+                             np.array(bitboard.RIGHT_TABLE, dtype=np.uint16)])
+_ROW_SCORE = np.concatenate([_SCORE, _SCORE[_REVERSE]])
+
+StepResult = namedtuple("StepResult", ["changed", "score", "max_tile", "terminal"])
+
+
+def _u64(x):
+    return np.uint64(x)
+
+
+def transpose(boards):
+    """Vectorized bitboard.transpose."""
+    a1 = boards & _u64(0xF0F00F0FF0F00F0F)
+    a2 = boards & _u64(0x0000F0F00000F0F0)
+    a3 = boards & _u64(0x0F0F00000F0F0000)
+    a = a1 | (a2 << _u64(12)) | (a3 >> _u64(12))
+    b1 = a & _u64(0xFF00FF0000FF00FF)
+    b2 = a & _u64(0x00FF00FF00000000)
+    b3 = a & _u64(0x00000000FF00FF00)
+    return b1 | (b2 >> _u64(24)) | (b3 << _u64(24))
+
+
+def _rows(boards):
+    # (N, 4) uint16 view of the rows; row 0 is the low 16 bits
+    return boards.astype("<u8", copy=False).view("<u2").reshape(-1, 4)
+
+
+def _from_rows(rows):
+    return rows.astype("<u2", copy=False).reshape(-1).view("<u8").astype(np.uint64, copy=False)
+
+
+def cells(boards):
+    """(16, N) array of tile exponents, cell (i, j) in row 4 * i + j.
+
+    Cell-major so that per-board reductions run across boards, which NumPy
+    does far faster than reducing 16-element rows.
+    """
+    b = np.ascontiguousarray(boards.astype("<u8", copy=False).view(np.uint8).reshape(-1, 8).T)
+    return np.stack([b & 0xF, b >> 4], axis=1).reshape(16, -1)
+
+
+def move(boards, moves):
+    """Applies one move per board.
+
+    moves is an int array of move codes (LEFT, RIGHT, UP, DOWN).
+    Returns (new_boards, gained_score).
+    """
+    moves = np.asarray(moves)
+    vertical = moves >= UP
+    reverse = (moves == RIGHT) | (moves == DOWN)
+
+    b = np.where(vertical, transpose(boards), boards)
+    index = _rows(b) + (reverse.astype(np.int32) << 16)[:, None]
+    gained = _ROW_SCORE[index].sum(axis=1)
+    b = _from_rows(_ROW_TABLE[index])
+    return np.where(vertical, transpose(b), b), gained
+
+
+def spawn(boards, rng, mask=None, exponents=None):
+    """Adds a 2 (90%) or a 4 (10%) on a random empty cell of each board.
+
+    Only boards where mask is True get a tile; full boards are left alone.
+    exponents can pass in cells(boards) if the caller already has it.
+    """
+    if exponents is None:
+        exponents = cells(boards)
+    empty = exponents == 0
+    count = empty.sum(axis=0, dtype=np.uint8)
+    pick = (rng.random(len(boards)) * count).astype(np.uint8)
+    # The chosen cell is the first one whose running count of empties passes pick
+    index = (np.cumsum(empty, axis=0, dtype=np.uint8) <= pick).sum(axis=0, dtype=np.uint8)
+    exponent = np.where(rng.random(len(boards)) < 0.9, 1, 2).astype(np.uint64)
+    add = count > 0
+    if mask is not None:
+        add &= mask
+    tile = exponent << (index.astype(np.uint64) * _u64(4))
+    return np.where(add, boards | tile, boards)
+
+
+def max_tile(boards, exponents=None):
+    if exponents is None:
+        exponents = cells(boards)
+    exponent = exponents.max(axis=0).astype(np.int64)
+    return np.where(exponent > 0, np.left_shift(1, exponent), 0)
+
+
+def terminal(boards, exponents=None):
+    """True for boards where no direction changes anything."""
+    if exponents is None:
+        exponents = cells(boards)
+    result = (exponents != 0).all(axis=0)
+    # Only full boards can be stuck, and there are usually few of them
+    full = np.flatnonzero(result)
+    if len(full):
+        b = boards[full]
+        n = len(full)
+        stuck = ((move(b, np.full(n, LEFT))[0] == b)
+                 & (move(b, np.full(n, UP))[0] == b))
+        result[full] = stuck
+    return result
+
+
+class BatchGrid:
+    """N independent 4x4 games advanced together.
+
+    Like Grid, a tile is spawned after every move even if nothing moved,
+    unless spawn_on_noop is False.
+    """
+
+    def __init__(self, n, seed=None, spawn_on_noop=True):
+        self.rng = np.random.default_rng(seed)
+        self.spawn_on_noop = spawn_on_noop
+        self.boards = np.zeros(n, dtype=np.uint64)
+        self.scores = np.zeros(n, dtype=np.int64)
+        self.moves = np.zeros(n, dtype=np.int64)
+        self.reset()
+
+    def reset(self, mask=None):
+        """Starts new games on the selected boards (all boards by default)."""
+        if mask is None:
+            mask = np.ones(len(self.boards), dtype=bool)
+        self.boards = np.where(mask, _u64(0), self.boards)
+        self.scores[mask] = 0
+        self.moves[mask] = 0
+        self.boards = spawn(self.boards, self.rng, mask)
+        self.boards = spawn(self.boards, self.rng, mask)
+
+    def step(self, moves):
+        """Applies one move to every board and spawns tiles.
+
+        Returns a StepResult of per-board arrays: changed (the move was not a
+        no-op), score, max_tile and terminal.
+        """
+        new, gained = move(self.boards, moves)
+        changed = new != self.boards
+        spawn_mask = None if self.spawn_on_noop else changed
+        self.boards = spawn(new, self.rng, spawn_mask)
+        self.scores += gained
+        self.moves += 1
+        exponents = cells(self.boards)
+        return StepResult(changed, self.scores.copy(), max_tile(self.boards, exponents),
+                          terminal(self.boards, exponents))
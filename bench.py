@@ -0,0 +1,347 @@
+"""Benchmarks for the 2048 engine, the board and map rendering and startup.
+
+Runs under the offscreen Qt platform, so it works on a headless machine:
+    python bench.py                              # prints results, compares with bench_baseline.json
+    python bench.py --output results.json        # machine-readable results
+    python bench.py --save-baseline              # records this machine's baseline
+    python bench.py --only grid                  # benchmarks whose name starts with "grid"
+
+Every benchmark reports the time of one operation in microseconds (median,
+p95 and min over its rounds). Compared with a baseline, a benchmark whose
+median is more than its threshold slower (THRESHOLDS, or --threshold) is a
+regression and the exit status is 1, so a change to the engine or the UI can
+be judged by numbers. Baselines only mean something on the machine they were
+recorded on; keep one per lab machine.
+
+Benchmarks:
+    grid_move_4x4, grid_move_8x8     Grid.move (slide and spawn)
+    grid_spawn                       Grid.add_random_tile on boards with free cells
+    update_grid_4x4, update_grid_8x8 GameWidget.move's update_grid and the repaint it causes
+    load_map_cold_WxH                MainWindow.load_map until the decoded map is shown
+    load_map_warm_WxH                MainWindow.load_map with the map already cached
+    page_transition                  one SPACE step through the timeline, painted
+    cold_start                       new process until MainWindow's first paint
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import bitboard
+import sizedgrid
+from sizedgrid import make_grid
+
+BASELINE_FILE = "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.25  # Slower by more than this fraction of the baseline is a regression
+THRESHOLDS = {  # Timings that go through the event loop or a new process are noisier
+    "load_map_cold": 0.5,
+    "page_transition": 0.5,
+    "cold_start": 0.5,
+}
+WINDOW_SIZES = ((1000, 600), (1600, 900), (2560, 1440))
+TIMEOUT = 10  # Seconds to wait for background work
+
+
+def _stats(samples):
+    """Summary in microseconds of per-operation times given in nanoseconds."""
+    samples = sorted(samples)
+    return {
+        "unit": "us",
+        "median": round(statistics.median(samples) / 1e3, 3),
+        "p95": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] / 1e3, 3),
+        "min": round(samples[0] / 1e3, 3),
+        "rounds": len(samples),
+    }
+
+
+def _wait(app, done, timeout=TIMEOUT):
+    """Runs the event loop until done() is true."""
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("benchmark timed out waiting for the event loop")
+        app.processEvents()
+
+
+# Engine
+
+def _can_move(grid):
+    if grid.size == bitboard.SIZE:
+        return bitboard.can_move(grid.board)
+    return sizedgrid.can_move(grid.board, grid.size)
+
+
+def bench_grid_move(size, rounds, batch=20):
+    """Time per Grid.move, in short batches so a game that is over gets replaced."""
+    rng = random.Random(1)
+    grid = make_grid(size, seed=1)
+    samples = []
+    for _ in range(rounds * 50):
+        directions = [rng.choice(bitboard.DIRECTIONS) for _ in range(batch)]
+        t = time.perf_counter_ns()
+        for direction in directions:
+            grid.move(direction)
+        samples.append((time.perf_counter_ns() - t) / batch)
+        if not _can_move(grid):
+            grid = make_grid(size, seed=rng.randrange(1 << 32))
+    return _stats(samples)
+
+
+def bench_grid_spawn(rounds, batch=1000):
+    """Time per Grid.add_random_tile; boards are refilled from a few random tiles."""
+    rng = random.Random(2)
+    grid = bitboard.Grid(seed=2)
+    samples = []
+    for _ in range(rounds):
+        boards = [bitboard.from_cells([[rng.choice((0, 0, 2, 4)) for _ in range(4)] for _ in range(4)])
+                  for _ in range(batch)]
+        t = time.perf_counter_ns()
+        for board in boards:
+            grid.board = board
+            grid.add_random_tile()
+        samples.append((time.perf_counter_ns() - t) / batch)
+    return _stats(samples)
+
+
+# Rendering
+
+def bench_update_grid(app, size, rounds):
+    """GameWidget.move's update_grid plus the repaint of the changed cells.
+
+    The slide itself is done beforehand and not timed.
+    """
+    from mainqt import GameWidget
+    rng = random.Random(3)
+    widget = GameWidget(size=size, seed=3)
+    widget.resize(500, 500)
+    widget.show()
+    _wait(app, lambda: widget.shown_cells is not None)
+    samples = []
+    while len(samples) < rounds:
+        if not _can_move(widget.grid):
+            widget.grid = make_grid(size, seed=rng.randrange(1 << 32))
+        before = widget.grid.board
+        widget.grid.move(rng.choice(bitboard.DIRECTIONS))
+        if widget.grid.board == before:
+            continue
+        painted = []
+        widget.painted.connect(lambda: painted.append(True))
+        t = time.perf_counter_ns()
+        widget.update_grid()
+        _wait(app, lambda: painted)
+        samples.append(time.perf_counter_ns() - t)
+        widget.painted.disconnect()
+    widget.close()
+    return _stats(samples)
+
+
+def _window(app, log_folder):
+    """A MainWindow logging to a scratch folder, shown and warmed up."""
+    import mainqt
+    mainqt.LOG_FOLDER = log_folder
+    window = mainqt.MainWindow()
+    window.show()
+    _wait(app, lambda: "warmed_up" in window.profile.marks)
+    return window
+
+
+def bench_load_map(app, window, width, height, rounds):
+    """(cold, warm) load_map timings with the window at width x height."""
+    map_step = next(i for i, step in enumerate(window.timeline.steps) if step.map is not None)
+    window.go_to(map_step)
+    window.resize(width, height)
+    _wait(app, lambda: window.map_label.width() > 0 and window.map_cache.get(window.map_key(window.current_index)))
+    cold = []
+    warm = []
+    for _ in range(rounds):
+        key = window.map_key(window.current_index)
+        window.map_cache.clear()
+        window.shown_map_key = None
+        t = time.perf_counter_ns()
+        window.load_map()
+        _wait(app, lambda: window.map_cache.get(key) is not None and window.map_label.pixmap().cacheKey()
+              == window.map_cache.get(key).cacheKey())
+        cold.append(time.perf_counter_ns() - t)
+        _wait(app, lambda: not window.map_cache.pending)  # Let the preloads finish too
+        t = time.perf_counter_ns()
+        window.load_map()
+        warm.append(time.perf_counter_ns() - t)
+    return _stats(cold), _stats(warm)
+
+
+def bench_page_transition(app, window, rounds):
+    """One SPACE press through the timeline: go_to plus the repaint, with pages and maps preloaded."""
+    window.resize(1000, 600)
+    samples = []
+    step = 0
+    window.go_to(step)
+    while len(samples) < rounds:
+        following = window.timeline.next[step]
+        if following == step:  # End of the timeline, start over
+            following = 0
+        _wait(app, lambda: not window.map_cache.pending)
+        t = time.perf_counter_ns()
+        window.go_to(following)
+        window.repaint()
+        samples.append(time.perf_counter_ns() - t)
+        step = following
+    return _stats(samples)
+
+
+# Startup
+
+def _cold_start_child():
+    """Runs in a new process: launch to first paint of MainWindow, in ns."""
+    start = time.perf_counter_ns()
+    from PyQt6.QtWidgets import QApplication
+    import mainqt
+    app = QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory(prefix="bench_logs_") as logs:
+        mainqt.LOG_FOLDER = logs
+        window = mainqt.MainWindow()
+        window.show()
+        _wait(app, lambda: "first_paint" in window.profile.marks)
+        first_paint = window.profile.marks["first_paint"] - start
+        window.close()  # Closes the log before its folder goes
+    print(json.dumps({"first_paint_ns": first_paint}))
+
+
+def bench_cold_start(rounds):
+    samples = []
+    for _ in range(rounds):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--cold-start-child"],
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.splitlines()[-1])["first_paint_ns"])
+    return _stats(samples)
+
+
+def run(rounds, only=None):
+    """Runs the benchmarks whose name starts with `only` (all if None); name -> stats."""
+    results = {}
+
+    def wanted(name):
+        return only is None or name.startswith(only)
+
+    def record(name, stats):
+        results[name] = stats
+        print(f"{name:28} median {stats['median']:>12.3f} us   p95 {stats['p95']:>12.3f} us", file=sys.stderr)
+
+    for size in (4, 8):
+        if wanted(f"grid_move_{size}x{size}"):
+            record(f"grid_move_{size}x{size}", bench_grid_move(size, rounds))
+    if wanted("grid_spawn"):
+        record("grid_spawn", bench_grid_spawn(rounds))
+
+    qt_names = [f"update_grid_{n}x{n}" for n in (4, 8)] + ["page_transition"]
+    qt_names += [f"load_map_{kind}_{w}x{h}" for w, h in WINDOW_SIZES for kind in ("cold", "warm")]
+    if any(wanted(name) for name in qt_names):
+        from PyQt6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        for size in (4, 8):
+            if wanted(f"update_grid_{size}x{size}"):
+                record(f"update_grid_{size}x{size}", bench_update_grid(app, size, rounds))
+        with tempfile.TemporaryDirectory(prefix="bench_logs_") as logs:
+            window = _window(app, logs)
+            for width, height in WINDOW_SIZES:
+                names = [f"load_map_{kind}_{width}x{height}" for kind in ("cold", "warm")]
+                if any(wanted(name) for name in names):
+                    for name, stats in zip(names, bench_load_map(app, window, width, height, rounds)):
+                        if wanted(name):
+                            record(name, stats)
+            if wanted("page_transition"):
+                record("page_transition", bench_page_transition(app, window, rounds))
+            window.close()  # Closes the log before its folder goes
+
+    if wanted("cold_start"):
+        record("cold_start", bench_cold_start(max(3, rounds // 10)))
+    return results
+
+
+def machine():
+    """What the numbers were measured on."""
+    from PyQt6.QtCore import QT_VERSION_STR
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "qpa": os.environ.get("QT_QPA_PLATFORM"),
+        "compiled_assets": os.path.exists(os.path.join("asset_cache", "manifest.json")),
+    }
+
+
+def threshold(name, default):
+    for prefix, value in THRESHOLDS.items():
+        if name.startswith(prefix):
+            return value
+    return default
+
+
+def compare(results, baseline, default_threshold=DEFAULT_THRESHOLD):
+    """Returns [(name, ratio, threshold, regressed)] for benchmarks in both."""
+    rows = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None or not base["median"]:
+            continue
+        ratio = stats["median"] / base["median"]
+        limit = threshold(name, default_threshold)
+        rows.append((name, ratio, limit, ratio > 1 + limit))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine, rendering, map loading and startup")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--only", help="only run benchmarks whose name starts with this")
+    parser.add_argument("--output", help="write the results as JSON here")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction of the baseline (default 0.25)")
+    parser.add_argument("--cold-start-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.cold_start_child:
+        _cold_start_child()
+        return 0
+
+    results = run(args.rounds, args.only)
+    report = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "machine": machine(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; record one with --save-baseline", file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline["results"], args.threshold)
+    for name, ratio, limit, regressed in rows:
+        status = "REGRESSION" if regressed else "ok"
+        print(f"{name:28} {ratio:6.2f}x baseline (limit {1 + limit:.2f}x)  {status}")
+    regressions = [row for row in rows if row[3]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+"""Bitboard engine for the 2048 game.
+
+The whole 4x4 board is packed into one 64-bit integer. Each cell takes 4 bits
+and holds the tile exponent (0 = empty, 1 = 2, 2 = 4, ... 15 = 32768).
+Cell (i, j) lives at bits 4 * (4 * i + j), so row 0 is the low 16 bits and
+column 0 is the low nibble of every row.
+
+Moves are lookups into 65,536-entry row tables built once at import time.
+Up/down reuse the left/right tables on the transposed board.
+
+This module has no Qt dependency, so it can be used for offline analysis and
+simulation as well as by the GUI.
+"""
+import random
+
+SIZE = 4
+ROW_MASK = 0xFFFF
+NIBBLE_ONES = 0x1111111111111111
+MAX_EXPONENT = 15  # 2 ** 15 = 32768 is the largest tile a nibble can hold
+
+DIRECTIONS = ("left", "right", "up", "down")
+
+
+def _reverse_row(row):
+    return ((row >> 12) & 0xF) | ((row >> 4) & 0xF0) | ((row << 4) & 0xF00) | ((row << 12) & 0xF000)
+
+
+def _slide_line(line, max_exponent=MAX_EXPONENT):
+    """Same rules as the old Grid: compress, merge left to right, compress.
+
+    Tiles of max_exponent do not merge (they would not fit in a cell).
+    Returns the new line and the score gained (sum of the merged tile values).
+    """
+    tiles = [x for x in line if x != 0]
+    merged = []
+    gained = 0
+    i = 0
+    while i < len(tiles):
+        # Two max_exponent tiles (32768 here) cannot merge: the result would not fit in the cell
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1] and tiles[i] < max_exponent:
+            merged.append(tiles[i] + 1)
+            gained += 1 << (tiles[i] + 1)
+            i += 2
+        else:
+            merged.append(tiles[i])
+            i += 1
+    return merged + [0] * (len(line) - len(merged)), gained
+
+
+def _build_tables():
+    left = [0] * 65536
+    right = [0] * 65536
+    score = [0] * 65536
+    for row in range(65536):
+        line = [(row >> (4 * k)) & 0xF for k in range(SIZE)]
+        result, gained = _slide_line(line)
+        packed = result[0] | (result[1] << 4) | (result[2] << 8) | (result[3] << 12)
+        left[row] = packed
+        score[row] = gained
+    for row in range(65536):
+        right[row] = _reverse_row(left[_reverse_row(row)])
+    return left, right, score
+
+
+# LEFT_TABLE[row] is the row after sliding left, RIGHT_TABLE likewise.
+# SCORE_TABLE[row] is the score gained by sliding that row left; right moves
+# look up the reversed row.
+LEFT_TABLE, RIGHT_TABLE, SCORE_TABLE = _build_tables()
+
+
+def transpose(board):
+    """Swap rows and columns of a packed board."""
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _apply_rows(board, table):
+    return (table[board & ROW_MASK]
+            | (table[(board >> 16) & ROW_MASK] << 16)
+            | (table[(board >> 32) & ROW_MASK] << 32)
+            | (table[(board >> 48) & ROW_MASK] << 48))
+
+
+def _row_score(board):
+    return (SCORE_TABLE[board & ROW_MASK]
+            + SCORE_TABLE[(board >> 16) & ROW_MASK]
+            + SCORE_TABLE[(board >> 32) & ROW_MASK]
+            + SCORE_TABLE[(board >> 48) & ROW_MASK])
+
+
+def _reverse_rows(board):
+    return (_reverse_row(board & ROW_MASK)
+            | (_reverse_row((board >> 16) & ROW_MASK) << 16)
+            | (_reverse_row((board >> 32) & ROW_MASK) << 32)
+            | (_reverse_row((board >> 48) & ROW_MASK) << 48))
+
+
+def move_left(board):
+    return _apply_rows(board, LEFT_TABLE)
+
+
+def move_right(board):
+    return _apply_rows(board, RIGHT_TABLE)
+
+
+def move_up(board):
+    return transpose(_apply_rows(transpose(board), LEFT_TABLE))
+
+
+def move_down(board):
+    return transpose(_apply_rows(transpose(board), RIGHT_TABLE))
+
+
+MOVES = {
+    "left": move_left,
+    "right": move_right,
+    "up": move_up,
+    "down": move_down,
+}
+
+
+def move(board, direction):
+    """Returns (new_board, gained_score) for a move in the given direction."""
+    if direction == "left":
+        return move_left(board), _row_score(board)
+    if direction == "right":
+        return move_right(board), _row_score(_reverse_rows(board))
+    if direction == "up":
+        t = transpose(board)
+        return transpose(_apply_rows(t, LEFT_TABLE)), _row_score(t)
+    if direction == "down":
+        t = transpose(board)
+        return transpose(_apply_rows(t, RIGHT_TABLE)), _row_score(_reverse_rows(t))
+    raise ValueError(f"unknown direction: {direction!r}")
+
+
+def _line_paths(line, max_exponent=MAX_EXPONENT):
+    """Where every tile of line goes when it slides left, following _slide_line.
+
+    Returns (from, to, merged) index triples; both tiles of a merge have merged set.
+    """
+    positions = [k for k, x in enumerate(line) if x != 0]
+    paths = []
+    out = 0
+    i = 0
+    while i < len(positions):
+        a = positions[i]
+        if i + 1 < len(positions) and line[a] == line[positions[i + 1]] and line[a] < max_exponent:
+            paths.append((a, out, True))
+            paths.append((positions[i + 1], out, True))
+            i += 2
+        else:
+            paths.append((a, out, False))
+            i += 1
+        out += 1
+    return tuple(paths)
+
+
+_ROW_PATHS = {}  # row -> _line_paths of the row, filled in as rows are seen
+
+
+def row_paths(row):
+    paths = _ROW_PATHS.get(row)
+    if paths is None:
+        paths = _ROW_PATHS[row] = _line_paths([(row >> (4 * k)) & 0xF for k in range(SIZE)])
+    return paths
+
+
+def paths(board, direction):
+    """Tile trajectories of a move: [((row, col) from, (row, col) to, merged)].
+
+    One table lookup per row, like the move itself. Tiles that merge both
+    end on the same cell with merged set; tiles that stay put are included.
+    """
+    vertical = direction == "up" or direction == "down"
+    reverse = direction == "right" or direction == "down"
+    if vertical:
+        board = transpose(board)
+    last = SIZE - 1
+    result = []
+    for i in range(SIZE):
+        row = (board >> (16 * i)) & ROW_MASK
+        for a, d, merged in row_paths(_reverse_row(row) if reverse else row):
+            if reverse:
+                a, d = last - a, last - d
+            result.append(((a, i), (d, i), merged) if vertical else ((i, a), (i, d), merged))
+    return result
+
+
+def mirror(board):
+    """Reverses every row (swaps left and right)."""
+    return _reverse_rows(board)
+
+
+def flip(board):
+    """Reverses the order of the rows (swaps up and down)."""
+    return ((board >> 48) | ((board >> 16) & 0xFFFF0000)
+            | ((board << 16) & 0xFFFF00000000) | ((board << 48) & 0xFFFF000000000000))
+
+
+_TRANSPOSED = {"left": "up", "right": "down", "up": "left", "down": "right"}
+_MIRRORED = {"left": "right", "right": "left", "up": "up", "down": "down"}
+_FLIPPED = {"left": "left", "right": "right", "up": "down", "down": "up"}
+
+
+def canonical(board):
+    """Smallest of the 8 rotations/ reflections of board.
+
+    Returns (canonical_board, directions) where directions maps a move on
+    board to the equivalent move on canonical_board. The rules and the spawn
+    odds are the same under every symmetry, so anything computed for the
+    canonical board carries over.
+    """
+    best = None
+    for t in (False, True):
+        b1 = transpose(board) if t else board
+        for m in (False, True):
+            b2 = mirror(b1) if m else b1
+            for f in (False, True):
+                b3 = flip(b2) if f else b2
+                if best is None or b3 < best[0]:
+                    best = (b3, t, m, f)
+    board, t, m, f = best
+    directions = {}
+    for d in DIRECTIONS:
+        e = _TRANSPOSED[d] if t else d
+        e = _MIRRORED[e] if m else e
+        directions[d] = _FLIPPED[e] if f else e
+    return board, directions
+
+
+def empty_mask(board):
+    """Returns a mask with the low bit of every empty nibble set."""
+    x = board | (board >> 2)
+    x |= x >> 1
+    return ~x & NIBBLE_ONES
+
+
+def count_empty(board):
+    return empty_mask(board).bit_count()
+
+
+def spawn_tile(board, rng=random):
+    """Adds a 2 (90%) or a 4 (10%) on a random empty cell.
+
+    Draws from rng in the same order as the old list-based Grid
+    (cell first, then value), so a seeded rng gives the same games.
+    Returns (new_board, cell_index, exponent); cell_index is -1 when the board
+    is full and nothing was added.
+    """
+    mask = empty_mask(board)
+    count = mask.bit_count()
+    if count == 0:
+        return board, -1, 0
+    for _ in range(rng.randrange(count)):
+        mask &= mask - 1
+    shift = (mask & -mask).bit_length() - 1
+    exponent = 1 if rng.random() < 0.9 else 2
+    return board | (exponent << shift), shift >> 2, exponent
+
+
+def play(board, direction, rng=random):
+    """One key press as the GUI plays it: slide, then spawn a tile.
+
+    A tile is spawned even if nothing moved, like the old Grid did. The old
+    Grid also spawned on the transposed board for up/down, so empty cells are
+    enumerated column by column there; keeping that order means a seeded rng
+    still replays old games exactly.
+    Returns (new_board, gained_score, cell_index, exponent).
+    """
+    board, gained = move(board, direction)
+    if direction == "up" or direction == "down":
+        board, index, exponent = spawn_tile(transpose(board), rng)
+        board = transpose(board)
+        if index >= 0:
+            index = (index % SIZE) * SIZE + index // SIZE
+        return board, gained, index, exponent
+    board, index, exponent = spawn_tile(board, rng)
+    return board, gained, index, exponent
+
+
+def can_move(board):
+    """True if at least one direction changes the board."""
+    if empty_mask(board):
+        return True
+    return move_left(board) != board or move_up(board) != board
+
+
+def max_exponent(board):
+    best = 0
+    while board:
+        best = max(best, board & 0xF)
+        board >>= 4
+    return best
+
+
+def max_tile(board):
+    exponent = max_exponent(board)
+    return 1 << exponent if exponent else 0
+
+
+def to_cells(board):
+    """Unpacks a board into the list-of-lists of tile values the GUI uses."""
+    cells = []
+    for i in range(SIZE):
+        row = []
+        for j in range(SIZE):
+            exponent = (board >> (4 * (SIZE * i + j))) & 0xF
+            row.append(1 << exponent if exponent else 0)
+        cells.append(row)
+    return cells
+
+
+def from_cells(cells):
+    """Packs a list-of-lists of tile values into a board."""
+    board = 0
+    for i in range(SIZE):
+        for j in range(SIZE):
+            value = cells[i][j]
+            if value:
+                board |= (value.bit_length() - 1) << (4 * (SIZE * i + j))
+    return board
+
+
+class Grid:
+    """4x4 2048 board backed by a packed 64-bit integer.
+
+    Keeps the API of the old list-of-lists Grid (move_left/right/up/down,
+    add_random_tile and cells) so GameWidget works unchanged.
+
+    Spawns come from the game's own random.Random(seed), so a game is fully
+    determined by its seed and key sequence (see replay.py). The seed is
+    picked at random when none is given.
+    """
+
+    def __init__(self, size=4, seed=None):
+        if size != SIZE:
+            raise ValueError(f"the bitboard engine only supports {SIZE}x{SIZE} boards")
+        self.size = size
+        self.seed = random.randrange(1 << 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.board = 0
+        self.score = 0
+        self.last_spawn = None  # (row, col, value) of the most recent tile added
+        self.add_random_tile()
+        self.add_random_tile()
+
+    @property
+    def cells(self):
+        """A fresh list-of-lists copy of the board; editing it does not change the game.
+
+        Assigning a whole board (grid.cells = rows) is the only way to write
+        cells, unlike the old Grid, whose cells could be edited in place.
+        """
+        return to_cells(self.board)
+
+    @cells.setter
+    def cells(self, cells):
+        self.board = from_cells(cells)
+
+    def generate_empty_grid(self):
+        return [[0] * self.size for _ in range(self.size)]
+
+    def _set_spawn(self, index, exponent):
+        self.last_spawn = (index // SIZE, index % SIZE, 1 << exponent) if index >= 0 else None
+
+    def add_random_tile(self):
+        self.board, index, exponent = spawn_tile(self.board, self.rng)
+        self._set_spawn(index, exponent)
+
+    def move(self, direction):
+        self.board, gained, index, exponent = play(self.board, direction, self.rng)
+        self.score += gained
+        self._set_spawn(index, exponent)
+
+    def move_left(self):
+        self.move("left")
+
+    def move_right(self):
+        self.move("right")
+
+    def move_up(self):
+        self.move("up")
+
+    def move_down(self):
+        self.move("down")
@@ -0,0 +1,121 @@
+"""Persistent on-disk cache of expectimax move values.
+
+A fixed-size open-addressing hash table in one file, accessed through
+numpy.memmap, so opening a cache of millions of positions costs nothing and a
+lookup touches one or two pages. Each record holds a canonical board (see
+bitboard.canonical), the search depth and the expected value of each
+direction (NaN for a direction that changes nothing). The scorer settings
+that affect the values are stored in the header, and opening a cache with
+different settings is an error rather than a silent mix.
+
+The table doubles (into a new file that replaces the old one) when it gets
+more than MAX_LOAD full. Only one process should write a cache at a time.
+
+Requires NumPy.
+"""
+import math
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"EVC1"
+HEADER = struct.Struct("<4sQQdB")  # magic, capacity, count, prob_cutoff, noop_spawns
+HEADER_SIZE = 64
+RECORD = np.dtype([("board", "<u8"), ("depth", "<u8"), ("values", "<f8", (4,))])
+MAX_LOAD = 0.5
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+class EvalCache:
+    def __init__(self, path, prob_cutoff, noop_spawns, capacity=1 << 16):
+        self.path = path
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                magic, capacity, count, cutoff, noop = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an evaluation cache")
+            if (cutoff, bool(noop)) != (prob_cutoff, noop_spawns):
+                raise ValueError(f"{path} was built with prob_cutoff={cutoff}, noop_spawns={bool(noop)}")
+        else:
+            capacity = 1 << max(4, (capacity - 1).bit_length())
+            count = 0
+            _create(path, capacity, prob_cutoff, noop_spawns)
+        self.prob_cutoff = prob_cutoff
+        self.noop_spawns = noop_spawns
+        self.count = count
+        self._open(capacity)
+
+    def _open(self, capacity):
+        self.capacity = capacity
+        self._bits = capacity.bit_length() - 1
+        self.records = np.memmap(self.path, RECORD, "r+", offset=HEADER_SIZE, shape=(capacity,))
+        self._boards = self.records["board"]
+        self._depths = self.records["depth"]
+        self._values = self.records["values"]
+
+    def _slot(self, board, depth):
+        return (((board ^ (depth << 58)) * _MULTIPLIER) & _MASK) >> (64 - self._bits)
+
+    def _find(self, board, depth):
+        """Slot holding (board, depth), or the empty slot where it would go."""
+        mask = self.capacity - 1
+        slot = self._slot(board, depth)
+        while True:
+            d = int(self._depths[slot])
+            if d == 0 or (d == depth and int(self._boards[slot]) == board):
+                return slot
+            slot = (slot + 1) & mask
+
+    def get(self, board, depth):
+        """Tuple of 4 values (None for no-op directions), or None if not cached."""
+        slot = self._find(board, depth)
+        if self._depths[slot] == 0:
+            return None
+        return tuple(None if math.isnan(v) else v for v in self._values[slot].tolist())
+
+    def __contains__(self, key):
+        board, depth = key
+        return self._depths[self._find(board, depth)] != 0
+
+    def put(self, board, depth, values):
+        """Stores the 4 direction values (None for no-op) of a canonical board."""
+        if depth <= 0:
+            raise ValueError("depth must be at least 1")
+        slot = self._find(board, depth)
+        if self._depths[slot] == 0:
+            if self.count + 1 > self.capacity * MAX_LOAD:
+                self._grow()
+                slot = self._find(board, depth)
+            self.count += 1
+        self._boards[slot] = board
+        self._depths[slot] = depth
+        self._values[slot] = [math.nan if v is None else v for v in values]
+
+    def _grow(self):
+        used = self.records[self._depths != 0].copy()
+        self.records.flush()
+        del self.records, self._boards, self._depths, self._values
+        tmp = self.path + ".tmp"
+        _create(tmp, self.capacity * 2, self.prob_cutoff, self.noop_spawns)
+        os.replace(tmp, self.path)
+        self._open(self.capacity * 2)
+        for record in used:
+            slot = self._find(int(record["board"]), int(record["depth"]))
+            self.records[slot] = record
+
+    def flush(self):
+        self.records.flush()
+        with open(self.path, "r+b") as f:
+            f.write(HEADER.pack(MAGIC, self.capacity, self.count, self.prob_cutoff, self.noop_spawns))
+
+    def close(self):
+        self.flush()
+        del self.records, self._boards, self._depths, self._values
+
+
+def _create(path, capacity, prob_cutoff, noop_spawns):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, capacity, 0, prob_cutoff, noop_spawns).ljust(HEADER_SIZE, b"\0"))
+        f.truncate(HEADER_SIZE + capacity * RECORD.itemsize)
@@ -0,0 +1,107 @@
+"""Session event log written from a background thread.
+
+The GUI thread only puts events on an in-memory queue; a writer thread pulls
+them off and appends them to a JSON-lines file in batches. Each line is one
+event dict with at least "event" and "t" (time.perf_counter_ns() when the
+event happened). Boards are logged as packed bitboard integers (see
+bitboard.py), which keeps lines short.
+
+close() (also run at interpreter exit) waits for the writer to drain the
+queue, so closing the experiment mid-session does not lose events.
+
+EventLog appends, so every session needs a file of its own: unique_path()
+claims one even when several sessions start within the same second.
+"""
+import atexit
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+def unique_path(path):
+    """path, or path with _2, _3, ... before the extension if that is taken.
+
+    The file is created (empty) to claim it, so two sessions, even in
+    different processes, never get the same name.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    base, extension = os.path.splitext(path)
+    for n in itertools.count(1):
+        candidate = path if n == 1 else f"{base}_{n}{extension}"
+        try:
+            with open(candidate, "x", encoding="utf-8"):
+                return candidate
+        except FileExistsError:
+            continue
+
+
+class EventLog:
+    def __init__(self, path, batch_size=256, flush_interval=0.5):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="EventLog writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, event, t=None, **fields):
+        """Queues one event. Never blocks on disk I/O."""
+        if self._closed:
+            return
+        self._queue.put({"event": event, "t": time.perf_counter_ns() if t is None else t, **fields})
+
+    def close(self):
+        """Flushes everything still queued and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _write(self, batch):
+        self._file.write("".join(json.dumps(item, separators=(",", ":")) + "\n" for item in batch))
+        self._file.flush()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+        # Drain anything queued before close() was called
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self._write(batch)
+        self._file.close()
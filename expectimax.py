@@ -0,0 +1,188 @@
+"""Expectimax move scorer for grading logged 2048 moves.
+
+Searches a few moves ahead over the bitboard engine. Chance nodes average over
+every empty cell and both spawn values (2 at 90%, 4 at 10%, the same odds as
+Grid.add_random_tile). Leaves are scored with a row heuristic that is
+precomputed for all 65,536 rows, so a leaf costs eight table lookups.
+
+Two things keep each position in the millisecond range:
+- a bounded LRU transposition table shared by all searches of a scorer
+- probability-cutoff pruning: branches whose probability of being reached
+  drops below prob_cutoff are scored with the heuristic instead of searched
+
+Values are in heuristic units plus the game score gained along the way, so
+they are only meaningful relative to each other for the same position.
+"""
+from collections import OrderedDict, namedtuple
+
+import bitboard
+from bitboard import DIRECTIONS, ROW_MASK, transpose, empty_mask, can_move
+
+# Heuristic weights (empty cells, merge chances, monotonic rows, big tiles)
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+MoveGrade = namedtuple("MoveGrade", ["chosen", "best", "chosen_value", "best_value", "loss", "rank", "values"])
+
+
+def _row_heuristic(row):
+    line = [(row >> (4 * k)) & 0xF for k in range(4)]
+    total = 0.0
+    empty = 0
+    merges = 0
+    prev = 0
+    counter = 0
+    for rank in line:
+        total += rank ** SUM_POWER
+        if rank == 0:
+            empty += 1
+        else:
+            if prev == rank:
+                counter += 1
+            elif counter > 0:
+                merges += 1 + counter
+                counter = 0
+            prev = rank
+    if counter > 0:
+        merges += 1 + counter
+
+    mono_left = 0.0
+    mono_right = 0.0
+    for k in range(1, 4):
+        a = line[k - 1] ** MONOTONICITY_POWER
+        b = line[k] ** MONOTONICITY_POWER
+        if line[k - 1] > line[k]:
+            mono_left += a - b
+        else:
+            mono_right += b - a
+
+    return (LOST_PENALTY + EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges
+            - MONOTONICITY_WEIGHT * min(mono_left, mono_right) - SUM_WEIGHT * total)
+
+
+HEURISTIC_TABLE = [_row_heuristic(row) for row in range(65536)]
+
+
+def heuristic(board):
+    """Static evaluation of a board: every row plus every column."""
+    t = transpose(board)
+    h = HEURISTIC_TABLE
+    return (h[board & ROW_MASK] + h[(board >> 16) & ROW_MASK]
+            + h[(board >> 32) & ROW_MASK] + h[(board >> 48) & ROW_MASK]
+            + h[t & ROW_MASK] + h[(t >> 16) & ROW_MASK]
+            + h[(t >> 32) & ROW_MASK] + h[(t >> 48) & ROW_MASK])
+
+
+class MoveScorer:
+    """Depth-limited expectimax with a transposition table.
+
+    depth is the number of moves searched ahead (including the one being
+    graded). Like Grid, a key press that moves nothing still spawns a tile
+    (if there is room), so no-op moves are searched too unless noop_spawns
+    is False.
+    """
+
+    def __init__(self, depth=2, prob_cutoff=1e-3, table_size=1_000_000, noop_spawns=True):
+        self.depth = depth
+        self.prob_cutoff = prob_cutoff
+        self.table_size = table_size
+        self.noop_spawns = noop_spawns
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _skips(self, board, new):
+        # A no-op only counts as a move if it still spawns a tile
+        return new == board and not (self.noop_spawns and empty_mask(board))
+
+    def _max(self, board, depth, prob):
+        if not can_move(board):
+            return 0.0
+        best = 0.0
+        for direction in DIRECTIONS:
+            new, gained = bitboard.move(board, direction)
+            if self._skips(board, new):
+                continue
+            value = gained + self._chance(new, depth - 1, prob)
+            if value > best:
+                best = value
+        return best
+
+    def _chance(self, board, depth, prob):
+        if depth <= 0 or prob < self.prob_cutoff:
+            return heuristic(board)
+
+        key = (board << 4) | depth
+        table = self.table
+        value = table.get(key)
+        if value is not None:
+            table.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        mask = empty_mask(board)
+        count = mask.bit_count()
+        if count == 0:
+            # Full board: the spawn is skipped and the next move follows directly
+            value = self._max(board, depth, prob)
+        else:
+            p2 = prob * 0.9 / count
+            p4 = prob * 0.1 / count
+            total = 0.0
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                total += 0.9 * self._max(board | low, depth, p2)
+                total += 0.1 * self._max(board | (low << 1), depth, p4)
+            value = total / count
+
+        table[key] = value
+        if len(table) > self.table_size:
+            table.popitem(last=False)
+        return value
+
+    def evaluate(self, board):
+        """Returns {direction: expected value} for a packed board.
+
+        Directions that change nothing (no slide and no spawn) map to None.
+        """
+        values = {}
+        for direction in DIRECTIONS:
+            new, gained = bitboard.move(board, direction)
+            if self._skips(board, new):
+                values[direction] = None
+            else:
+                values[direction] = gained + self._chance(new, self.depth - 1, 1.0)
+        return values
+
+    def best_move(self, board):
+        values = self.evaluate(board)
+        return max((d for d in DIRECTIONS if values[d] is not None), key=values.get, default=None)
+
+    def grade(self, board, direction):
+        """Grades one move made on board (packed int or list-of-lists cells).
+
+        rank is 1 for the best move; loss is how much expected value the move
+        gave up compared with the best one. Both are None for a key press that
+        changed nothing.
+        """
+        if isinstance(board, list):
+            board = bitboard.from_cells(board)
+        values = self.evaluate(board)
+        ranked = sorted((d for d in DIRECTIONS if values[d] is not None), key=values.get, reverse=True)
+        best = ranked[0] if ranked else None
+        chosen_value = values[direction]
+        best_value = values[best] if best else None
+        if chosen_value is None:
+            loss = None
+            rank = None
+        else:
+            loss = best_value - chosen_value
+            rank = 1 + sum(1 for d in ranked if values[d] > chosen_value)
+        return MoveGrade(direction, best, chosen_value, best_value, loss, rank, values)
@@ -0,0 +1,129 @@
+"""Grades every logged 2048 move of a corpus of sessions with expectimax.
+
+Each (board, move) pair is looked up by its canonical board (the smallest of
+its 8 rotations/ reflections, see bitboard.canonical) in a persistent
+evaluation cache (evalcache.py). Only positions that have never been scored
+at this depth are searched, spread over a process pool, and the results are
+added to the cache, so re-runs and new sessions only pay for new positions.
+Early positions repeat a lot across participants, and symmetry folds
+mirrored openings together too.
+
+Example:
+    python gradecorpus.py logs/*.jsonl --depth 2 --output grades.csv
+
+Requires NumPy (for the cache).
+"""
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import bitboard
+from bitboard import DIRECTIONS
+from evalcache import EvalCache
+from expectimax import MoveScorer
+from replay import read_session
+
+DEFAULT_CACHE = os.path.join("eval_cache", "expectimax.evc")
+
+_scorer = None
+
+
+def _init_worker(depth, prob_cutoff, noop_spawns):
+    global _scorer
+    _scorer = MoveScorer(depth=depth, prob_cutoff=prob_cutoff, noop_spawns=noop_spawns)
+
+
+def _evaluate_chunk(boards):
+    results = []
+    for board in boards:
+        values = _scorer.evaluate(board)
+        results.append((board, tuple(values[d] for d in DIRECTIONS)))
+    return results
+
+
+def collect_moves(paths):
+    """(session, move number, board before, direction) for every logged 4x4 move.
+
+    The scorer only handles 4x4 boards, so sessions with other sizes are skipped.
+    """
+    moves = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        start, events = read_session(path)
+        if start is not None and start.get("size", bitboard.SIZE) != bitboard.SIZE:
+            print(f"{path}: skipped, {start['size']}x{start['size']} board", file=sys.stderr)
+            continue
+        moves.extend((name, i, event["before"], event["key"]) for i, event in enumerate(events))
+    return moves
+
+
+def grade(values, direction):
+    """(best, loss, rank) for a move given the 4 direction values, like MoveScorer.grade."""
+    by_direction = dict(zip(DIRECTIONS, values))
+    ranked = sorted((d for d in DIRECTIONS if by_direction[d] is not None), key=by_direction.get, reverse=True)
+    best = ranked[0] if ranked else None
+    chosen = by_direction[direction]
+    if chosen is None:
+        return best, None, None
+    return best, by_direction[best] - chosen, 1 + sum(1 for d in ranked if by_direction[d] > chosen)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade logged 2048 moves with a persistent evaluation cache")
+    parser.add_argument("logs", nargs="+", help="session .jsonl files")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--prob-cutoff", type=float, default=1e-3)
+    parser.add_argument("--cache", default=DEFAULT_CACHE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=64, help="positions per task")
+    parser.add_argument("--output", help="write one CSV row per move here instead of stdout")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    moves = collect_moves(args.logs)
+    canonical = {}
+    for _, _, board, _ in moves:
+        if board not in canonical:
+            canonical[board] = bitboard.canonical(board)
+
+    folder = os.path.dirname(args.cache)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    cache = EvalCache(args.cache, args.prob_cutoff, noop_spawns=True)
+    try:
+        missing = sorted({c for c, _ in canonical.values() if (c, args.depth) not in cache})
+        print(f"{len(moves)} moves, {len(canonical)} positions, {len(missing)} not cached", file=sys.stderr)
+        if missing:
+            tasks = [missing[i:i + args.chunk] for i in range(0, len(missing), args.chunk)]
+            done = 0
+            with Pool(args.workers, _init_worker, (args.depth, args.prob_cutoff, True)) as pool:
+                for results in pool.imap_unordered(_evaluate_chunk, tasks):
+                    for board, values in results:
+                        cache.put(board, args.depth, values)
+                    done += len(results)
+                    print(f"\r{done}/{len(missing)} positions searched", end="", file=sys.stderr)
+            print(file=sys.stderr)
+            cache.flush()
+
+        out = open(args.output, "w") if args.output else sys.stdout
+        try:
+            out.write("session,move,board,direction,best,loss,rank\n")
+            for session, index, board, direction in moves:
+                c, directions = canonical[board]
+                stored = cache.get(c, args.depth)
+                values = tuple(stored[DIRECTIONS.index(directions[d])] for d in DIRECTIONS)
+                best, loss, rank = grade(values, direction)
+                out.write(f"{session},{index},{board},{direction},{best or ''},"
+                          f"{'' if loss is None else round(loss, 3)},{'' if rank is None else rank}\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    finally:
+        cache.close()
+    print(f"{time.perf_counter() - started:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
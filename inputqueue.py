@@ -0,0 +1,111 @@
+"""2048 moves applied on a worker thread, with an explicit auto-repeat policy.
+
+MainWindow's keyPressEvent only timestamps an arrow key and hands it to
+submit(); the move itself (slide, spawn) runs on the MoveQueue thread. After
+a move the GUI is told through on_update, but only once until it calls take(),
+so however many moves land between two frames the board is repainted once,
+with the latest state (and only a lone move is animated).
+
+Held arrow keys arrive as a stream of auto-repeat events. The policy decides
+what happens to them, at the moment they arrive:
+    "coalesce"  a repeat is dropped while an earlier move is still waiting to
+                be applied or its board has not been taken by the GUI yet
+                (take(), once per frame), so at most one repeat lands per
+                frame shown and moves never trail behind the key release
+    "reject"    every repeat is dropped; one move per key press
+    "accept"    every repeat is applied (the old behaviour)
+Each key is logged with what was done to it ("input": applied, coalesced or
+rejected). Every key, dropped or not, goes through the worker, which writes
+its "key" event, so the log stays in arrival order. drain() waits until
+everything submitted is logged, which MainWindow does before any other key.
+
+No Qt dependency.
+"""
+import queue
+import threading
+import time
+
+POLICIES = ("coalesce", "reject", "accept")
+DEFAULT_POLICY = "coalesce"
+_STOP = object()
+
+
+class MoveQueue:
+    def __init__(self, grid, log, policy=DEFAULT_POLICY, on_update=None):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown auto-repeat policy {policy!r}")
+        self.grid = grid
+        self.log = log
+        self.policy = policy
+        self.on_update = on_update or (lambda: None)
+        self.counts = {"applied": 0, "coalesced": 0, "rejected": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0  # Moves submitted and not applied yet
+        self._latest = None  # (key_t, model_t) of the newest board change the GUI has not taken
+        self._moves = []  # (before, direction, after, spawn) of the board changes since the last take()
+        self._thread = threading.Thread(target=self._run, name="MoveQueue", daemon=True)
+        self._thread.start()
+
+    def submit(self, direction, t, auto_repeat, fields):
+        """Queues an arrow key that arrived at t; returns what the policy did with it.
+
+        fields are the rest of the key's log event (page, map, overlay, ...).
+        """
+        with self._lock:
+            if auto_repeat and self.policy == "reject":
+                action = "rejected"
+            elif auto_repeat and self.policy == "coalesce" and (self._pending or self._latest is not None):
+                action = "coalesced"
+            else:
+                action = "applied"
+                self._pending += 1
+            self.counts[action] += 1
+        self._queue.put((direction, t, action, fields))
+        return action
+
+    def take(self):
+        """(key_t, model_t, moves) for the board changes since the last call, or None.
+
+        key_t and model_t are those of the latest change; moves lists every
+        change as (before, direction, after, spawn). Re-arms on_update.
+        """
+        with self._lock:
+            latest, self._latest = self._latest, None
+            moves, self._moves = self._moves, []
+        return None if latest is None else (*latest, moves)
+
+    def drain(self):
+        """Blocks until every submitted key has been applied and logged."""
+        self._queue.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            direction, t, action, fields = item
+            move = {}
+            if action == "applied":
+                grid = self.grid
+                before = grid.board
+                grid.move(direction)
+                model_t = time.perf_counter_ns()
+                move = {"before": before, "after": grid.board, "spawn": grid.last_spawn, "score": grid.score}
+                notify = False
+                with self._lock:
+                    self._pending -= 1
+                    if grid.board != before:
+                        notify = self._latest is None
+                        self._latest = (t, model_t)
+                        self._moves.append((before, direction, grid.board, grid.last_spawn))
+                if notify:
+                    self.on_update()
+            self.log.log("key", t=t, key=direction, input=action, **fields, **move)
+            self._queue.task_done()
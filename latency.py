@@ -0,0 +1,123 @@
+"""Keypress-to-screen latency tracking for the map and the 2048 board.
+
+For every key press that changes what a target ("map" or "board") shows,
+MainWindow calls begin() with the perf_counter_ns time the key event arrived
+and the time the model update finished. The target's paintEvent calls
+painted(), and once the top-level window has flushed that frame to the
+screen flushed() completes the event. Each completed event is logged as an
+"onset" event with all its timestamps, and its latencies go into per-target
+histograms.
+
+An animated board move reaches the screen in two steps: the first frame
+(paint_t, flush_t) still shows the tiles where they were, and the new board
+is only all there on the last frame (settle_t, painted when the animation
+has run; settle_flush_t once that frame is on the screen). The "paint" and
+"flush" stages time the first frame; "settle" times the settled frame being
+flushed. Without an animation the two are the same frame. If the next move
+starts the animation over before it settles, the onset is logged with
+settle_t None.
+
+A map is only counted once the requested map is actually in the label (it may
+still be decoding when the key is pressed), so MainWindow calls ready() when
+it sets the pixmap. Board updates are ready as soon as the move is made.
+
+Everything here is a few integer operations, so it adds microseconds, not
+milliseconds, to a key press. No Qt dependency.
+"""
+import time
+from array import array
+
+STAGES = ("model", "paint", "flush", "settle")
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Latency samples in ns, with power-of-two microsecond buckets for the log."""
+
+    def __init__(self):
+        self.samples = array("q")
+        self.buckets = [0] * 40  # bucket k counts latencies of 2**(k-1) to 2**k - 1 microseconds
+
+    def add(self, ns):
+        self.samples.append(ns)
+        self.buckets[min((ns // 1000).bit_length(), len(self.buckets) - 1)] += 1
+
+    def summary(self):
+        """Count, p50/p95/p99/max in ms, and the non-empty buckets."""
+        if not self.samples:
+            return {"count": 0}
+        ordered = sorted(self.samples)
+        result = {"count": len(ordered), "max_ms": ordered[-1] / 1e6}
+        for p in PERCENTILES:
+            result[f"p{p}_ms"] = ordered[min(len(ordered) - 1, len(ordered) * p // 100)] / 1e6
+        result["buckets_us"] = {str((1 << k) - 1): n for k, n in enumerate(self.buckets) if n}
+        return result
+
+
+class LatencyTracker:
+    def __init__(self, log=None, targets=("map", "board")):
+        self.log = log  # EventLog for the per-event onsets, or None
+        self.pending = {}  # target -> [key_t, model_t, ready, paint_t, flush_t, settle_t]
+        self.histograms = {(target, stage): LatencyHistogram() for target in targets for stage in STAGES}
+        self.superseded = dict.fromkeys(targets, 0)
+
+    def begin(self, target, key_t, model_t=None, ready=True):
+        """A key press at key_t changed target; model_t is when the model update finished."""
+        event = self.pending.pop(target, None)
+        if event is not None:
+            if event[4] is None:
+                self.superseded[target] += 1  # Replaced before it reached the screen
+            else:
+                self._complete(target, event, None)  # On the screen, but cut short before it settled
+        self.pending[target] = [key_t, time.perf_counter_ns() if model_t is None else model_t, ready, None, None, None]
+
+    def ready(self, target):
+        """The new content of target is in place; its next paint is the onset."""
+        event = self.pending.get(target)
+        if event is not None:
+            event[2] = True
+
+    def painted(self, target, settled=True):
+        """Called at the end of target's paintEvent; settled is False for a frame of a running animation."""
+        event = self.pending.get(target)
+        if event is None or not event[2]:
+            return
+        t = time.perf_counter_ns()
+        if event[3] is None:
+            event[3] = t
+        if settled and event[5] is None:
+            event[5] = t
+
+    def flushed(self):
+        """Called after the window's backing store was flushed to the screen."""
+        if not self.pending:
+            return
+        t = time.perf_counter_ns()
+        for target, event in list(self.pending.items()):
+            if event[3] is None:
+                continue
+            if event[4] is None:
+                event[4] = t
+            if event[5] is not None:
+                del self.pending[target]
+                self._complete(target, event, t)
+
+    def _complete(self, target, event, settle_flush_t):
+        key_t, model_t, _, paint_t, flush_t, settle_t = event
+        self.histograms[target, "model"].add(model_t - key_t)
+        self.histograms[target, "paint"].add(paint_t - key_t)
+        self.histograms[target, "flush"].add(flush_t - key_t)
+        if settle_flush_t is not None:
+            self.histograms[target, "settle"].add(settle_flush_t - key_t)
+        if self.log is not None:
+            self.log.log("onset", t=flush_t, target=target, key_t=key_t, model_t=model_t, paint_t=paint_t,
+                         settle_t=settle_t, settle_flush_t=settle_flush_t)
+
+    def summary(self):
+        """Per-target, per-stage latency summaries (ms since the key event arrived)."""
+        result = {}
+        for (target, stage), histogram in self.histograms.items():
+            result.setdefault(target, {})[stage] = histogram.summary()
+        for target, count in self.superseded.items():
+            result[target]["superseded"] = count
+        return result
@@ -1,88 +1,90 @@
+import time
+_IMPORT_START_NS = time.perf_counter_ns()  # For the startup profile
+
+import argparse
+import math
 import sys
 import os
-import random
+import threading
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QStackedWidget, QSizePolicy
+    QApplication, QWidget, QLabel, QHBoxLayout, QStackedWidget, QSizePolicy
 )
-from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt
-
-# 2048 Game Grid Class
-class Grid:
-    def __init__(self, size=4):
-        self.size = size
-        self.cells = self.generate_empty_grid()
-        self.add_random_tile()
-        self.add_random_tile()
-
-    def generate_empty_grid(self):
-        return [[0] * self.size for _ in range(self.size)]
-
-    def add_random_tile(self):
-        empty_cells = [(i, j) for i in range(self.size) for j in range(self.size) if self.cells[i][j] == 0]
-        if empty_cells:
-            i, j = random.choice(empty_cells)
-            self.cells[i][j] = 2 if random.random() < 0.9 else 4
-
-    def move_left(self):
-        for row in self.cells:
-            self.compress(row)
-            self.merge(row)
-            self.compress(row)
-        self.add_random_tile()
-
-    def move_right(self):
-        for row in self.cells:
-            row.reverse()
-            self.compress(row)
-            self.merge(row)
-            self.compress(row)
-            row.reverse()
-        self.add_random_tile()
-
-    def move_up(self):
-        self.transpose()
-        self.move_left()
-        self.transpose()
-
-    def move_down(self):
-        self.transpose()
-        self.move_right()
-        self.transpose()
-
-    def compress(self, row):
-        new_row = [num for num in row if num != 0] + [0] * (self.size - len([num for num in row if num != 0]))
-        row[:] = new_row
-
-    def merge(self, row):
-        for i in range(self.size - 1):
-            if row[i] == row[i + 1] and row[i] != 0:
-                row[i] *= 2
-                row[i + 1] = 0
-
-    def transpose(self):
-        self.cells = [list(row) for row in zip(*self.cells)]
+from PyQt6.QtGui import QPixmap, QPainter, QColor, QFont, QImageReader, QPen, QPolygonF
+from PyQt6.QtCore import Qt, QEvent, QPointF, QRect, QRectF, QSize, QTimer, QVariantAnimation, pyqtSignal
+
+from sizedgrid import make_grid, tile_paths, to_cells
+from eventlog import EventLog, unique_path
+from inputqueue import MoveQueue, POLICIES, DEFAULT_POLICY
+from latency import LatencyTracker
+from mapcache import MapCache
+from routecapture import RouteBuffer, simplify, TOLERANCE as ROUTE_TOLERANCE
+from pixmapbudget import PixmapBudget, pixmap_bytes, DEFAULT_MAX_BYTES as IMAGE_BUDGET
+from assetcache import CompiledAssets
+from startup import StartupProfile
+from stationsync import SyncStation, DEFAULT_PORT
+import stimuli
+import timeline
+
+LOG_FOLDER = "logs"
+PRELOAD_AHEAD = 2  # Key presses ahead whose pages and maps are prepared in advance
+
+KEY_NAMES = {
+    Qt.Key.Key_Space: "space", Qt.Key.Key_Q: "q",
+    Qt.Key.Key_Left: "left", Qt.Key.Key_Right: "right", Qt.Key.Key_Up: "up", Qt.Key.Key_Down: "down",
+}
+
+
+# 2048 Tile Colors
+TILE_COLORS = {
+    0: "#f2e0cc", 2: "#c2713c", 4: "#3f1233", 8: "#7fff00",
+    16: "#44d0de", 32: "#00ff7f", 64: "#00ffff", 128: "#007fff",
+    256: "#0000ff", 512: "#7f00ff", 1024: "#ff00ff", 2048: "#ff007f"
+}
+BOARD_MARGIN = 11  # Same spacing the old QLabel layout had
+TILE_SPACING = 6
+TILE_FONT_SIZE = 40
+ANIMATION_MS = 120  # Slide plus merge/ spawn of one move; 0 turns animation off
+SLIDE_SHARE = 0.6  # Part of the animation spent sliding; merges pop and the new tile grows after it
+MERGE_POP = 0.15  # How much a merged tile swells at its biggest
+ROUTE_COLOR = "#e0245e"
+ROUTE_WIDTH = 3
 
 
 class GameWidget(QWidget):
-    def __init__(self, parent=None):
+    """2048 board drawn with QPainter from cached tile pixmaps.
+
+    Each tile value is rendered once per (value, size, device pixel ratio),
+    and after a move only the cells whose value changed are repainted.
+    painted is emitted at the end of every paint (for latency tracking).
+
+    animate_move() plays a move as tiles sliding along their paths, then
+    merged tiles popping and the new tile growing, drawn from the same tile
+    pixmaps on Qt's animation timer. It never holds up input: the next move,
+    or any update_grid(), snaps a running animation to its end state.
+    """
+
+    painted = pyqtSignal()
+
+    def __init__(self, size=4, seed=None, animation_ms=ANIMATION_MS, budget=None, steps=None, parent=None):
         super().__init__(parent)
-        self.grid = Grid(4)
+        self.grid = make_grid(size, seed)  # Spawns are reproducible from grid.seed
+        self.tile_cache = {}  # (value, width, height, dpr) -> QPixmap
+        self.budget = budget  # Optional PixmapBudget the tiles are accounted in
+        self.budget_steps = steps  # Timeline steps the game is shown on
+        self.shown_cells = None  # Cells as last painted, to find what changed
+        self.frame = None  # Cells the next paint shows: one snapshot of the board, taken by update_grid()
+        self.animation_ms = animation_ms
+        self.animation = None  # (paths, cells before, cells after, spawn) of the move being animated
+        self.progress = QVariantAnimation(self)
+        self.progress.setStartValue(0.0)
+        self.progress.setEndValue(1.0)
+        self.progress.setDuration(max(1, animation_ms))
+        self.progress.valueChanged.connect(lambda _: self.update())
+        self.progress.finished.connect(self.snap)
         self.initUI()
 
     def initUI(self):
-        self.layout = QVBoxLayout()
-        self.setLayout(self.layout)
-        self.labels = [[QLabel(self) for _ in range(4)] for _ in range(4)]
-
-        for i in range(4):
-            row_layout = QHBoxLayout()
-            for j in range(4):
-                label = self.labels[i][j]
-                label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-                row_layout.addWidget(label)
-            self.layout.addLayout(row_layout)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
 
         # White Overlay (Initially Hidden)
         self.overlay = QLabel(self)
@@ -102,21 +104,153 @@ class GameWidget(QWidget):
         self.overlay.setGeometry(self.rect())  # Update overlay size
         if self.overlay.isVisible():
             self.overlay.raise_()  # Ensure overlay stays on top
-
-    def update_grid(self):
-        for i in range(4):
-            for j in range(4):
-                value = self.grid.cells[i][j]
-                self.labels[i][j].setText(str(value) if value != 0 else "")
-                self.labels[i][j].setStyleSheet(f"background-color: {self.get_color(value)}; font-size: 40px;")
+        self.clear_tiles()  # Tiles of the old size won't be used again
+
+    def clear_tiles(self):
+        if self.budget is not None:
+            for key in self.tile_cache:
+                self.budget.discard("tiles", key)
+        self.tile_cache.clear()
+
+    def cell_rect(self, i, j):
+        """Pixel rectangle of cell (i, j) for the current widget size."""
+        n = self.grid.size
+        width = self.width() - 2 * BOARD_MARGIN - (n - 1) * TILE_SPACING
+        height = self.height() - 2 * BOARD_MARGIN - (n - 1) * TILE_SPACING
+        left = BOARD_MARGIN + j * width // n + j * TILE_SPACING
+        top = BOARD_MARGIN + i * height // n + i * TILE_SPACING
+        right = BOARD_MARGIN + (j + 1) * width // n + j * TILE_SPACING
+        bottom = BOARD_MARGIN + (i + 1) * height // n + i * TILE_SPACING
+        return QRect(left, top, max(1, right - left), max(1, bottom - top))
+
+    def tile_pixmap(self, value, width, height):
+        """Pre-rendered tile, cached by value, size and device pixel ratio."""
+        dpr = self.devicePixelRatioF()
+        key = (value, width, height, dpr)
+        pixmap = self.tile_cache.get(key)
+        if self.budget is not None:
+            self.budget.touch("tiles", key)
+        if pixmap is None:
+            pixmap = QPixmap(round(width * dpr), round(height * dpr))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(QColor(self.get_color(value)))
+            if value != 0:
+                painter = QPainter(pixmap)
+                font = QFont(self.font())
+                # Shrink the text on small cells (big boards) so long numbers still fit
+                font.setPixelSize(max(1, min(TILE_FONT_SIZE, height * 45 // 100, width * 8 // (5 * max(2, len(str(value)))))))
+                painter.setFont(font)
+                painter.setPen(QColor("black"))
+                painter.drawText(QRect(0, 0, width, height), Qt.AlignmentFlag.AlignCenter, str(value))
+                painter.end()
+            self.tile_cache[key] = pixmap
+            if self.budget is not None:
+                self.budget.add("tiles", key, pixmap_bytes(pixmap), self.budget_steps,
+                                lambda key: self.tile_cache.pop(key, None))
+        return pixmap
+
+    def paintEvent(self, event):
+        if self.animation is not None:
+            self.paint_animation()
+            self.painted.emit()
+            return
+        if self.frame is None:
+            self.frame = self.grid.cells
+        cells = self.frame  # Not the live grid: the move thread may have changed it since update_grid()
+        painter = QPainter(self)
+        dirty = event.region()
+        for i in range(self.grid.size):
+            for j in range(self.grid.size):
+                rect = self.cell_rect(i, j)
+                if dirty.intersects(rect):
+                    painter.drawPixmap(rect.topLeft(), self.tile_pixmap(cells[i][j], rect.width(), rect.height()))
+        painter.end()
+        self.shown_cells = cells
+        self.painted.emit()
+
+    def paint_animation(self):
+        """One frame of the running move animation."""
+        paths, before, after, spawn = self.animation
+        progress = self.progress.currentValue()
+        n = self.grid.size
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        for i in range(n):
+            for j in range(n):
+                rect = self.cell_rect(i, j)
+                painter.drawPixmap(rect.topLeft(), self.tile_pixmap(0, rect.width(), rect.height()))
+        if progress < SLIDE_SHARE:
+            f = progress / SLIDE_SHARE
+            for (si, sj), (di, dj), _ in paths:
+                a = self.cell_rect(si, sj)
+                b = self.cell_rect(di, dj)
+                position = QPointF(a.x() + (b.x() - a.x()) * f, a.y() + (b.y() - a.y()) * f)
+                painter.drawPixmap(position, self.tile_pixmap(before[si][sj], a.width(), a.height()))
+        else:
+            f = (progress - SLIDE_SHARE) / (1 - SLIDE_SHARE)
+            merged = {to for _, to, was_merged in paths if was_merged}
+            for i in range(n):
+                for j in range(n):
+                    if not after[i][j]:
+                        continue
+                    rect = self.cell_rect(i, j)
+                    pixmap = self.tile_pixmap(after[i][j], rect.width(), rect.height())
+                    if spawn is not None and (i, j) == spawn[:2]:
+                        scale = f
+                    elif (i, j) in merged:
+                        scale = 1 + MERGE_POP * math.sin(math.pi * f)
+                    else:
+                        painter.drawPixmap(rect.topLeft(), pixmap)
+                        continue
+                    target = QRectF(rect)
+                    target.setSize(target.size() * scale)
+                    target.moveCenter(QRectF(rect).center())
+                    painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+        painter.end()
+
+    def animate_move(self, before, direction, after, spawn):
+        """Plays one move from board before to board after (spawn included)."""
+        self.snap()
+        if not self.animation_ms:
+            self.update_grid(after)
+            return
+        size = self.grid.size
+        self.animation = (tile_paths(before, size, direction), to_cells(before, size), to_cells(after, size), spawn)
+        self.progress.start()
+        self.update()
+
+    def snap(self):
+        """Ends a running animation; the next paint shows the board it was animating to.
+
+        Not the grid as it is: moves the move thread applied since then are
+        shown by the next update_grid() or animate_move().
+        """
+        if self.animation is not None:
+            self.progress.stop()
+            self.frame = self.animation[2]
+            self.animation = None
+            self.shown_cells = None
+            self.update()
+
+    def update_grid(self, board=None):
+        """Schedules a repaint of the cells whose value changed since the last paint.
+
+        board (default: the grid's board now) is the frame the paint will show;
+        the repainted cells are found from the same snapshot, so a move that
+        lands before the paint is left for the next update_grid().
+        """
+        self.snap()
+        cells = self.frame = to_cells(self.grid.board if board is None else board, self.grid.size)
+        if self.shown_cells is None:
+            self.update()
+            return
+        for i in range(self.grid.size):
+            for j in range(self.grid.size):
+                if cells[i][j] != self.shown_cells[i][j]:
+                    self.update(self.cell_rect(i, j))
 
     def get_color(self, value):
-        colors = {
-            0: "#f2e0cc", 2: "#c2713c", 4: "#3f1233", 8: "#7fff00",
-            16: "#44d0de", 32: "#00ff7f", 64: "#00ffff", 128: "#007fff",
-            256: "#0000ff", 512: "#7f00ff", 1024: "#ff00ff", 2048: "#ff007f"
-        }
-        return colors.get(value, "#ff007f")
+        return TILE_COLORS.get(value, "#ff007f")
 
     def move(self, direction):
         if direction == "left":
@@ -132,14 +266,197 @@ class GameWidget(QWidget):
 
 
 
+class MapLabel(QLabel):
+    """Left-side map display; reports size changes so the map can be rescaled,
+    and paints so map onsets can be timed.
+
+    Dragging on the map draws a route (see routecapture.py). Each new pointer
+    sample adds one segment to an overlay pixmap and repaints just that
+    segment; finished strokes are emitted as `stroke`, simplified and in map
+    image pixels.
+    """
+
+    resized = pyqtSignal()
+    painted = pyqtSignal()
+    stroke = pyqtSignal(object)  # {"t", "end_t", "part", "final", "raw", "points": [[x, y, ms], ...]}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.route = RouteBuffer()
+        self.image_size = None  # (width, height) of the map image; no routes without a map
+        self.strokes = []  # Simplified strokes on this map (image pixels), to redraw after a resize
+        self.overlay = None  # Routes drawn so far, at the label's size
+        self.drawing = False
+        self.stroke_t = None
+        self.part = 0
+
+    def set_map(self, image_size):
+        """A new map (or none) is shown: ends the stroke in progress and clears the routes."""
+        self.end_stroke()
+        self.image_size = image_size
+        self.strokes = []
+        self.overlay = None
+        self.update()
+
+    def _scale(self, size=None):
+        """(scale, left, top) taking map image pixels to label coordinates (at size, default the label's)."""
+        width, height = self.image_size
+        size = self.size() if size is None else size
+        scale = min(size.width() / width, size.height() / height)
+        return scale, (size.width() - width * scale) / 2, (size.height() - height * scale) / 2
+
+    @staticmethod
+    def _route_painter(device):
+        painter = QPainter(device)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor(ROUTE_COLOR), ROUTE_WIDTH, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap,
+                            Qt.PenJoinStyle.RoundJoin))
+        return painter
+
+    def _overlay(self):
+        if self.overlay is None:
+            dpr = self.devicePixelRatioF()
+            self.overlay = QPixmap(max(1, round(self.width() * dpr)), max(1, round(self.height() * dpr)))
+            self.overlay.setDevicePixelRatio(dpr)
+            self.overlay.fill(Qt.GlobalColor.transparent)
+            scale, left, top = self._scale()
+            painter = self._route_painter(self.overlay)
+            for points in self.strokes:
+                painter.drawPolyline(QPolygonF([QPointF(left + x * scale, top + y * scale) for x, y, _ in points]))
+            painter.end()
+        return self.overlay
+
+    def mousePressEvent(self, event):
+        if self.image_size is None or event.button() != Qt.MouseButton.LeftButton:
+            super().mousePressEvent(event)
+            return
+        self.drawing = True
+        self.stroke_t = time.perf_counter_ns()
+        self.part = 0
+        position = event.position()
+        self.route.append(self.stroke_t, position.x(), position.y())
+
+    def mouseMoveEvent(self, event):
+        if not self.drawing:
+            super().mouseMoveEvent(event)
+            return
+        t = time.perf_counter_ns()
+        position = event.position()
+        previous = QPointF(*self.route.last())
+        full = self.route.append(t, position.x(), position.y())
+        painter = self._route_painter(self._overlay())
+        painter.drawLine(previous, position)
+        painter.end()
+        margin = ROUTE_WIDTH
+        self.update(QRectF(previous, position).normalized().adjusted(-margin, -margin, margin, margin).toAlignedRect())
+        if full:
+            self.flush(final=False)
+
+    def mouseReleaseEvent(self, event):
+        if self.drawing:
+            self.end_stroke()
+        else:
+            super().mouseReleaseEvent(event)
+
+    def end_stroke(self, size=None):
+        """Ends the stroke in progress; size is the label size its samples were taken at."""
+        if self.drawing:
+            self.drawing = False
+            self.flush(final=True, size=size)
+
+    def flush(self, final, size=None):
+        """Simplifies the buffered samples and emits them; a non-final part keeps its last point."""
+        ts, xs, ys = self.route.drain(keep_last=not final)
+        if not xs:
+            return
+        scale, left, top = self._scale(size)
+        kept = simplify(xs, ys, ROUTE_TOLERANCE * scale)
+        points = [[round((xs[i] - left) / scale, 1), round((ys[i] - top) / scale, 1),
+                   round((ts[i] - self.stroke_t) / 1e6, 1)] for i in kept]
+        self.strokes.append(points)
+        self.stroke.emit({"t": self.stroke_t, "end_t": ts[-1], "part": self.part, "final": final,
+                          "raw": len(xs), "points": points})
+        self.part += 1
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.end_stroke(event.oldSize())  # Samples are in label coordinates of the old size
+        self.overlay = None  # Redrawn from self.strokes at the new size
+        self.resized.emit()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.overlay is not None:
+            painter = QPainter(self)
+            painter.drawPixmap(0, 0, self.overlay)  # Clipped to the repainted region
+            painter.end()
+        self.painted.emit()
+
+
 class MainWindow(QWidget):
-    def __init__(self):
+    remote_step = pyqtSignal(int, int)  # (step, local apply time) from the sync thread
+    board_moved = pyqtSignal()  # From the move thread, once per frame at most
+
+    def __init__(self, timeline_path=timeline.TIMELINE_FILE, sync=None, repeat_policy=DEFAULT_POLICY,
+                 image_budget=IMAGE_BUDGET):
         super().__init__()
+        global _IMPORT_START_NS
+        # Later windows in the same process (participant.py sessions) are timed from their construction
+        self.profile = StartupProfile(_IMPORT_START_NS or time.perf_counter_ns())
+        _IMPORT_START_NS = None
+        self.profile.mark("imported")
 
-        # Load Map Files
+        # Map files and their sizes come from the stimulus index (see stimuli.py)
         self.maps_folder = "maps"
-        self.maps = sorted([os.path.join(self.maps_folder, f) for f in os.listdir(self.maps_folder) if f.endswith((".png", ".jpg"))])
-        self.current_index = -1  # Start at welcome screen
+        with self.profile.asset("stimuli"):
+            entries = stimuli.load(self.maps_folder)
+            stale = None if entries is None else stimuli.stale(self.maps_folder, entries)
+        self.unhashed = []  # Maps indexed from their header only, hashed after the first frame (see hash_stimuli)
+        if stale is not None:  # Maps changed since the index was built: patch it in memory
+            print(f"{stimuli.index_path(self.maps_folder)} is out of date ({stale}); "
+                  f"update it with python stimuli.py", file=sys.stderr)
+            with self.profile.asset("stimuli_rebuild"):
+                entries, self.unhashed = stimuli.refresh(self.maps_folder, entries)
+        if entries is None:  # No index yet: list the folder like before
+            with self.profile.asset("maps_folder"):
+                self.maps = stimuli.scan(self.maps_folder)
+            entries = []
+        else:
+            self.maps = [entry["path"] for entry in entries]
+        self.stimuli = {entry["path"]: entry for entry in entries}
+        self.hasher = threading.Thread(target=self.hash_stimuli, name="StimuliHasher", daemon=True)
+
+        # Pages, map trials and navigation come from the timeline file (see timeline.py)
+        self.timeline = timeline.compile(timeline.load(timeline_path), self.maps)
+        self.step = 0  # Start at welcome screen
+        self.current_index = -1  # Map being shown, -1 when there is none
+
+        # Session Event Log (written from a background thread)
+        self.log = EventLog(unique_path(os.path.join(LOG_FOLDER, time.strftime("session_%Y%m%d_%H%M%S.jsonl"))))
+        self.log.log("session_start", wall_time=time.time(), maps=self.maps, timeline=timeline_path,
+                     stimuli={path: {"sha256": entry["sha256"], "meta": entry["meta"]}
+                              for path, entry in self.stimuli.items()},
+                     stimuli_stale=stale, pages=[page["name"] for page in self.timeline.pages],
+                     sync=None if sync is None else ("coordinator" if sync.coordinator else "follower"),
+                     repeat_policy=repeat_policy)
+
+        # Arrow keys are applied on a worker thread (see inputqueue.py), made when the game page is built
+        self.repeat_policy = repeat_policy
+        self.moves = None
+        self.board_moved.connect(self.on_board_moved)
+
+        # Optional link to the partner's station (see stationsync.py); page and map
+        # changes then happen on both stations at the time the coordinator picks
+        self.sync = sync
+        if sync is not None:
+            self.remote_step.connect(self.on_remote_step)
+            sync.on_step = self.remote_step.emit
+            sync.on_clock = lambda **fields: self.log.log("clock", **fields)
+            sync.on_error = lambda **fields: self.log.log("sync_error", **fields)
+            sync.start()
+
+        # Keypress-to-screen timing of map and board changes (see latency.py)
+        self.latency = LatencyTracker(self.log)
 
         self.setWindowTitle("2048 & Maps")
         self.setGeometry(100, 100, 1000, 600)
@@ -147,8 +464,29 @@ class MainWindow(QWidget):
         # Main Layouts
         self.main_layout = QHBoxLayout(self)
 
+        # Pre-scaled stimuli from assetcache.py, if they were built for this display
+        self.assets = CompiledAssets()
+
+        # Maps, image pages and tiles share one memory budget, evicted by distance
+        # from the current step (see pixmapbudget.py)
+        self.budget = PixmapBudget(image_budget)
+        self.page_steps = {}  # page index -> steps showing it
+        for index, step in enumerate(self.timeline.steps):
+            self.page_steps.setdefault(step.page, []).append(index)
+
+        # Scaled maps are prepared in the background
+        self.map_cache = MapCache(self.budget, assets=self.assets, parent=self)
+        for index, step in enumerate(self.timeline.steps):
+            if step.map is not None:
+                self.map_cache.steps.setdefault(self.maps[step.map], []).append(index)
+        self.map_cache.ready.connect(self.on_map_ready)
+        self.shown_map_key = None
+
         # Left Panel (Map Display)
-        self.map_label = QLabel()
+        self.map_label = MapLabel()
+        self.map_label.resized.connect(self.load_map)
+        self.map_label.painted.connect(lambda: self.latency.painted("map"))
+        self.map_label.stroke.connect(self.on_stroke)
         self.map_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.map_label.setStyleSheet("background-color: white;")
 
@@ -156,79 +494,217 @@ class MainWindow(QWidget):
         self.right_panel = QStackedWidget()
 
 
-        # WITHOUT FULL INST, GOOD SPLIT
-        # self.pages = [
-        #     QLabel("WELCOME\nPress SPACE to continue"),
-        #     #QLabel("DETAILED INSTRUCTIONS\n(Read badly)"),
-        #     #QLabel("DETAILED INSTRUCTIONS\n(Read badly)\nIn this experiment, you are the LISTENER,\nand your partner the SPEAKER"),
-        #     QLabel("DETAILED INSTRUCTIONS\n(Read badly)\nIn this experiment, you are the LISTENER,\nand your partner the SPEAKER \nYou will be shown a series of maps adjacent to a 2048 game.\nThis game is playable only during select \nportions of the study.\nYour objective is to successfully complete \nboth the MAP TASK and the GAME TASK. \nPlease press space to continue."),
-        #     QLabel("NEW PAGE 1"),  # First additional page (AFTER the instructions, BEFORE 2048)
-        #     #QLabel("In the MAP TASK, you will be conversing with your partner, \nwho will give you directions to a specified point on the map. \nYou are both given maps of the same locations, \nwith some slight differences. \nYou will need to communicate with your partner \nto understand how to reach the destination point. \nPlease press space to continue. "),
-        #     QLabel("NEW PAGE 2"),
-        #     #QLabel("In the 2048 GAME TASK, your goal is \nto combine numbered tiles to create the tile 2048. \nUse the arrow keys (← ↑ → ↓) to slide \nall tiles in the chosen direction. When two tiles \nwith the same number collide, they \nmerge into one tile with a value equal to their sum. \nEach move introduces a new tile (either 2 or 4) \nat a random empty position on the board. An example will be provided. \nPlease press space to continue. "),
-        #     QLabel(),  # Placeholder for 2048 image (Move it up)
-        #     QLabel("START PAGE\nPress SPACE to begin"),
-        #     GameWidget(),  # The 2048 game
-        #     QLabel("THANK YOU\nExperiment completed!")
-        # ]
-
-        # WITH FULL INST, BAD SPLIT
-        self.pages = [
-            QLabel("WELCOME\nPress SPACE to continue"),
-            #QLabel("DETAILED INSTRUCTIONS\n(Read badly)"),
-            #QLabel("DETAILED INSTRUCTIONS\n(Read badly)\nIn this experiment, you are the LISTENER,\nand your partner the SPEAKER"),
-            QLabel("DETAILED INSTRUCTIONS\n(Read badly)\nIn this experiment, you are the LISTENER,\nand your partner the SPEAKER \nYou will be shown a series of maps adjacent to a 2048 game.\nThis game is playable only during select \nportions of the study.\nYour objective is to successfully complete \nboth the MAP TASK and the GAME TASK. \nPlease press space to continue."),
-            #QLabel("NEW PAGE 1"),  # First additional page (AFTER the instructions, BEFORE 2048)
-            QLabel("In the MAP TASK, you will be conversing \nwith your partner, who will give you directions \nto a specified point on the map. \nYou are both given maps of the same locations, \nwith some slight differences. \nYou will need to communicate with your partner \nto understand how to reach the destination point. \nPlease press space to continue. "),
-            #QLabel("NEW PAGE 2"),
-            QLabel("In the 2048 GAME TASK, your goal is \nto combine numbered tiles to create \nthe tile 2048. Use the arrow keys (← ↑ → ↓) \nto slide all tiles in the chosen direction. \nWhen two tiles with the same number \ncollide, they merge into one tile \nwith a value equal to their sum. \nEach move introduces a new tile (either 2 or 4) \nat a random empty position on the board. \nAn example will be provided. \nPlease press space to continue. "),
-            QLabel(),  # Placeholder for 2048 image (Move it up)
-            QLabel("START PAGE\nPress SPACE to begin"),
-            GameWidget(),  # The 2048 game
-            QLabel("THANK YOU\nExperiment completed!")
-        ]
-
-
-        # Format pages
-        for page in self.pages:
-            if isinstance(page, QLabel):  # Format text pages
-                page.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                page.setStyleSheet("background-color: white; font-size: 30px; color: black;")
-            self.right_panel.addWidget(page)
-
-        # Load 2048 Image Page
-        #self.pages[4].setPixmap(QPixmap("2048_image.png").scaled(400, 400, Qt.AspectRatioMode.KeepAspectRatio))
-        self.pages[4].setPixmap(QPixmap("2048_image.png").scaled(self.width(), self.height(), Qt.AspectRatioMode.KeepAspectRatio))
-
-
+        # Pages are built on first use, or warmed up after the first frame (see page())
+        self.pages = [None] * len(self.timeline.pages)
+        self.warm_queue = list(range(len(self.pages)))
 
 
         # Add to Main Layout
         self.main_layout.addWidget(self.map_label, 2)  # Map on Left
         self.main_layout.addWidget(self.right_panel, 1)  # game on Right
+        # The stretch factors alone decide the split, not the size of the map or of the widest page,
+        # so the map's size is known before it is first shown (see map_size)
+        for panel in (self.map_label, self.right_panel):
+            panel.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
 
         # Start with welcome screen
-        self.right_panel.setCurrentWidget(self.pages[0])
+        self.right_panel.setCurrentWidget(self.page(self.timeline.steps[0].page))
         self.map_label.hide()  # Hide the map at the start
-
-        # Load first map 
-        self.load_map()
+        self.profile.mark("constructed")
+
+    def event(self, event):
+        handled = super().event(event)
+        if event.type() == QEvent.Type.UpdateRequest:
+            # The window has just painted its dirty widgets and flushed them to the screen
+            self.latency.flushed()
+        return handled
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if "first_paint" not in self.profile.marks:
+            self.profile.mark("first_paint")
+            QTimer.singleShot(0, self.warm_up)
+            if self.unhashed:
+                self.hasher.start()
+
+    def hash_stimuli(self):
+        """Hashes the maps the stale index did not vouch for, off the GUI thread, and logs them."""
+        digests = stimuli.hash_files(self.maps_folder, self.unhashed)
+        for path, digest in digests.items():
+            self.stimuli[path]["sha256"] = digest
+        self.log.log("stimuli_hashed", stimuli=digests)
+
+    def warm_up(self):
+        """Builds the remaining pages one per event loop pass after the first frame.
+
+        Ends by preloading what the next steps need (the first map is prefetched
+        while the instruction pages are up), then logs the startup profile.
+        """
+        while self.warm_queue:
+            index = self.warm_queue.pop(0)
+            if self.pages[index] is None:
+                self.page(index)
+                QTimer.singleShot(0, self.warm_up)
+                return
+        self.preload()
+        self.profile.mark("warmed_up")
+        profile = self.profile.summary()
+        self.log.log("startup", **profile)
+        if profile["over_budget"]:
+            print(f"Startup took {profile['first_paint_ms']:.0f} ms to first paint "
+                  f"(budget {profile['budget_ms']} ms)", file=sys.stderr)
+
+    def page(self, index):
+        """Page widget `index`, built and added to the right panel on first use."""
+        page = self.pages[index]
+        spec = self.timeline.pages[index]
+        if "image" in spec:
+            self.budget.touch("pages", index)
+        if page is None:
+            if spec.get("game"):
+                page = GameWidget(size=spec.get("size", 4), seed=spec.get("seed"),  # The 2048 game
+                                  animation_ms=spec.get("animation_ms", ANIMATION_MS),
+                                  budget=self.budget, steps=self.page_steps.get(index, ()))
+                page.painted.connect(lambda: self.latency.painted("board", page.animation is None))
+                self.moves = MoveQueue(page.grid, self.log, self.repeat_policy, on_update=self.board_moved.emit)
+                self.log.log("game_start", size=page.grid.size, seed=page.grid.seed, board=page.grid.board)
+            elif "image" in spec:
+                page = self.image_page(spec["image"])
+                self.budget.add("pages", index, pixmap_bytes(page.pixmap()), self.page_steps.get(index, ()),
+                                self.drop_page)
+            else:
+                page = QLabel(spec["text"])
+            if isinstance(page, QLabel):  # Format text pages
+                page.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                page.setStyleSheet("background-color: white; font-size: 30px; color: black;")
+            # Keep the stack in page order whatever order pages are built in
+            position = sum(p is not None for p in self.pages[:index])
+            self.pages[index] = page
+            self.right_panel.insertWidget(position, page)
+        return page
+
+    def drop_page(self, index):
+        """Frees an image page evicted from the budget; page() builds it again when needed."""
+        page = self.pages[index]
+        self.pages[index] = None
+        self.right_panel.removeWidget(page)
+        page.deleteLater()
+
+    def page_index(self):
+        """Index in self.pages of the page being shown."""
+        return self.pages.index(self.right_panel.currentWidget())
+
+    def image_page(self, path):
+        """Image page (e.g. the 2048 example) scaled to the window."""
+        page = QLabel()
+        #page.setPixmap(QPixmap("2048_image.png").scaled(400, 400, Qt.AspectRatioMode.KeepAspectRatio))
+        with self.profile.asset(path):
+            page.setPixmap(self.load_stimulus(path, self.width(), self.height()))
+        return page
+
+    def game(self):
+        """The 2048 game page, or None if the timeline has none or it is not built yet."""
+        if self.timeline.game_page is None:
+            return None
+        return self.pages[self.timeline.game_page]
+
+    def load_stimulus(self, path, width, height):
+        """Image scaled to fit width x height, from the compiled cache when possible."""
+        dpr = self.devicePixelRatioF()
+        image = self.assets.load_image(path, width, height, dpr)
+        if image is not None:
+            pixmap = QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(dpr)
+            return pixmap
+        return QPixmap(path).scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio)
+
+    def image_size(self, index):
+        """(width, height) in pixels of map `index`, from the stimulus index when it has it."""
+        entry = self.stimuli.get(self.maps[index])
+        if entry is not None:
+            return entry["width"], entry["height"]
+        size = QImageReader(self.maps[index]).size()
+        return size.width(), size.height()
+
+    def on_stroke(self, stroke):
+        """Logs a route drawn on the map (see MapLabel)."""
+        self.log.log("route", step=self.step, map_index=self.current_index, **stroke)
+
+    def map_size(self):
+        """Size of the map label in the split layout, worked out from the window while it is hidden.
+
+        So the first map is prefetched at the size it will be shown at, not
+        at the size of the label before it was ever laid out.
+        """
+        if self.map_label.isVisible():
+            return self.map_label.size()
+        area = self.contentsRect().marginsRemoved(self.main_layout.contentsMargins())
+        # 50-50 split (see __init__); Qt gives the odd pixel to the first widget
+        return QSize((area.width() - self.main_layout.spacing() + 1) // 2, area.height())
+
+    def map_key(self, index):
+        """Cache key for map `index` scaled to the size the map label has in the split layout."""
+        return MapCache.key(self.maps[index], self.map_size(), self.map_label.devicePixelRatioF())
 
     def load_map(self):
-        """Loads the current map into the left-side QLabel and scales dynamically."""
+        """Shows the current map in the left-side QLabel and preloads upcoming steps.
+
+        Maps are decoded and scaled in the background (see mapcache.py), so this
+        only swaps in a ready pixmap. Also called when the label is resized, to
+        swap in a copy scaled to the new size once it is ready. When the map
+        itself changes and is not ready yet, the label is cleared rather than
+        left showing the previous map.
+        """
         if 0 <= self.current_index < len(self.maps):
-            pixmap = QPixmap(self.maps[self.current_index])
-            self.map_label.setPixmap(pixmap.scaled(
-                self.map_label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+            key = self.map_key(self.current_index)
+            new_map = self.shown_map_key is None or self.shown_map_key[0] != key[0]
+            self.shown_map_key = key
+            pixmap = self.map_cache.get(key)
+            if pixmap is not None:
+                self.map_label.setPixmap(pixmap)
+                self.map_cache.show(key)
+            else:
+                if new_map:
+                    self.map_label.clear()
+                    self.map_cache.show(None)
+                self.map_cache.request(key)
+        self.preload()
+
+    def preload(self):
+        """Prepares the assets (see timeline.py) of the steps a few key presses away.
+
+        Maps are requested from the background decoder, unless the stimulus
+        index shows the scaled map would push nearer images out of the memory
+        budget; pages that are not built yet are built after the current step
+        has been painted.
+        """
+        for index in timeline.upcoming(self.timeline, self.step, PRELOAD_AHEAD):
+            for kind, asset in self.timeline.steps[index].assets:
+                if kind == "map":
+                    key = MapCache.key(asset, self.map_size(), self.map_label.devicePixelRatioF())
+                    entry = self.stimuli.get(asset)
+                    if entry is None or stimuli.scaled_bytes(entry, *key[1:]) <= self.budget.room(
+                            self.map_cache.steps.get(asset, ())):
+                        self.map_cache.request(key)
+                elif self.pages[asset] is None:
+                    QTimer.singleShot(0, lambda page=asset: self.page(page))
+
+    def on_map_ready(self, key):
+        """Shows a map that finished decoding if it is still the one wanted."""
+        if key == self.shown_map_key:
+            self.map_label.setPixmap(self.map_cache.pixmaps[key])
+            self.map_cache.show(key)
+            self.latency.ready("map")
 
     def toggle_overlay(self):
-        """Toggles the overlay for maps 2 and 4 only."""
-        if isinstance(self.pages[6], GameWidget):  # Ensure it's the game widget
-            if self.current_index in [1, 3]:  # Maps are zero-indexed
-                self.pages[6].overlay.show()
-                self.pages[6].overlay.raise_()  # Bring overlay to the front
+        """Covers the game with the overlay on trials where the timeline hides it."""
+        game = self.game()
+        if isinstance(game, GameWidget):  # Ensure it's the game widget
+            if not self.timeline.steps[self.step].game_visible:
+                game.overlay.show()
+                game.overlay.raise_()  # Bring overlay to the front
             else:
-                self.pages[6].overlay.hide()
+                game.overlay.hide()
 
 
     def set_fullscreen_layout(self):
@@ -241,107 +717,154 @@ class MainWindow(QWidget):
         self.main_layout.setStretchFactor(self.map_label, 1)  # Map takes half
         self.main_layout.setStretchFactor(self.right_panel, 1)  # Right panel takes half
 
-    def next_screen(self):
-        """Handles the transitions through pages and ensures layout adapts properly."""
-        current_widget = self.right_panel.currentWidget()
-
-        if current_widget == self.pages[0]:  # Welcome -> Detailed Instructions
-            self.right_panel.setCurrentWidget(self.pages[1])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[1]:  # Instructions -> New Page 1
-            self.right_panel.setCurrentWidget(self.pages[2])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[2]:  # New Page 1 -> New Page 2
-            self.right_panel.setCurrentWidget(self.pages[3])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[3]:  # New Page 2 -> 2048 Image
-            self.right_panel.setCurrentWidget(self.pages[4])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[4]:  # 2048 Image -> Start Page
-            self.right_panel.setCurrentWidget(self.pages[5])
+    def go_to(self, index, cause_t=None):
+        """Shows timeline step `index`: its page, its map (if any) and the game overlay.
+
+        cause_t is the perf_counter_ns time of the key press (or scheduled sync
+        time) the map onset latency is measured from.
+        """
+        if index == self.step:
+            return
+        prev_map = self.current_index
+        step = self.timeline.steps[index]
+        if (-1 if step.map is None else step.map) != prev_map:
+            # Logs a stroke still being drawn with the step it was drawn on
+            self.map_label.set_map(None if step.map is None else self.image_size(step.map))
+        self.step = index
+        self.budget.set_position(index)
+        self.current_index = -1 if step.map is None else step.map
+        self.load_map()
+        self.right_panel.setCurrentWidget(self.page(step.page))
+        if step.map is None:
+            self.map_label.hide()
             self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[5]:  # Start Page -> Experiment (Maps + 2048)
-            self.current_index = 0  # Move to first map
-            self.load_map()
-            self.right_panel.setCurrentWidget(self.pages[6])
+        else:
             self.map_label.show()
             self.set_split_layout()
-            self.toggle_overlay()
-
-        elif self.current_index < len(self.maps) - 1:  # Map cycle
-            self.current_index += 1
-            self.load_map()
-            self.toggle_overlay()
-
-        else:  # Last map -> Thank You Screen
-            self.right_panel.setCurrentWidget(self.pages[7])
-            self.map_label.hide()
-            self.set_fullscreen_layout()
-
-
-
-    def previous_screen(self):
+        self.toggle_overlay()
+        if self.current_index != prev_map and self.current_index >= 0:
+            self.latency.begin("map", time.perf_counter_ns() if cause_t is None else cause_t,
+                               ready=self.shown_map_key in self.map_cache.pixmaps)
+
+    def request_step(self, index, cause_t=None):
+        """Goes to step `index`, on both stations when they are linked."""
+        if self.sync is None:
+            self.go_to(index, cause_t)
+        elif index != self.step:
+            self.sync.announce(index)
+
+    def on_remote_step(self, index, apply_at):
+        """A step change from the sync service; switches at the agreed time."""
+        if not 0 <= index < len(self.timeline.steps):  # E.g. the partner runs another timeline
+            self.log.log("sync_error", error="unknown step", step=index)
+            return
+        delay_ms = max(0, round((apply_at - time.perf_counter_ns()) / 1e6))
+        QTimer.singleShot(delay_ms, Qt.TimerType.PreciseTimer, lambda: self.apply_remote_step(index, apply_at))
+
+    def apply_remote_step(self, index, apply_at):
+        """Switches to a step from the sync service and logs the switch as a "sync_step" event.
+
+        In sync mode SPACE/ Q only ask for a step, so their "key" events still
+        show the step before; analyze.py splits trials on these events instead.
+        """
+        t = time.perf_counter_ns()
+        self.go_to(index, apply_at)
+        self.log.log("sync_step", t=t, step=index, page=self.page_index(), map_index=self.current_index,
+                     overlay=self.game() is not None and not self.game().overlay.isHidden(),
+                     apply_at=apply_at, shared_apply_at=self.sync.shared_time(apply_at))
+
+    def next_screen(self, cause_t=None):
+        """SPACE: moves to the next step of the timeline."""
+        self.request_step(self.timeline.next[self.step], cause_t)
+
+    def previous_screen(self, cause_t=None):
         """Handles going back to the previous page when 'Q' is pressed."""
-        current_widget = self.right_panel.currentWidget()
+        self.request_step(self.timeline.back[self.step], cause_t)
 
-        if current_widget == self.pages[0]:  # Already on the first page (Welcome)
-            return  # Do nothing, can't go back from Welcome
 
-        elif current_widget == self.pages[1]:  # Detailed Instructions -> Welcome
-            self.right_panel.setCurrentWidget(self.pages[0])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[2]:  # 2048 Image -> Detailed Instructions
-            self.right_panel.setCurrentWidget(self.pages[1])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[3]:  # New Page 1 -> 2048 Image
-            self.right_panel.setCurrentWidget(self.pages[2])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[4]:  # New Page 2 -> New Page 1
-            self.right_panel.setCurrentWidget(self.pages[3])
-            self.set_fullscreen_layout()
 
-        elif current_widget == self.pages[5]:  # Start Page -> New Page 2
-            self.right_panel.setCurrentWidget(self.pages[4])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[6]:  # 2048 Game -> Start Page
-            self.right_panel.setCurrentWidget(self.pages[5])
-            self.set_fullscreen_layout()
-
-        elif current_widget == self.pages[7]:  # Thank You -> Last 2048 Game Page
-            self.right_panel.setCurrentWidget(self.pages[6])
-            self.set_split_layout()
+    def keyPressEvent(self, event):
+        t = time.perf_counter_ns()
+        key = event.key()
+        prev_page = self.page_index()
+        prev_step = self.step
+
+        if (key in (Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up, Qt.Key.Key_Down)
+                and self.timeline.steps[self.step].page == self.timeline.game_page):  # 2048 Game Page
+            # Applied and logged on the move thread; the board repaints through on_board_moved
+            self.moves.submit(KEY_NAMES[key], t, event.isAutoRepeat(), {
+                "auto_repeat": event.isAutoRepeat(), "prev_step": prev_step, "step": prev_step,
+                "prev_page": prev_page, "page": prev_page, "map_index": self.current_index,
+                "overlay": not self.game().overlay.isHidden()})
+            return
+
+        if self.moves is not None:
+            self.moves.drain()  # Earlier moves are logged before this key
+        if key == Qt.Key.Key_Space:
+            self.next_screen(t)
+        elif key == Qt.Key.Key_Q:
+            self.previous_screen(t)
+
+        self.log.log("key", t=t, key=KEY_NAMES.get(key, event.text() or int(key)), auto_repeat=event.isAutoRepeat(),
+                     prev_step=prev_step, step=self.step, prev_page=prev_page, page=self.page_index(),
+                     map_index=self.current_index, overlay=self.game() is not None and not self.game().overlay.isHidden())
+
+    def on_board_moved(self):
+        """Shows the latest board from the move thread; a lone move is animated."""
+        latest = self.moves.take()
+        if latest is not None:
+            key_t, model_t, moves = latest
+            self.latency.begin("board", key_t, model_t)
+            if len(moves) == 1:
+                self.game().animate_move(*moves[0])
+            else:
+                self.game().update_grid(moves[-1][2])  # The board after the last move taken
 
+    def closeEvent(self, event):
+        """Makes sure every logged event reaches the disk before the window closes."""
+        if self.sync is not None:
+            self.sync.stop()
+        self.map_label.end_stroke()
+        if self.moves is not None:
+            self.moves.close()
+            self.log.log("input", policy=self.repeat_policy, **self.moves.counts)
+        if self.hasher.is_alive():
+            self.hasher.join()
+        self.log.log("latency", **self.latency.summary())
+        self.log.log("images", **self.budget.summary())
+        self.log.log("session_end", wall_time=time.time())
+        self.log.close()
+        self.map_cache.wait()
+        super().closeEvent(event)
 
 
-    def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_Space:
-            self.next_screen()
-        elif event.key() == Qt.Key.Key_Q:
-            self.previous_screen()
-        elif self.right_panel.currentWidget() == self.pages[6]:  # 2048 Game Page
-            if event.key() == Qt.Key.Key_Left:
-                self.pages[6].move("left")
-            elif event.key() == Qt.Key.Key_Right:
-                self.pages[6].move("right")
-            elif event.key() == Qt.Key.Key_Up:
-                self.pages[6].move("up")
-            elif event.key() == Qt.Key.Key_Down:
-                self.pages[6].move("down")
 
 
+def _address(text):
+    host, _, port = text.partition(":")
+    return host, int(port) if port else DEFAULT_PORT
 
 
 if __name__ == "__main__":
+    # Every pointer sample reaches the route layer, not one per frame
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_CompressHighFrequencyEvents, False)
     app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description="2048 & Maps experiment")
+    parser.add_argument("--timeline", default=timeline.TIMELINE_FILE)
+    parser.add_argument("--repeat", choices=POLICIES, default=DEFAULT_POLICY,
+                        help="what to do with auto-repeated arrow keys (see inputqueue.py)")
+    parser.add_argument("--image-budget-mb", type=float, default=IMAGE_BUDGET / 2 ** 20,
+                        help="memory for maps, image pages and tiles together")
+    link = parser.add_mutually_exclusive_group()
+    link.add_argument("--coordinate", type=int, nargs="?", const=DEFAULT_PORT, metavar="PORT",
+                      help="keep the partner's station in sync, listening on this port")
+    link.add_argument("--follow", type=_address, metavar="HOST[:PORT]", help="follow the coordinating station")
+    args = parser.parse_args(app.arguments()[1:])
+    sync = None
+    if args.coordinate is not None:
+        sync = SyncStation(True, "0.0.0.0", args.coordinate)
+    elif args.follow:
+        sync = SyncStation(False, *args.follow)
+    window = MainWindow(args.timeline, sync, args.repeat, int(args.image_budget_mb * 2 ** 20))
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""Background map decoding with a cache of scaled pixmaps.
+
+Maps are decoded and scaled to the label size on a QThreadPool worker, as a
+QImage (QPixmap can only be made on the GUI thread). The GUI thread converts
+the result to a QPixmap once and keeps it, keyed by (path, width, height,
+device pixel ratio). With the next map prefetched while the current one is
+shown, a map transition just swaps in a ready pixmap.
+
+Memory is accounted in a PixmapBudget (pixmapbudget.py), shared with the
+other images of the experiment, which evicts maps by how far their timeline
+steps are from the current one. Maps with no steps set in `steps` go first,
+least recently used first. The pixmap the map label holds (see show()) is
+never evicted, since evicting it would free nothing, and copies of the shown
+map at other sizes, left over from resizes, are dropped as soon as it changes.
+
+If the map was compiled for this size with assetcache.py, the worker reads the
+pre-scaled pixels instead of decoding and scaling the PNG.
+"""
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+
+from pixmapbudget import PixmapBudget, pixmap_bytes
+
+POOL = "maps"
+
+
+class _JobSignals(QObject):
+    done = pyqtSignal(object, QImage)
+
+
+class _ScaleJob(QRunnable):
+    def __init__(self, key, signals, assets):
+        super().__init__()
+        self.key = key
+        self.signals = signals
+        self.assets = assets
+
+    def run(self):
+        path, width, height, dpr = self.key
+        if self.assets is not None:
+            image = self.assets.load_image(path, width, height, dpr)
+            if image is not None:
+                self.signals.done.emit(self.key, image)
+                return
+        image = QImage(path)
+        if not image.isNull():
+            image = image.scaled(round(width * dpr), round(height * dpr),
+                                 Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        self.signals.done.emit(self.key, image)
+
+
+class MapCache(QObject):
+    """Scaled map pixmaps, filled from a background thread pool.
+
+    ready is emitted with the key once a requested pixmap is in the cache.
+    """
+
+    ready = pyqtSignal(object)
+
+    def __init__(self, budget=None, assets=None, parent=None):
+        super().__init__(parent)
+        self.budget = budget if budget is not None else PixmapBudget()
+        self.assets = assets  # Optional assetcache.CompiledAssets
+        self.steps = {}  # Map path -> timeline steps it is shown on
+        self.pixmaps = {}
+        self.shown = None  # Key of the pixmap the map label holds
+        self.pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.signals = _JobSignals()
+        self.signals.done.connect(self._on_done)
+
+    @staticmethod
+    def key(path, size, dpr):
+        return (path, size.width(), size.height(), dpr)
+
+    def get(self, key):
+        """Returns the cached pixmap for key, or None (counted as a hit or a miss)."""
+        self.budget.touch(POOL, key)
+        return self.pixmaps.get(key)
+
+    def request(self, key):
+        """Starts decoding key in the background unless it is cached or on its way."""
+        if key in self.pixmaps or key in self.pending:
+            return
+        self.pending.add(key)
+        self.pool.start(_ScaleJob(key, self.signals, self.assets))
+
+    def _on_done(self, key, image):
+        self.pending.discard(key)
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(key[3])
+        self.pixmaps[key] = pixmap
+        self.budget.add(POOL, key, pixmap_bytes(pixmap), self.steps.get(key[0], ()), self._evicted)
+        self.ready.emit(key)
+
+    def show(self, key):
+        """The map label now holds the pixmap of key (None: no pixmap)."""
+        previous, self.shown = self.shown, key
+        if key is not None:
+            self.budget.pin(POOL, key)
+            for stale in [k for k in self.pixmaps if k[0] == key[0] and k != key]:
+                del self.pixmaps[stale]
+                self.budget.discard(POOL, stale)
+        if previous is not None and previous != key:
+            self.budget.unpin(POOL, previous)  # Counted up to now, evictable from here on
+
+    def _evicted(self, key):
+        self.pixmaps.pop(key, None)
+
+    def clear(self):
+        """Drops every cached map."""
+        for key in self.pixmaps:
+            self.budget.discard(POOL, key)
+        self.pixmaps.clear()
+
+    def wait(self):
+        """Blocks until every queued decode has finished (used on shutdown)."""
+        self.pool.waitForDone()
@@ -0,0 +1,272 @@
+"""Finds the differences between the speaker's and the listener's version of a map.
+
+The partners see "maps of the same locations, with some slight differences":
+an original map and an edited variant (NAME.png and NAME_Edited_v1.png, or
+two versions of the edit). Images are grouped by that base name across the
+folders given, and each variant is compared with the group's reference (the
+unedited file, or else the lowest version). With --reference FOLDER, every
+map in the folders is compared with the map of the same base name in FOLDER
+instead (e.g. the speaker's copies of maps/).
+
+Each image is decoded once into an RGBA .npy file in diff_cache/ (keyed by
+its SHA-256) and opened memory-mapped, so big maps are paged in rather than
+held in memory, and re-runs skip the PNG decoding. The comparison is all
+NumPy, one band of --tile rows at a time so only that band is paged in and
+widened: a pixel differs when a channel moves by more than --threshold, the
+image is cut into --tile x --tile pixel tiles, a tile differs when at least
+--min-pixels of its pixels do, and differing tiles touching each other
+(8-neighbourhood) form one region, labelled by vectorised label propagation.
+Each region is exported with its bounding box (whole tiles, cut at the image
+edge), the centroid of its changed pixels, number of changed pixels and
+tiles, and mean change.
+
+Pairs are compared in parallel over all CPU cores:
+    python mapdiff.py maps speaker_maps --output differences.json
+    python mapdiff.py maps --reference speaker_maps
+
+If the variant's entry in the stimulus index (stimuli.py) has an
+"expected_differences" metadata field, the region count is checked against
+it and mismatches are reported, with exit status 1. Finding no pairs at all
+exits with status 2.
+
+Requires NumPy.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from PyQt6.QtGui import QImage
+
+import stimuli
+
+CACHE_FOLDER = "diff_cache"
+TILE = 16
+THRESHOLD = 24  # Largest per-channel change that still counts as the same pixel (compression noise)
+MIN_PIXELS = 4  # Changed pixels for a tile to count as changed
+_VARIANT = re.compile(r"^(?P<base>.+?)(?:_Edited)?(?:_v(?P<version>\d+))?$")
+
+
+def variant_key(path):
+    """(base name, edited, version) of a map file, e.g. ("Sofi64", True, 1) for Sofi64_Edited_v1.png."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = _VARIANT.match(name)
+    return match["base"], "_Edited" in name, int(match["version"] or 0)
+
+
+def find_pairs(folders, reference=None):
+    """(reference, variant) path pairs from the images in folders.
+
+    With a reference folder, each image is paired with the image of the same
+    base name there (its lowest version, if there are several).
+    """
+    groups = {}
+    for folder in folders:
+        for path in stimuli.scan(folder):
+            groups.setdefault(variant_key(path)[0], []).append(path)
+    if reference is not None:
+        references = {}
+        for path in sorted(stimuli.scan(reference), key=lambda path: variant_key(path)[1:], reverse=True):
+            references[variant_key(path)[0]] = path
+        return [(references[base], path) for base in sorted(groups) if base in references
+                for path in sorted(groups[base]) if path != references[base]]
+    pairs = []
+    for base in sorted(groups):
+        paths = sorted(groups[base], key=lambda path: variant_key(path)[1:])
+        pairs.extend((paths[0], path) for path in paths[1:])
+    return pairs
+
+
+def load_rgba(path, folder=CACHE_FOLDER):
+    """The image as an (height, width, 4) uint8 array, memory-mapped from the decode cache."""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cached = os.path.join(folder, digest[:32] + ".npy")
+    if not os.path.exists(cached):
+        image = QImage(path)
+        if image.isNull():
+            raise ValueError(f"could not decode {path}")
+        image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+        width, height = image.width(), image.height()
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        rows = np.frombuffer(bits, np.uint8).reshape(height, image.bytesPerLine())
+        os.makedirs(folder, exist_ok=True)
+        out = np.lib.format.open_memmap(cached + ".tmp", "w+", np.uint8, (height, width, 4))
+        out[:] = rows[:, :width * 4].reshape(height, width, 4)
+        out.flush()
+        del out
+        os.replace(cached + ".tmp", cached)
+    return np.load(cached, mmap_mode="r")
+
+
+def tile_counts(a, b, tile=TILE, threshold=THRESHOLD):
+    """Per tile (tile rows x tile columns): changed pixels, the sum of their largest channel change,
+    and the sums of their x and y pixel coordinates.
+
+    The images are read one band of tile rows at a time.
+    """
+    height, width = a.shape[:2]
+    rows, cols = -(-height // tile), -(-width // tile)
+    pad = ((0, 0), (0, cols * tile - width))
+    counts, change, x_sum, y_sum = (np.zeros((rows, cols), np.int64) for _ in range(4))
+    x = np.arange(width)
+    for row in range(rows):
+        top = row * tile
+        band = np.abs(a[top:top + tile].astype(np.int16) - b[top:top + tile].astype(np.int16)).max(axis=2)
+        changed = band > threshold
+        y = np.arange(top, top + len(band))[:, None]
+        for out, values in ((counts, changed), (change, np.where(changed, band, 0)),
+                            (x_sum, np.where(changed, x, 0)), (y_sum, np.where(changed, y, 0))):
+            out[row] = np.pad(values, pad).reshape(len(band), cols, tile).sum(axis=(0, 2), dtype=np.int64)
+    return counts, change, x_sum, y_sum
+
+
+def label_regions(mask):
+    """Labels the 8-connected regions of a 2D bool mask; 0 is background, regions are 1..n."""
+    rows, cols = mask.shape
+    background = rows * cols
+    labels = np.where(mask, np.arange(background).reshape(rows, cols), background)
+    padded = np.full((rows + 2, cols + 2), background)
+    while True:
+        padded[1:-1, 1:-1] = labels
+        neighbours = np.stack([padded[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx]
+                               for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+        new = np.where(mask, neighbours.min(axis=0), background)
+        # Pointer jumping: follow every label to the label its own cell has, so chains collapse quickly
+        flat = np.append(new.ravel(), background)
+        new = np.where(mask, flat[flat[new]], background)
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    _, compact = np.unique(labels, return_inverse=True)
+    compact = compact.reshape(rows, cols) + 1
+    return np.where(mask, compact, 0), int(compact[mask].max(initial=0))
+
+
+def regions(counts, change, x_sum, y_sum, tile=TILE, min_pixels=MIN_PIXELS):
+    """Connected regions of changed tiles as dicts, largest first (see tile_counts for the arguments)."""
+    mask = counts >= min_pixels
+    labels, n = label_regions(mask)
+    if n == 0:
+        return []
+    ids = labels[mask]
+    ys, xs = np.nonzero(mask)
+    pixels = counts[mask]
+    index = ids - 1
+    pixel_total = np.bincount(index, pixels, n)
+    change_total = np.bincount(index, change[mask], n)
+    tiles = np.bincount(index, minlength=n)
+    # Pixel centres are at +0.5
+    centre_x = np.bincount(index, x_sum[mask], n) / pixel_total + 0.5
+    centre_y = np.bincount(index, y_sum[mask], n) / pixel_total + 0.5
+    x0 = np.full(n, xs.max() + 1)
+    y0 = np.full(n, ys.max() + 1)
+    x1 = np.zeros(n, int)
+    y1 = np.zeros(n, int)
+    np.minimum.at(x0, index, xs)
+    np.minimum.at(y0, index, ys)
+    np.maximum.at(x1, index, xs + 1)
+    np.maximum.at(y1, index, ys + 1)
+    result = [{
+        "bbox": [int(x0[k]) * tile, int(y0[k]) * tile, int(x1[k]) * tile, int(y1[k]) * tile],
+        "centroid": [round(float(centre_x[k]), 1), round(float(centre_y[k]), 1)],
+        "pixels": int(pixel_total[k]),
+        "tiles": int(tiles[k]),
+        "mean_change": round(float(change_total[k] / pixel_total[k]), 1),
+    } for k in range(n)]
+    result.sort(key=lambda region: region["pixels"], reverse=True)
+    return result
+
+
+def compare(pair, tile=TILE, threshold=THRESHOLD, min_pixels=MIN_PIXELS, folder=CACHE_FOLDER):
+    """Differences between a reference map and its variant, as a dict."""
+    reference, variant = pair
+    result = {"reference": reference, "variant": variant}
+    try:
+        a = load_rgba(reference, folder)
+        b = load_rgba(variant, folder)
+    except (OSError, ValueError) as error:
+        return {**result, "error": str(error)}
+    if a.shape != b.shape:
+        return {**result, "error": f"sizes differ: {a.shape[1]}x{a.shape[0]} vs {b.shape[1]}x{b.shape[0]}"}
+    counts, change, x_sum, y_sum = tile_counts(a, b, tile, threshold)
+    found = regions(counts, change, x_sum, y_sum, tile, min_pixels)
+    # Bounding boxes stop at the image edge
+    for region in found:
+        region["bbox"][2] = min(region["bbox"][2], a.shape[1])
+        region["bbox"][3] = min(region["bbox"][3], a.shape[0])
+    return {**result, "size": [a.shape[1], a.shape[0]], "changed_pixels": int(counts.sum()),
+            "changed_tiles": int((counts >= min_pixels).sum()), "regions": found}
+
+
+def _compare_task(args):
+    return compare(*args)
+
+
+def expected_differences(path):
+    """The "expected_differences" metadata of path in its folder's stimulus index, or None."""
+    for entry in stimuli.load(os.path.dirname(path)) or []:
+        if os.path.normpath(entry["path"]) == os.path.normpath(path):
+            value = entry.get("meta", {}).get("expected_differences")
+            return None if value in (None, "") else int(value)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find the differences between map variants")
+    parser.add_argument("folders", nargs="+", help="folders with the maps (all versions of a map are paired up)")
+    parser.add_argument("--reference", help="folder with the reference maps, paired with the maps of the "
+                                            "same base name in the folders")
+    parser.add_argument("--tile", type=int, default=TILE, help="tile size in pixels")
+    parser.add_argument("--threshold", type=int, default=THRESHOLD, help="per-channel change a pixel may have")
+    parser.add_argument("--min-pixels", type=int, default=MIN_PIXELS, help="changed pixels for a tile to count")
+    parser.add_argument("--cache", default=CACHE_FOLDER)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="write the regions of every pair as JSON here")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    pairs = find_pairs(args.folders, args.reference)
+    if not pairs:
+        if args.reference:
+            print(f"no map pairs found (no map in {', '.join(args.folders)} has the base name of one in "
+                  f"{args.reference})", file=sys.stderr)
+        else:
+            print("no map pairs found (expected NAME.png next to NAME_Edited_v1.png, or several versions; "
+                  "or give the originals with --reference FOLDER)", file=sys.stderr)
+        return 2
+    tasks = [(pair, args.tile, args.threshold, args.min_pixels, args.cache) for pair in pairs]
+    with Pool(min(args.workers, len(tasks))) as pool:
+        results = pool.map(_compare_task, tasks)
+
+    mismatches = 0
+    for result in results:
+        if "error" in result:
+            mismatches += 1
+            print(f"{result['variant']}: {result['error']}")
+            continue
+        expected = expected_differences(result["variant"])
+        result["expected_differences"] = expected
+        count = len(result["regions"])
+        status = ""
+        if expected is not None:
+            status = "ok" if count == expected else f"MISMATCH, expected {expected}"
+            mismatches += count != expected
+        print(f"{result['variant']} vs {result['reference']}: {count} regions, "
+              f"{result['changed_pixels']} pixels changed {status}".rstrip())
+    print(f"{len(results)} pairs in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"tile": args.tile, "threshold": args.threshold, "min_pixels": args.min_pixels,
+                       "pairs": results}, f, indent=1)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
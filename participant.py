@@ -0,0 +1,253 @@
+"""Synthetic participant: drives MainWindow through the protocol with real key events.
+
+Each session opens a MainWindow and posts QKeyEvents to it, as a keyboard
+would: SPACE through the instruction pages, bursts of arrow keys during the
+map trials (held keys are sent as auto-repeats, like a key held down), and
+now and then Q to go back a block. Keys are posted at a configurable rate,
+which can be well above the keyboard's auto-repeat rate to stress the event
+loop.
+
+For every key press it records how long the event waited in the queue
+(posted to dispatched) and how long MainWindow took to handle it, in
+latency.py histograms, next to the window's own keypress-to-screen onsets.
+Between sessions it reports the process's memory, live widgets and Python
+objects, so resource growth across many sessions shows up.
+
+    python participant.py --sessions 200 --rate 30 --output bot.json
+    python participant.py --sessions 5 --rate 500 --burst 50 --keep-logs
+
+Runs under the offscreen Qt platform unless QT_QPA_PLATFORM says otherwise.
+With --keep-logs the session logs go to logs/, one file per session (listed
+in the reports), and can be checked with replay.py and analyze.py like real
+ones; otherwise they go to a scratch folder that is removed at the end.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QEvent, QEventLoop, QObject, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtWidgets import QApplication
+
+import mainqt
+from latency import LatencyHistogram
+
+ARROWS = (Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up, Qt.Key.Key_Down)
+TICK_MS = 1  # Driver timer; keys due since the last tick are all posted at once
+
+
+def rss_kb():
+    """Current resident set size of this process (peak size where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Participant(QObject):
+    """Plays one session in a MainWindow; finished is emitted at the last step.
+
+    rate is key presses per second during the arrow bursts, burst the number
+    of presses per burst (all but the first are auto-repeats), pause_ms the
+    gap between bursts, trial_keys the presses per map trial, dwell_ms the
+    time spent reading each page before SPACE, and backs how many times Q is
+    pressed during the session.
+    """
+
+    finished = pyqtSignal()
+
+    def __init__(self, window, rng, rate=30, burst=8, pause_ms=150, trial_keys=40, dwell_ms=50, backs=1):
+        super().__init__()
+        self.window = window
+        self.rng = rng
+        self.interval_ns = int(1e9 / rate)
+        self.burst = burst
+        self.pause_ns = int(pause_ms * 1e6)
+        self.trial_keys = trial_keys
+        self.dwell_ns = int(dwell_ms * 1e6)
+        self.backs = backs
+        self.back_steps = self._pick_back_steps()
+
+        self.queue_wait = LatencyHistogram()  # Posted to dispatched
+        self.handling = LatencyHistogram()  # Time in MainWindow's key handling
+        self.keys = 0
+        self.posted = {}  # id of a posted press -> post time
+        self.waiting = False  # SPACE or Q posted and not handled yet
+        self.trial_posted = 0  # Arrow presses posted on the current step
+        self.burst_left = 0
+        self.direction = None
+        self.next_t = time.perf_counter_ns() + self.dwell_ns
+        self.done = False
+
+        window.installEventFilter(self)
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+    def _pick_back_steps(self):
+        trials = [i for i, step in enumerate(self.window.timeline.steps) if step.map is not None]
+        return set(self.rng.sample(trials, min(self.backs, len(trials))))
+
+    def start(self):
+        self.timer.start(TICK_MS)
+
+    def post(self, key, auto_repeat=False, text=""):
+        event = QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.NoModifier, text, auto_repeat)
+        self.posted[id(event)] = time.perf_counter_ns()
+        QApplication.postEvent(self.window, event)
+        self.keys += 1
+
+    def release(self, key):
+        QApplication.postEvent(self.window, QKeyEvent(QEvent.Type.KeyRelease, key, Qt.KeyboardModifier.NoModifier))
+
+    def eventFilter(self, watched, event):
+        if watched is self.window and event.type() == QEvent.Type.KeyPress:
+            t = time.perf_counter_ns()
+            posted = self.posted.pop(id(event), None)
+            watched.event(event)  # MainWindow.keyPressEvent, timed here
+            self.handling.add(time.perf_counter_ns() - t)
+            if posted is not None:
+                self.queue_wait.add(t - posted)
+            if event.key() not in ARROWS:
+                self.waiting = False
+            return True
+        return False
+
+    def tick(self):
+        now = time.perf_counter_ns()
+        while not self.done and not self.waiting and now >= self.next_t:
+            self.act()
+
+    def act(self):
+        """Posts the next key press and schedules the one after it."""
+        window = self.window
+        step = window.step
+        on_trial = window.timeline.steps[step].page == window.timeline.game_page
+        if on_trial and self.trial_posted < self.trial_keys:
+            if self.burst_left == 0:
+                self.direction = self.rng.choice(ARROWS)
+                self.burst_left = self.burst
+            self.post(self.direction, auto_repeat=self.burst_left < self.burst)
+            self.trial_posted += 1
+            self.burst_left -= 1
+            self.next_t += self.interval_ns
+            if self.burst_left == 0 or self.trial_posted == self.trial_keys:
+                self.release(self.direction)
+                self.burst_left = 0
+                self.next_t += self.pause_ns
+            return
+        if window.timeline.next[step] == step:
+            self.finish()
+            return
+        if step in self.back_steps:
+            self.back_steps.discard(step)
+            self.post(Qt.Key.Key_Q, text="q")
+        else:
+            self.post(Qt.Key.Key_Space, text=" ")
+        self.waiting = True
+        self.trial_posted = 0
+        self.next_t = time.perf_counter_ns() + self.dwell_ns
+
+    def finish(self):
+        self.done = True
+        self.timer.stop()
+        self.window.removeEventFilter(self)
+        self.finished.emit()
+
+
+def run_session(app, index, args):
+    """One synthetic session; returns its report."""
+    window = mainqt.MainWindow(args.timeline, repeat_policy=args.repeat,
+                               image_budget=int(args.image_budget_mb * 2 ** 20))
+    window.show()
+    participant = Participant(window, random.Random(args.seed + index), args.rate, args.burst, args.pause_ms,
+                              args.trial_keys, args.dwell_ms, args.backs)
+    loop = QEventLoop()
+    participant.finished.connect(loop.quit)
+    started = time.perf_counter()
+    participant.start()
+    QTimer.singleShot(int(args.timeout * 1000), loop.quit)
+    loop.exec()
+    seconds = time.perf_counter() - started
+
+    report = {
+        "session": index,
+        "completed": participant.done,
+        "seconds": round(seconds, 3),
+        "keys": participant.keys,
+        "queue_wait": participant.queue_wait.summary(),
+        "handling": participant.handling.summary(),
+        "onsets": window.latency.summary(),
+        "images": window.budget.summary(),
+        "log": window.log.path,
+    }
+    window.close()
+    window.deleteLater()
+    app.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    gc.collect()
+    report["rss_kb"] = rss_kb()
+    report["widgets"] = len(app.allWidgets())
+    report["objects"] = len(gc.get_objects())
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the experiment with a synthetic participant")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=30, help="arrow key presses per second in a burst")
+    parser.add_argument("--burst", type=int, default=8, help="presses per burst (held key)")
+    parser.add_argument("--pause-ms", type=float, default=150, help="gap between bursts")
+    parser.add_argument("--trial-keys", type=int, default=40, help="arrow presses per map trial")
+    parser.add_argument("--dwell-ms", type=float, default=50, help="time on each page before SPACE")
+    parser.add_argument("--backs", type=int, default=1, help="Q presses per session")
+    parser.add_argument("--repeat", choices=mainqt.POLICIES, default=mainqt.DEFAULT_POLICY,
+                        help="MainWindow's auto-repeat policy (see inputqueue.py)")
+    parser.add_argument("--image-budget-mb", type=float, default=mainqt.IMAGE_BUDGET / 2 ** 20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeline", default=mainqt.timeline.TIMELINE_FILE)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a session is abandoned")
+    parser.add_argument("--keep-logs", action="store_true", help="write session logs to logs/ instead of a temp folder")
+    parser.add_argument("--output", help="write the per-session reports as JSON here")
+    args = parser.parse_args(argv)
+
+    app = QApplication(sys.argv[:1])
+    reports = []
+    # Every session gets a log file of its own (see eventlog.unique_path), even several per second
+    with tempfile.TemporaryDirectory(prefix="participant_logs_") as scratch:
+        if not args.keep_logs:
+            mainqt.LOG_FOLDER = scratch
+        for index in range(args.sessions):
+            report = run_session(app, index, args)
+            reports.append(report)
+            handling = report["handling"]
+            board = report["onsets"]["board"]["flush"]
+            print(f"session {index}: {'ok' if report['completed'] else 'TIMED OUT'}, {report['keys']} keys in "
+                  f"{report['seconds']:.1f} s, handling p95 {handling.get('p95_ms', 0):.2f} ms "
+                  f"max {handling.get('max_ms', 0):.2f} ms, queue p95 {report['queue_wait'].get('p95_ms', 0):.2f} ms, "
+                  f"board onset p95 {board.get('p95_ms', 0):.2f} ms, images {report['images']['peak_bytes'] / 2 ** 20:.1f} MB peak, "
+                  f"rss {report['rss_kb'] / 1024:.1f} MB, "
+                  f"widgets {report['widgets']}", file=sys.stderr)
+        if args.keep_logs:
+            print("logs: " + " ".join(report["log"] for report in reports), file=sys.stderr)
+
+    first, last = reports[0], reports[-1]
+    print(f"{len(reports)} sessions, {sum(not r['completed'] for r in reports)} timed out; growth from session 0: "
+          f"rss {(last['rss_kb'] - first['rss_kb']) / 1024:+.1f} MB, widgets {last['widgets'] - first['widgets']:+d}, "
+          f"objects {last['objects'] - first['objects']:+d}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "sessions": reports}, f, indent=2)
+    return 0 if all(r["completed"] for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
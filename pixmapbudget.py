@@ -0,0 +1,142 @@
+"""One memory budget for every pixmap the experiment keeps around.
+
+Maps (mapcache.py), image pages and the 2048 tile pixmaps each keep their own
+dict of pixmaps, but register every entry here with its size in bytes and
+the timeline steps it is shown on. When the total goes over the budget, the
+entries furthest from the participant's current step are evicted first
+(steps behind count double, since participants rarely go back), oldest use
+first among equals; the owning cache is told through its on_evict callback.
+Entries needed on the current step are never evicted, nor are pinned entries
+(a pixmap still on screen, see MapCache.show), so a step that alone needs
+more than the budget just runs over it (counted in the summary).
+
+summary() reports hits, misses, evictions and resident bytes per pool, which
+MainWindow logs at the end of the session.
+
+No Qt dependency: sizes are passed in bytes (see pixmap_bytes).
+"""
+import itertools
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+BACK_WEIGHT = 2  # A step behind counts as this many steps ahead
+
+
+def pixmap_bytes(pixmap):
+    """Memory used by a QPixmap or QImage."""
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class _Pool:
+    def __init__(self):
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def summary(self, entries):
+        return {"bytes": self.bytes, "entries": entries, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class PixmapBudget:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.over_budget = 0  # Times the budget could not be met without evicting current entries
+        self.position = 0  # Current timeline step
+        self.pools = {}
+        self.entries = {}  # (pool, key) -> [nbytes, steps, on_evict, last use]
+        self.pinned = set()  # (pool, key) of entries on screen, never evicted
+        self._clock = itertools.count()
+
+    def _pool(self, name):
+        pool = self.pools.get(name)
+        if pool is None:
+            pool = self.pools[name] = _Pool()
+        return pool
+
+    def distance(self, steps):
+        """How far the nearest of steps is from the current position (None: needed everywhere)."""
+        if steps is None:
+            return 0
+        return min((s - self.position) if s >= self.position else (self.position - s) * BACK_WEIGHT
+                   for s in steps) if steps else float("inf")
+
+    def room(self, steps):
+        """Bytes an entry shown on steps can take without evicting anything at least as near."""
+        distance = self.distance(steps)
+        return self.max_bytes - sum(nbytes for name, (nbytes, entry_steps, _, _) in self.entries.items()
+                                    if name in self.pinned or self.distance(entry_steps) <= distance)
+
+    def add(self, pool, key, nbytes, steps=None, on_evict=None):
+        """Registers an entry of nbytes shown on steps; may evict others to make room."""
+        self.discard(pool, key)
+        self.entries[pool, key] = [nbytes, steps, on_evict, next(self._clock)]
+        self._pool(pool).bytes += nbytes
+        self.bytes += nbytes
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+        self._evict(keep=(pool, key))
+
+    def touch(self, pool, key):
+        """Counts a lookup as a hit or a miss; hits count as a use for eviction order."""
+        entry = self.entries.get((pool, key))
+        if entry is None:
+            self._pool(pool).misses += 1
+            return False
+        self._pool(pool).hits += 1
+        entry[3] = next(self._clock)
+        return True
+
+    def discard(self, pool, key):
+        """Forgets an entry its cache dropped by itself."""
+        entry = self.entries.pop((pool, key), None)
+        if entry is not None:
+            self._pool(pool).bytes -= entry[0]
+            self.bytes -= entry[0]
+
+    def pin(self, pool, key):
+        """Keeps an entry (once added) from being evicted until unpin()."""
+        self.pinned.add((pool, key))
+
+    def unpin(self, pool, key):
+        self.pinned.discard((pool, key))
+        self._evict()
+
+    def set_position(self, step):
+        """The participant moved to step; evicts by distance from it if over budget."""
+        self.position = step
+        self._evict()
+
+    def _evict(self, keep=None):
+        while self.bytes > self.max_bytes:
+            victim = None
+            worst = None
+            for name, (_, steps, _, used) in self.entries.items():
+                if name == keep or name in self.pinned:
+                    continue
+                distance = self.distance(steps)
+                if distance == 0:
+                    continue
+                if worst is None or (distance, -used) > worst:
+                    victim, worst = name, (distance, -used)
+            if victim is None:
+                self.over_budget += 1
+                return
+            on_evict = self.entries[victim][2]
+            self.discard(*victim)
+            self._pool(victim[0]).evictions += 1
+            if on_evict is not None:
+                on_evict(victim[1])
+
+    def summary(self):
+        counts = {}
+        for pool, _ in self.entries:
+            counts[pool] = counts.get(pool, 0) + 1
+        return {
+            "max_bytes": self.max_bytes,
+            "bytes": self.bytes,
+            "peak_bytes": self.peak_bytes,
+            "over_budget": self.over_budget,
+            "pools": {name: pool.summary(counts.get(name, 0)) for name, pool in self.pools.items()},
+        }
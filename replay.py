@@ -0,0 +1,105 @@
+"""Headless replay of logged 2048 sessions from their spawn seed.
+
+Every game draws its spawns from random.Random(seed) (see bitboard.Grid), and
+the seed and board size are logged in the "game_start" event. Given the seed
+and the arrow keys that reached the game, every board of the session can be
+rebuilt without Qt: 4x4 games with the bitboard engine at a few hundred
+thousand moves per second, other sizes with sizedgrid.py.
+
+This checks logs for integrity (every logged board must match the replay)
+and lets metrics be recomputed after the fact:
+    python replay.py logs/*.jsonl
+
+The replay follows simulate.py's games too: a seed picked there can be fixed
+in timeline.json and replays the same way.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from collections import namedtuple
+
+import bitboard
+import sizedgrid
+
+Replay = namedtuple("Replay", ["boards", "scores"])
+Check = namedtuple("Check", ["path", "seed", "moves", "mismatch", "error"])
+
+
+def replay(seed, directions, size=bitboard.SIZE):
+    """Boards and running scores of a game: the start board, then one per move."""
+    rng = random.Random(seed)
+    if size == bitboard.SIZE:
+        play = bitboard.play
+        board = bitboard.spawn_tile(0, rng)[0]
+        board = bitboard.spawn_tile(board, rng)[0]
+    else:
+        def play(board, direction, rng):
+            return sizedgrid.play(board, size, direction, rng)
+        board = sizedgrid.spawn_tile(0, size, rng)[0]
+        board = sizedgrid.spawn_tile(board, size, rng)[0]
+    score = 0
+    boards = [board]
+    scores = [0]
+    for direction in directions:
+        board, gained, _, _ = play(board, direction, rng)
+        score += gained
+        boards.append(board)
+        scores.append(score)
+    return Replay(boards, scores)
+
+
+def read_session(path):
+    """(game_start event, list of move key events) from a JSON-lines session log."""
+    start = None
+    moves = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            if event["event"] == "game_start":
+                start = event
+            elif event["event"] == "key" and "before" in event:
+                moves.append(event)
+    return start, moves
+
+
+def check(path):
+    """Replays a session log and compares every logged board and score."""
+    start, moves = read_session(path)
+    if start is None:
+        return Check(path, None, len(moves), None, "no game_start event (log from before seeded games)")
+    result = replay(start["seed"], [event["key"] for event in moves], start.get("size", bitboard.SIZE))
+    if result.boards[0] != start["board"]:
+        return Check(path, start["seed"], len(moves), 0, "start board differs")
+    for i, event in enumerate(moves):
+        if (event["before"], event["after"], event["score"]) != (result.boards[i], result.boards[i + 1],
+                                                                 result.scores[i + 1]):
+            return Check(path, start["seed"], len(moves), i + 1, "board differs after this move")
+    return Check(path, start["seed"], len(moves), None, None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay logged 2048 sessions and check their boards")
+    parser.add_argument("logs", nargs="+", help="session .jsonl files")
+    args = parser.parse_args(argv)
+
+    t = time.perf_counter()
+    total = 0
+    failed = 0
+    for path in args.logs:
+        result = check(path)
+        total += result.moves
+        if result.error:
+            failed += 1
+            where = f" (move {result.mismatch})" if result.mismatch is not None else ""
+            print(f"{path}: {result.error}{where}")
+        else:
+            print(f"{path}: ok, {result.moves} moves, seed {result.seed}")
+    elapsed = time.perf_counter() - t
+    print(f"{len(args.logs)} sessions, {total} moves in {elapsed:.2f} s, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Route capture for the map task: pointer samples, buffering and simplification.
+
+While the participant drags on the map, MapLabel appends every pointer
+event (with mouse-move compression off, that is the device's native rate) to
+a RouteBuffer: three preallocated arrays used as a ring, so sampling never
+allocates. The stroke is drawn as it grows, one segment at a time, onto an
+overlay pixmap, so painting costs the same with 10 points or 10,000.
+
+When the stroke ends (or the buffer fills up, or the map changes) the
+samples are drained and simplified, first by dropping points closer than the
+tolerance to the last kept one, then with Douglas-Peucker, and logged in map
+image pixels as a "route" event. A full buffer is flushed as one part of the
+stroke; the next part starts at its last point, so the parts join up.
+
+No Qt dependency.
+"""
+from array import array
+
+CAPACITY = 4096  # Samples per stroke part
+TOLERANCE = 1.0  # Simplification tolerance, in map image pixels
+
+
+class RouteBuffer:
+    """Ring of (t, x, y) pointer samples of the stroke being drawn."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.t = array("q", bytes(8 * capacity))
+        self.x = array("d", bytes(8 * capacity))
+        self.y = array("d", bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def append(self, t, x, y):
+        """Adds a sample; returns True once the buffer is full and has to be drained."""
+        i = (self.start + self.count) % self.capacity
+        self.t[i] = t
+        self.x[i] = x
+        self.y[i] = y
+        self.count += 1
+        return self.count == self.capacity
+
+    def last(self):
+        i = (self.start + self.count - 1) % self.capacity
+        return self.x[i], self.y[i]
+
+    def drain(self, keep_last=False):
+        """(ts, xs, ys) of the buffered samples in order; keep_last leaves the newest in the buffer."""
+        order = [(self.start + k) % self.capacity for k in range(self.count)]
+        samples = ([self.t[i] for i in order], [self.x[i] for i in order], [self.y[i] for i in order])
+        if keep_last and self.count:
+            self.start = order[-1]
+            self.count = 1
+        else:
+            self.start = 0
+            self.count = 0
+        return samples
+
+
+def _radial(xs, ys, tolerance):
+    """Indices of the points at least tolerance away from the previous kept point (ends always kept)."""
+    if len(xs) < 3:
+        return list(range(len(xs)))
+    limit = tolerance * tolerance
+    kept = [0]
+    px, py = xs[0], ys[0]
+    for i in range(1, len(xs) - 1):
+        dx = xs[i] - px
+        dy = ys[i] - py
+        if dx * dx + dy * dy >= limit:
+            kept.append(i)
+            px, py = xs[i], ys[i]
+    kept.append(len(xs) - 1)
+    return kept
+
+
+def _douglas_peucker(xs, ys, indices, tolerance):
+    """Subset of indices kept by Douglas-Peucker (iterative, so long strokes cannot overflow the stack)."""
+    n = len(indices)
+    if n < 3:
+        return indices
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    limit = tolerance * tolerance
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[indices[first]], ys[indices[first]]
+        dx = xs[indices[last]] - ax
+        dy = ys[indices[last]] - ay
+        length = dx * dx + dy * dy
+        worst = -1.0
+        worst_k = None
+        for k in range(first + 1, last):
+            px = xs[indices[k]] - ax
+            py = ys[indices[k]] - ay
+            if length:
+                cross = px * dy - py * dx
+                d = cross * cross / length
+            else:
+                d = px * px + py * py
+            if d > worst:
+                worst, worst_k = d, k
+        if worst_k is not None and worst > limit:
+            keep[worst_k] = True
+            stack.append((first, worst_k))
+            stack.append((worst_k, last))
+    return [index for index, kept in zip(indices, keep) if kept]
+
+
+def simplify(xs, ys, tolerance=TOLERANCE):
+    """Indices of the points that describe the polyline within tolerance."""
+    return _douglas_peucker(xs, ys, _radial(xs, ys, tolerance), tolerance)
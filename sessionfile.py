@@ -0,0 +1,243 @@
+"""Compact binary session files (.lems) for storing and analysing many sessions.
+
+The experiment logs JSON lines as it runs (eventlog.py), which is safe to
+append to mid-session. This converts a finished log into a file where every
+key event is a fixed-width record, stored column by column:
+
+    t (int64 perf_counter_ns), key (code), flags (auto repeat, overlay, move,
+    dropped by the auto-repeat policy),
+    step, page, map, before/ after (packed 64-bit boards, see bitboard.py),
+    score, spawn cell (row * board size + column) and spawn exponent
+
+Each column is split into chunks of CHUNK_RECORDS records that are encoded
+independently. With the "zlib" codec, t and score are delta-encoded within
+the chunk and boards are XORed with the previous board in the column (one
+move only changes a few cells, so most of those bits are zero), then each
+chunk is zlib-compressed. With the "raw" codec every column is one
+aligned, uncompressed array, so SessionFile.column() is a zero-copy
+numpy.memmap of the whole column.
+
+A JSON footer indexes the chunks of every column and the trials (runs of
+records on the same timeline step), so a reader can pull out one trial by
+decoding only the chunks it touches. All other events (session_start,
+startup, onsets, clock, ...) are kept as compressed JSON lines in the same
+file.
+
+    python sessionfile.py logs/*.jsonl             # writes logs/<name>.lems
+    python sessionfile.py --codec raw logs/*.jsonl
+
+The board size comes from the log's game_start event and is kept in the
+footer ("size"). Boards fit the 64-bit columns up to 4x4 (see
+sizedgrid.cell_bits); for bigger boards they are stored as 0 and can be
+rebuilt with replay.py.
+
+Requires NumPy.
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+import bitboard
+import sizedgrid
+
+MAGIC = b"LEMS"
+VERSION = 2  # 1: no board size in the footer (always 4x4), 8-bit spawn cells
+TRAILER = struct.Struct("<Q4s")  # footer offset, magic
+CHUNK_RECORDS = 4096
+CODECS = ("zlib", "raw")
+
+COLUMNS = {
+    "t": "<i8", "key": "u1", "flags": "u1", "step": "<i2", "page": "<i2", "map": "<i2",
+    "before": "<u8", "after": "<u8", "score": "<i8", "spawn_cell": "<i2", "spawn_exponent": "u1",
+}
+DELTA = ("t", "score")
+KEYS = ("space", "q", "left", "right", "up", "down")
+OTHER_KEY = 255
+AUTO_REPEAT, OVERLAY, MOVE, DROPPED = 1, 2, 4, 8
+
+
+def _records(events, size, boards):
+    """Key events of a game on a size x size board -> dict of column arrays."""
+    n = len(events)
+    columns = {name: np.zeros(n, dtype) for name, dtype in COLUMNS.items()}
+    key_codes = {name: code for code, name in enumerate(KEYS)}
+    for i, event in enumerate(events):
+        move = "before" in event
+        columns["t"][i] = event["t"]
+        columns["key"][i] = key_codes.get(event["key"], OTHER_KEY)
+        columns["flags"][i] = ((AUTO_REPEAT if event.get("auto_repeat") else 0) | (OVERLAY if event["overlay"] else 0)
+                               | (MOVE if move else 0) | (DROPPED if event.get("input", "applied") != "applied" else 0))
+        columns["step"][i] = event.get("step", -1)
+        columns["page"][i] = event["page"]
+        columns["map"][i] = event["map_index"]
+        columns["spawn_cell"][i] = -1
+        if move:
+            if boards:
+                columns["before"][i] = event["before"]
+                columns["after"][i] = event["after"]
+            columns["score"][i] = event["score"]
+            spawn = event.get("spawn")
+            if spawn:
+                columns["spawn_cell"][i] = spawn[0] * size + spawn[1]
+                columns["spawn_exponent"][i] = spawn[2].bit_length() - 1
+        elif i:
+            columns["score"][i] = columns["score"][i - 1]
+    return columns
+
+
+def _encode(name, values, previous):
+    """Delta/ XOR encoding of one chunk; previous is the last value of the previous chunk."""
+    if name in DELTA:
+        return np.diff(values, prepend=values.dtype.type(previous))
+    if name in ("before", "after"):
+        return values ^ np.concatenate([[np.uint64(previous)], values[:-1]]).astype(values.dtype)
+    return values
+
+
+def _decode(name, values, previous):
+    if name in DELTA:
+        return np.cumsum(values, dtype=values.dtype) + values.dtype.type(previous)
+    if name in ("before", "after"):
+        out = np.bitwise_xor.accumulate(values)
+        return out ^ np.uint64(previous)
+    return values
+
+
+def _trials(columns):
+    """[step, map, first, stop] for every run of records on the same step (or page and map)."""
+    n = len(columns["t"])
+    if not n:
+        return []
+    state = np.stack([columns["step"], columns["page"], columns["map"]], axis=1)
+    starts = np.flatnonzero(np.concatenate([[True], (state[1:] != state[:-1]).any(axis=1)]))
+    stops = np.concatenate([starts[1:], [n]])
+    return [[int(columns["step"][a]), int(columns["map"][a]), int(a), int(b)] for a, b in zip(starts, stops)]
+
+
+def write(path, events, codec="zlib", chunk_records=CHUNK_RECORDS, level=6):
+    """Writes parsed JSON-lines events (dicts) to a .lems file."""
+    if codec not in CODECS:
+        raise ValueError(f"unknown codec {codec!r}")
+    keys = [e for e in events if e["event"] == "key"]
+    other = [e for e in events if e["event"] != "key"]
+    start = next((e for e in other if e["event"] == "game_start"), None)
+    size = bitboard.SIZE if start is None else start.get("size", bitboard.SIZE)
+    boards = sizedgrid.cell_bits(size) * size * size <= 64
+    columns = _records(keys, size, boards)
+    n = len(keys)
+
+    footer = {"version": VERSION, "codec": codec, "count": n, "chunk_records": chunk_records,
+              "size": size, "boards": boards, "columns": {}, "trials": _trials(columns)}
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for name, dtype in COLUMNS.items():
+            values = columns[name]
+            chunks = []
+            if codec == "raw":
+                f.write(b"\0" * (-f.tell() % 8))  # Keep columns aligned for memmap
+                chunks.append([f.tell(), values.nbytes, 0])
+                f.write(values.tobytes())
+            else:
+                previous = 0
+                for first in range(0, n, chunk_records):
+                    part = values[first:first + chunk_records]
+                    data = zlib.compress(_encode(name, part, previous).tobytes(), level)
+                    # The value before the chunk is stored, so each chunk decodes on its own
+                    chunks.append([f.tell(), len(data), int(previous)])
+                    f.write(data)
+                    previous = part[-1]
+            footer["columns"][name] = {"dtype": dtype, "chunks": chunks}
+        data = zlib.compress("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in other).encode(), level)
+        footer["events"] = [f.tell(), len(data)]
+        f.write(data)
+        offset = f.tell()
+        f.write(json.dumps(footer, separators=(",", ":")).encode())
+        f.write(TRAILER.pack(offset, MAGIC))
+
+
+def convert(jsonl_path, out_path=None, codec="zlib"):
+    with open(jsonl_path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    out_path = out_path or os.path.splitext(jsonl_path)[0] + ".lems"
+    write(out_path, events, codec)
+    return out_path
+
+
+class SessionFile:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"{path} is not a session file")
+            f.seek(-TRAILER.size, os.SEEK_END)
+            offset, magic = TRAILER.unpack(f.read(TRAILER.size))
+            end = f.tell() - TRAILER.size
+            if magic != MAGIC:
+                raise ValueError(f"{path} is truncated")
+            f.seek(offset)
+            self.footer = json.loads(f.read(end - offset))
+        self.count = self.footer["count"]
+        self.codec = self.footer["codec"]
+        self.chunk_records = self.footer["chunk_records"]
+        self.size = self.footer.get("size", bitboard.SIZE)  # Board size; spawn_cell is row * size + column
+        self.trials = self.footer["trials"]  # [step, map, first, stop]
+
+    def column(self, name):
+        """The whole column; a zero-copy memmap for raw files."""
+        info = self.footer["columns"][name]
+        dtype = np.dtype(info["dtype"])
+        if self.codec == "raw":
+            if not self.count:
+                return np.zeros(0, dtype)
+            return np.memmap(self.path, dtype, "r", offset=info["chunks"][0][0], shape=(self.count,))
+        return self.read(name, 0, self.count)
+
+    def read(self, name, start, stop):
+        """Records start:stop of a column, decoding only the chunks they fall in."""
+        info = self.footer["columns"][name]
+        dtype = np.dtype(info["dtype"])
+        if self.codec == "raw":
+            return np.array(self.column(name)[start:stop])
+        first_chunk = start // self.chunk_records
+        last_chunk = max(first_chunk, (stop - 1) // self.chunk_records)
+        parts = []
+        with open(self.path, "rb") as f:
+            for offset, length, previous in info["chunks"][first_chunk:last_chunk + 1]:
+                f.seek(offset)
+                raw = np.frombuffer(zlib.decompress(f.read(length)), dtype)
+                parts.append(_decode(name, raw, previous))
+        values = np.concatenate(parts) if parts else np.zeros(0, dtype)
+        base = first_chunk * self.chunk_records
+        return values[start - base:stop - base]
+
+    def trial(self, index, names=tuple(COLUMNS)):
+        """Columns of trial `index` (an entry of self.trials) as a dict of arrays."""
+        _, _, start, stop = self.trials[index]
+        return {name: self.read(name, start, stop) for name in names}
+
+    def events(self):
+        """All non-key events, as dicts."""
+        offset, length = self.footer["events"]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            text = zlib.decompress(f.read(length)).decode()
+        return [json.loads(line) for line in text.splitlines()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert JSON-lines session logs to compact .lems files")
+    parser.add_argument("logs", nargs="+", help="session .jsonl files")
+    parser.add_argument("--codec", choices=CODECS, default="zlib")
+    args = parser.parse_args(argv)
+    for path in args.logs:
+        out = convert(path, codec=args.codec)
+        print(f"{path} ({os.path.getsize(path)} bytes) -> {out} ({os.path.getsize(out)} bytes)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Headless 2048 simulation for policy and seed calibration.
+
+Plays many games with the bitboard engine (no Qt import) across a
+multiprocessing pool and streams the results into histograms of final score,
+max tile and game length.
+
+Example:
+    python simulate.py --games 1000000 --policy corner --output corner.json
+    python simulate.py --games 5000 --policy expectimax --depth 2 --per-game games.csv
+
+Game i uses random.Random(seed + i) for its spawns, so any single game can be
+replayed from its seed. Policies that need randomness get a separate stream,
+so the spawns for a seed are the same whichever policy plays it.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+import bitboard
+from bitboard import DIRECTIONS
+
+CORNER_ORDER = ("down", "left", "right", "up")  # keeps the big tiles bottom-left
+
+
+def _legal_moves(board):
+    moves = []
+    for direction in DIRECTIONS:
+        new, gained = bitboard.move(board, direction)
+        if new != board:
+            moves.append((direction, new, gained))
+    return moves
+
+
+def random_policy(board, rng):
+    return rng.choice(_legal_moves(board))[0]
+
+
+def greedy_policy(board, rng):
+    """Takes the move with the biggest immediate score, then the most empty cells."""
+    moves = _legal_moves(board)
+    rng.shuffle(moves)
+    return max(moves, key=lambda m: (m[2], bitboard.count_empty(m[1])))[0]
+
+
+def corner_policy(board, rng):
+    for direction in CORNER_ORDER:
+        if bitboard.MOVES[direction](board) != board:
+            return direction
+    return None
+
+
+def make_policy(name, depth=2):
+    if name == "expectimax":
+        # Imported here so the other policies don't pay for the heuristic table
+        from expectimax import MoveScorer
+        scorer = MoveScorer(depth=depth)
+        return lambda board, rng: scorer.best_move(board)
+    return POLICIES[name]
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "corner": corner_policy,
+}
+POLICY_NAMES = sorted(POLICIES) + ["expectimax"]
+
+
+def play_game(policy, seed, max_moves=None):
+    """Plays one game to the end. Returns (score, max_tile, moves)."""
+    rng = random.Random(seed)
+    policy_rng = random.Random(f"policy:{seed}")
+    board = bitboard.spawn_tile(0, rng)[0]
+    board = bitboard.spawn_tile(board, rng)[0]
+    score = 0
+    moves = 0
+    while bitboard.can_move(board) and (max_moves is None or moves < max_moves):
+        board, gained, _, _ = bitboard.play(board, policy(board, policy_rng), rng)
+        score += gained
+        moves += 1
+    return score, bitboard.max_tile(board), moves
+
+
+def _run_chunk(args):
+    policy_name, depth, seeds, max_moves, keep_games = args
+    policy = make_policy(policy_name, depth)
+    games = []
+    scores = Counter()
+    tiles = Counter()
+    lengths = Counter()
+    for seed in seeds:
+        score, tile, moves = play_game(policy, seed, max_moves)
+        scores[score] += 1
+        tiles[tile] += 1
+        lengths[moves] += 1
+        if keep_games:
+            games.append((seed, score, tile, moves))
+    return len(seeds), scores, tiles, lengths, games
+
+
+def _binned(counter, width):
+    binned = Counter()
+    for value, count in counter.items():
+        binned[value // width * width] += count
+    return {str(k): binned[k] for k in sorted(binned)}
+
+
+def _mean(counter):
+    total = sum(counter.values())
+    return sum(k * v for k, v in counter.items()) / total if total else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless 2048 simulation")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--policy", choices=POLICY_NAMES, default="random")
+    parser.add_argument("--depth", type=int, default=2, help="search depth for the expectimax policy")
+    parser.add_argument("--seed", type=int, default=0, help="game i uses seed + i")
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=None, help="games per task (default: auto)")
+    parser.add_argument("--score-bin", type=int, default=256, help="score histogram bin width")
+    parser.add_argument("--length-bin", type=int, default=25, help="game length histogram bin width")
+    parser.add_argument("--output", help="write the summary JSON here instead of stdout")
+    parser.add_argument("--per-game", help="also write seed,score,max_tile,moves rows to this CSV")
+    args = parser.parse_args(argv)
+
+    chunk = args.chunk or max(1, min(1000, args.games // (args.workers * 8) or 1))
+    keep_games = args.per_game is not None
+    tasks = [(args.policy, args.depth, range(start, min(start + chunk, args.seed + args.games)),
+              args.max_moves, keep_games)
+             for start in range(args.seed, args.seed + args.games, chunk)]
+
+    scores = Counter()
+    tiles = Counter()
+    lengths = Counter()
+    done = 0
+    started = time.perf_counter()
+    per_game = open(args.per_game, "w") if keep_games else None
+    try:
+        if per_game:
+            per_game.write("seed,score,max_tile,moves\n")
+        with Pool(args.workers) as pool:
+            for n, s, t, l, games in pool.imap_unordered(_run_chunk, tasks):
+                done += n
+                scores.update(s)
+                tiles.update(t)
+                lengths.update(l)
+                if per_game:
+                    per_game.writelines(f"{seed},{score},{tile},{moves}\n" for seed, score, tile, moves in games)
+                rate = done / (time.perf_counter() - started)
+                print(f"\r{done}/{args.games} games ({rate:.0f}/s)", end="", file=sys.stderr)
+        print(file=sys.stderr)
+    finally:
+        if per_game:
+            per_game.close()
+
+    summary = {
+        "policy": args.policy,
+        "depth": args.depth if args.policy == "expectimax" else None,
+        "games": done,
+        "seeds": [args.seed, args.seed + args.games - 1],
+        "max_moves": args.max_moves,
+        "seconds": round(time.perf_counter() - started, 3),
+        "mean_score": _mean(scores),
+        "mean_moves": _mean(lengths),
+        "max_tile": {str(k): tiles[k] for k in sorted(tiles)},
+        "score": {"bin": args.score_bin, "counts": _binned(scores, args.score_bin)},
+        "moves": {"bin": args.length_bin, "counts": _binned(lengths, args.length_bin)},
+    }
+    text = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""2048 engine for any board size (3x3, 5x5, 8x8, ...).
+
+Same packing as bitboard.py, generalised: the n x n board is one Python int
+with a tile exponent per cell, cell (i, j) at bits b * (n * i + j). Up to
+4x4, b is 4, so a 4x4 board has the same value in both engines. Bigger
+boards get wider cells (see cell_bits), enough for the largest tile the
+board can ever hold (2 ** (n * n + 1)), so they play by the old uncapped
+rules: bitboard.py's 32768 limit only applies to 4x4.
+
+Moves work a line (row or column) at a time through row tables, filled in
+as rows are first seen: complete for widths up to 4 (at most 16 ** 4 rows),
+and least-recently-used caches of ROW_CACHE rows for wider boards, where a
+full table would have 2 ** (b * n) entries and the rows seen keep growing
+over long sessions and replays. Rows repeat a lot within a game, so after the
+first few moves an 8x8 move is mostly 16 cache hits plus the bit shuffling to
+read and write the lines.
+
+The rules match bitboard.py and the old list-of-lists Grid exactly, including
+the order empty cells are counted in for up/down spawns, so SizedGrid(4, seed)
+plays the same game as bitboard.Grid(4, seed), and SizedGrid(n, seed) the
+same game as the old Grid(n) with the same random numbers.
+
+make_grid(size, seed) gives the fast bitboard.Grid for 4x4 and a SizedGrid
+otherwise. No Qt dependency.
+"""
+import functools
+import random
+
+import bitboard
+from bitboard import DIRECTIONS
+
+FULL_TABLE_BITS = 16  # Widest row (in bits) whose table keeps every row
+ROW_CACHE = 4096  # Rows kept per table for wider rows
+
+
+def cell_bits(size):
+    """Bits per cell: 4 up to 4x4, otherwise enough for the exponent of the largest possible tile."""
+    if size <= bitboard.SIZE:
+        return 4
+    return (size * size + 1).bit_length()
+
+
+class _RowTable:
+    """Left/right slide results and score gained for the rows of one board size."""
+
+    def __init__(self, size):
+        self.width = size
+        self.bits = cell_bits(size)
+        self.max_exponent = (1 << self.bits) - 1
+        cache = functools.lru_cache(maxsize=None if self.bits * size <= FULL_TABLE_BITS else ROW_CACHE)
+        self.slide = cache(self._slide)  # (row, reverse) -> (slid row, score gained)
+        self.line_paths = cache(self._line_paths)  # row -> tile paths of a left slide
+
+    def _line(self, row):
+        return [(row >> (self.bits * k)) & self.max_exponent for k in range(self.width)]
+
+    def _slide(self, row, reverse):
+        line = self._line(row)
+        if reverse:
+            result, gained = bitboard._slide_line(line[::-1], self.max_exponent)
+            return _pack(result[::-1], self.bits), gained
+        result, gained = bitboard._slide_line(line, self.max_exponent)
+        return _pack(result, self.bits), gained
+
+    def _line_paths(self, row):
+        return bitboard._line_paths(self._line(row), self.max_exponent)
+
+
+_TABLES = {}
+
+
+def row_table(size):
+    table = _TABLES.get(size)
+    if table is None:
+        table = _TABLES[size] = _RowTable(size)
+    return table
+
+
+def _pack(line, bits=4):
+    row = 0
+    for k, exponent in enumerate(line):
+        row |= exponent << (bits * k)
+    return row
+
+
+_CELL_ONES = {}
+
+
+def cell_ones(size):
+    """Mask with the low bit of every cell set."""
+    ones = _CELL_ONES.get(size)
+    if ones is None:
+        ones = _CELL_ONES[size] = _pack([1] * (size * size), cell_bits(size))
+    return ones
+
+
+def rows(board, size):
+    width = cell_bits(size) * size
+    mask = (1 << width) - 1
+    return [(board >> (width * i)) & mask for i in range(size)]
+
+
+def from_rows(lines, size):
+    width = cell_bits(size) * size
+    board = 0
+    for i, row in enumerate(lines):
+        board |= row << (width * i)
+    return board
+
+
+def transpose(board, size):
+    """Swaps rows and columns of a packed size x size board."""
+    bits = cell_bits(size)
+    mask = (1 << bits) - 1
+    result = 0
+    for i in range(size):
+        for j in range(size):
+            result |= ((board >> (bits * (size * i + j))) & mask) << (bits * (size * j + i))
+    return result
+
+
+def move(board, size, direction):
+    """Returns (new_board, gained_score) for a move in the given direction."""
+    if direction not in DIRECTIONS:
+        raise ValueError(f"unknown direction: {direction!r}")
+    vertical = direction == "up" or direction == "down"
+    reverse = direction == "right" or direction == "down"
+    table = row_table(size)
+    if vertical:
+        board = transpose(board, size)
+    new_rows = []
+    gained = 0
+    for row in rows(board, size):
+        new, score = table.slide(row, reverse)
+        new_rows.append(new)
+        gained += score
+    board = from_rows(new_rows, size)
+    return (transpose(board, size) if vertical else board), gained
+
+
+def _reverse_line(row, size):
+    bits = cell_bits(size)
+    mask = (1 << bits) - 1
+    result = 0
+    for k in range(size):
+        result |= ((row >> (bits * k)) & mask) << (bits * (size - 1 - k))
+    return result
+
+
+def paths(board, size, direction):
+    """Tile trajectories of a move, like bitboard.paths for any size."""
+    vertical = direction == "up" or direction == "down"
+    reverse = direction == "right" or direction == "down"
+    table = row_table(size)
+    if vertical:
+        board = transpose(board, size)
+    last = size - 1
+    result = []
+    for i, row in enumerate(rows(board, size)):
+        for a, d, merged in table.line_paths(_reverse_line(row, size) if reverse else row):
+            if reverse:
+                a, d = last - a, last - d
+            result.append(((a, i), (d, i), merged) if vertical else ((i, a), (i, d), merged))
+    return result
+
+
+def tile_paths(board, size, direction):
+    """Tile trajectories of a move with the engine make_grid picks for this size."""
+    if size == bitboard.SIZE:
+        return bitboard.paths(board, direction)
+    return paths(board, size, direction)
+
+
+def empty_mask(board, size):
+    """Mask with the low bit of every empty cell set."""
+    x = board
+    for shift in range(1, cell_bits(size)):
+        x |= board >> shift
+    return ~x & cell_ones(size)
+
+
+def spawn_tile(board, size, rng=random):
+    """Like bitboard.spawn_tile for any size. Returns (new_board, cell_index, exponent)."""
+    mask = empty_mask(board, size)
+    count = mask.bit_count()
+    if count == 0:
+        return board, -1, 0
+    for _ in range(rng.randrange(count)):
+        mask &= mask - 1
+    shift = (mask & -mask).bit_length() - 1
+    exponent = 1 if rng.random() < 0.9 else 2
+    return board | (exponent << shift), shift // cell_bits(size), exponent
+
+
+def play(board, size, direction, rng=random):
+    """Slide then spawn, like bitboard.play (up/down spawns count empty cells by column)."""
+    board, gained = move(board, size, direction)
+    if direction == "up" or direction == "down":
+        board, index, exponent = spawn_tile(transpose(board, size), size, rng)
+        board = transpose(board, size)
+        if index >= 0:
+            index = (index % size) * size + index // size
+        return board, gained, index, exponent
+    board, index, exponent = spawn_tile(board, size, rng)
+    return board, gained, index, exponent
+
+
+def can_move(board, size):
+    if empty_mask(board, size):
+        return True
+    return move(board, size, "left")[0] != board or move(board, size, "up")[0] != board
+
+
+def to_cells(board, size):
+    bits = cell_bits(size)
+    mask = (1 << bits) - 1
+    cells = []
+    for i in range(size):
+        row = []
+        for j in range(size):
+            exponent = (board >> (bits * (size * i + j))) & mask
+            row.append(1 << exponent if exponent else 0)
+        cells.append(row)
+    return cells
+
+
+def from_cells(cells):
+    size = len(cells)
+    bits = cell_bits(size)
+    board = 0
+    for i in range(size):
+        for j in range(size):
+            value = cells[i][j]
+            if value:
+                board |= min(value.bit_length() - 1, (1 << bits) - 1) << (bits * (size * i + j))
+    return board
+
+
+class SizedGrid(bitboard.Grid):
+    """bitboard.Grid's API for any board size."""
+
+    def __init__(self, size=4, seed=None):
+        if size < 2:
+            raise ValueError("board size must be at least 2")
+        self.size = size
+        self.seed = random.randrange(1 << 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.board = 0
+        self.score = 0
+        self.last_spawn = None
+        self.add_random_tile()
+        self.add_random_tile()
+
+    @property
+    def cells(self):
+        """A fresh list-of-lists copy of the board; editing it does not change the game.
+
+        Assigning a whole board (grid.cells = rows) is the only way to write
+        cells, unlike the old Grid, whose cells could be edited in place.
+        """
+        return to_cells(self.board, self.size)
+
+    @cells.setter
+    def cells(self, cells):
+        self.board = from_cells(cells)
+
+    def _set_spawn(self, index, exponent):
+        size = self.size
+        self.last_spawn = (index // size, index % size, 1 << exponent) if index >= 0 else None
+
+    def add_random_tile(self):
+        self.board, index, exponent = spawn_tile(self.board, self.size, self.rng)
+        self._set_spawn(index, exponent)
+
+    def move(self, direction):
+        self.board, gained, index, exponent = play(self.board, self.size, direction, self.rng)
+        self.score += gained
+        self._set_spawn(index, exponent)
+
+
+def make_grid(size=4, seed=None):
+    """The fastest Grid for this board size."""
+    if size == bitboard.SIZE:
+        return bitboard.Grid(size, seed)
+    return SizedGrid(size, seed)
@@ -0,0 +1,305 @@
+"""Keeps the SPEAKER and LISTENER stations on the same page and map.
+
+One station is the coordinator and listens on a TCP port; the other station(s)
+connect to it as followers. Messages are JSON lines.
+
+Clock: followers ping the coordinator and estimate the offset between the
+two perf_counter_ns clocks NTP-style (offset = ((t1 - t0) + (t2 - t3)) / 2),
+keeping the sample with the smallest round trip out of the last few. Every
+estimate is passed to on_clock, which the experiment logs, so all logs can be
+put on the coordinator's timebase afterwards (coordinator time = local time
++ offset; the coordinator's own offset is 0).
+
+Transitions: a station that wants to change step calls announce(step). The
+coordinator picks an apply time LEAD_MS in the future on its clock and sends
+it to every follower; each station (the coordinator included) gets
+on_step(step, apply_at) with apply_at converted to its own clock, and
+switches at that moment. The lead hides the network delay, so on a LAN both
+stations switch within the error of the offset estimate, well under a
+couple of milliseconds. Followers that connect late are sent the current step.
+
+A follower that is not connected (the coordinator is not up yet, or the link
+dropped) switches on its own right away rather than ignoring the key, and
+reports it through on_error; once it reconnects, the coordinator's current
+step takes over again. Connect attempts time out after CONNECT_TIMEOUT, so a
+coordinator host that never answers cannot hold up stop(). Malformed messages
+are dropped and reported too, and a peer that sends a line longer than the
+stream limit is disconnected.
+
+The asyncio loop runs on a background thread, and on_step/on_clock/on_error
+are called from that thread, so GUI code has to hand them to its own thread.
+
+Loopback demo (coordinator plus followers in one process):
+    python stationsync.py --followers 2 --steps 20
+
+No Qt dependency.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections import deque
+
+DEFAULT_PORT = 47048
+LEAD_MS = 25  # How far ahead transitions are scheduled
+PING_INTERVAL = 0.5
+CONNECT_TIMEOUT = 1  # Seconds a follower waits on a coordinator host that does not answer
+RETRY_INTERVAL = 0.5
+PING_BURST = 8  # Quick pings right after connecting, for a good first estimate
+SAMPLES = 16  # Clock samples the best one is picked from
+
+
+class SyncStation:
+    def __init__(self, coordinator, host="127.0.0.1", port=DEFAULT_PORT, on_step=None, on_clock=None,
+                 on_error=None, lead_ms=LEAD_MS):
+        self.coordinator = coordinator
+        self.host = host
+        self.port = port
+        self.on_step = on_step or (lambda step, apply_at: None)
+        self.on_clock = on_clock or (lambda **fields: None)
+        self.on_error = on_error or (lambda **fields: None)
+        self.lead_ns = int(lead_ms * 1e6)
+        self.offset_ns = 0  # Coordinator clock minus local clock
+        self.delay_ns = None  # Round trip of the sample offset_ns came from
+        self.step = None
+        self.peers = set()  # Followers' stream writers (coordinator only)
+        self.connected = threading.Event()
+        self._samples = deque(maxlen=SAMPLES)
+        self._writer = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._connecting = None  # The follower's connect attempt, cancelled by stop()
+        self._stopping = False
+
+    # Called from any thread
+
+    def start(self):
+        """Starts the network thread; returns once the coordinator is listening."""
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), name="SyncStation", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._stopping = True
+        self._loop.call_soon_threadsafe(self._shutdown)
+        self._thread.join()
+
+    def announce(self, step):
+        """Asks for every station to switch to step."""
+        self._loop.call_soon_threadsafe(self._announce, step)
+
+    def shared_time(self, t=None):
+        """Local perf_counter_ns time t on the coordinator's clock."""
+        return (time.perf_counter_ns() if t is None else t) + self.offset_ns
+
+    # Network thread
+
+    def _run(self, started):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main(started))
+        finally:
+            self._loop.close()
+
+    async def _main(self, started):
+        self._done = asyncio.Event()
+        if self.coordinator:
+            self._server = await asyncio.start_server(self._serve, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            self.connected.set()
+            self.on_clock(role="coordinator", offset_ns=0, delay_ns=0, port=self.port)
+            started.set()
+            await self._done.wait()
+        else:
+            started.set()
+            while not self._stopping:
+                self._connecting = asyncio.ensure_future(
+                    asyncio.wait_for(asyncio.open_connection(self.host, self.port), CONNECT_TIMEOUT))
+                try:
+                    reader, writer = await self._connecting
+                except asyncio.CancelledError:  # stop()
+                    return
+                except (OSError, asyncio.TimeoutError):  # Coordinator not up yet, or its host does not answer
+                    try:
+                        await asyncio.wait_for(self._done.wait(), RETRY_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                finally:
+                    self._connecting = None
+                await self._follow(reader, writer)
+
+    def _shutdown(self):
+        if self._server is not None:
+            self._server.close()
+        if self._connecting is not None:
+            self._connecting.cancel()
+        for writer in list(self.peers) + ([self._writer] if self._writer else []):
+            writer.close()
+        self._done.set()
+
+    @staticmethod
+    def _send(writer, message):
+        writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+
+    def _announce(self, step):
+        if self.coordinator:
+            self._broadcast(step)
+        elif self._writer is not None:
+            self._send(self._writer, {"type": "go", "step": step})
+        else:
+            # No coordinator to ask: switch this station alone rather than drop the key
+            self.on_error(error="not connected", step=step)
+            self.step = step
+            self.on_step(step, time.perf_counter_ns())
+
+    def _broadcast(self, step):
+        apply_at = time.perf_counter_ns() + self.lead_ns
+        self.step = step
+        for writer in self.peers:
+            self._send(writer, {"type": "step", "step": step, "apply_at": apply_at})
+        self.on_step(step, apply_at)
+
+    async def _messages(self, reader):
+        """(receive time, message) for every line from a peer until it disconnects.
+
+        Lines that are not a JSON message are dropped; a line longer than
+        the stream limit ends the connection.
+        """
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                self.on_error(error="message too long")
+                return
+            if not line:
+                return
+            received = time.perf_counter_ns()
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict) or "type" not in message:
+                self.on_error(error="bad message", message=line[:200].decode(errors="replace"))
+                continue
+            yield received, message
+
+    async def _serve(self, reader, writer):
+        """Coordinator side of one follower connection."""
+        self.peers.add(writer)
+        if self.step is not None:
+            self._send(writer, {"type": "step", "step": self.step, "apply_at": time.perf_counter_ns()})
+        try:
+            async for received, message in self._messages(reader):
+                try:
+                    if message["type"] == "ping":
+                        self._send(writer, {"type": "pong", "t0": int(message["t0"]), "t1": received,
+                                            "t2": time.perf_counter_ns()})
+                    elif message["type"] == "go":
+                        self._broadcast(int(message["step"]))
+                except (ValueError, TypeError, KeyError):
+                    self.on_error(error="bad message", message=json.dumps(message)[:200])
+        except ConnectionError:
+            pass
+        finally:
+            self.peers.discard(writer)
+            writer.close()
+
+    async def _follow(self, reader, writer):
+        """Follower side: pings for the clock offset and applies steps."""
+        self._writer = writer
+        pinger = asyncio.ensure_future(self._ping(writer))
+        try:
+            async for received, message in self._messages(reader):
+                try:
+                    if message["type"] == "pong":
+                        self._add_sample(int(message["t0"]), int(message["t1"]), int(message["t2"]), received)
+                    elif message["type"] == "step":
+                        step = int(message["step"])
+                        apply_at = int(message["apply_at"]) - self.offset_ns
+                        self.step = step
+                        self.on_step(step, apply_at)
+                except (ValueError, TypeError, KeyError):
+                    self.on_error(error="bad message", message=json.dumps(message)[:200])
+        except ConnectionError:
+            pass
+        finally:
+            pinger.cancel()
+            self._writer = None
+            self.connected.clear()
+            writer.close()
+
+    async def _ping(self, writer):
+        count = 0
+        while True:
+            self._send(writer, {"type": "ping", "t0": time.perf_counter_ns()})
+            count += 1
+            await asyncio.sleep(0.02 if count < PING_BURST else PING_INTERVAL)
+
+    def _add_sample(self, t0, t1, t2, t3):
+        delay = (t3 - t0) - (t2 - t1)
+        self._samples.append((delay, ((t1 - t0) + (t2 - t3)) // 2))
+        self.delay_ns, self.offset_ns = min(self._samples)
+        self.on_clock(role="follower", offset_ns=self.offset_ns, delay_ns=self.delay_ns, sample_delay_ns=delay)
+        if len(self._samples) >= PING_BURST:
+            self.connected.set()
+
+
+def _demo(followers, steps, interval):
+    """Coordinator and followers on loopback; reports how far apart they switch.
+
+    All stations share one clock here, so the spread of their local apply
+    times is exactly the error of the offset estimates.
+    """
+    applied = {}  # step -> {station: local apply time}
+    lock = threading.Lock()
+    stations = []
+
+    def recorder(index):
+        def on_step(step, apply_at):
+            with lock:
+                applied.setdefault(step, {})[index] = apply_at
+        return on_step
+
+    coordinator = SyncStation(True, port=0, on_step=recorder(0))
+    stations.append(coordinator)
+    coordinator.start()
+    for i in range(followers):
+        stations.append(SyncStation(False, port=coordinator.port, on_step=recorder(i + 1)).start())
+    for station in stations[1:]:
+        station.connected.wait(5)
+
+    for step in range(steps):
+        # Alternate who asks for the switch, like SPACE pressed at either station
+        stations[step % len(stations)].announce(step)
+        time.sleep(interval)
+    for station in stations:
+        station.stop()
+
+    spreads = [(max(times.values()) - min(times.values())) / 1e6 for times in applied.values()
+               if len(times) == len(stations)]
+    print(f"{len(spreads)}/{steps} steps reached all {len(stations)} stations")
+    if spreads:
+        print(f"switch time spread: median {statistics.median(spreads):.3f} ms, max {max(spreads):.3f} ms")
+    for i, station in enumerate(stations[1:], 1):
+        print(f"follower {i}: offset {station.offset_ns / 1e6:.3f} ms, round trip {station.delay_ns / 1e6:.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Loopback test of the station sync service")
+    parser.add_argument("--followers", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between transitions")
+    args = parser.parse_args(argv)
+    _demo(args.followers, args.steps, args.interval)
+
+
+if __name__ == "__main__":
+    main()
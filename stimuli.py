@@ -0,0 +1,223 @@
+"""Index of the stimulus images, so startup never has to scan or open them.
+
+maps/stimuli.json lists every map in presentation order with its path, pixel
+size (read from the image header, without decoding), file size, SHA-256 and
+any trial metadata. MainWindow reads it in one go at startup, so launching
+costs the same with 4 maps or 400. The preloader uses the sizes to work out
+how much memory a scaled map will take before asking for it to be decoded.
+
+The index is checked against the folder at startup (stale(): one listing and
+one stat per file, no file is read). If maps were added, removed or changed
+size since it was built, MainWindow patches it in memory with refresh(),
+which keeps the entries that still match and reads only the image headers of
+the others, then hashes those few files after the first frame (hash_files())
+and logs why. An edit that keeps the file size is only caught by rebuilding
+the index.
+
+Build or update the index after adding, removing or editing maps:
+    python stimuli.py                          # maps/
+    python stimuli.py --metadata trials.csv    # also merge per-map metadata
+
+Entries whose size and hash match keep their metadata and image size. A file
+is only read and hashed again if its size or modification time differs from
+when it was last hashed on this machine (kept next to the index in
+.stimuli_hashes.json, which is not committed: modification times differ
+between checkouts of the same files, so they are not stored in the index). The metadata CSV needs a
+"file" column (the image's file name); every other column goes into that
+entry's "meta". Without an index MainWindow falls back to listing the folder.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+
+from PyQt6.QtGui import QImageReader
+
+INDEX_NAME = "stimuli.json"
+HASHES_NAME = ".stimuli_hashes.json"
+VERSION = 1
+EXTENSIONS = (".png", ".jpg")
+BYTES_PER_PIXEL = 4  # Scaled maps are 32-bit pixmaps
+
+
+def index_path(folder):
+    return os.path.join(folder, INDEX_NAME)
+
+
+def scan(folder):
+    """Stimulus paths in presentation order (sorted file names), from the folder itself."""
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(EXTENSIONS))
+
+
+def load(folder):
+    """Index entries in presentation order, or None if the folder has no index."""
+    try:
+        with open(index_path(folder), encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return None
+    if index.get("version") != VERSION:
+        return None
+    return index["stimuli"]
+
+
+def stale(folder, entries):
+    """Why the index entries no longer match the folder, or None if they do.
+
+    Only lists the folder and stats each file, so it is cheap enough for startup.
+    """
+    indexed = [entry["path"] for entry in entries]
+    found = scan(folder)
+    if indexed != found:
+        added = sorted(set(found) - set(indexed))
+        removed = sorted(set(indexed) - set(found))
+        return f"not indexed: {added}, missing: {removed}" if added or removed else "order differs"
+    for entry in entries:
+        if os.path.getsize(entry["path"]) != entry["bytes"]:
+            return f"{entry['path']} changed size"
+    return None
+
+
+def _describe(path, nbytes, digest):
+    size = QImageReader(path).size()  # From the header; nothing is decoded
+    if not size.isValid():
+        raise ValueError(f"could not read the image size of {path}")
+    return {"path": path, "width": size.width(), "height": size.height(), "bytes": nbytes,
+            "sha256": digest, "meta": {}}
+
+
+def _load_hashes(folder):
+    try:
+        with open(os.path.join(folder, HASHES_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_hashes(folder, hashes):
+    path = os.path.join(folder, HASHES_NAME)
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(hashes, f)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass  # Only saves work next time
+
+
+def _hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _digest(path, hashes):
+    """(size, SHA-256) of path, read and hashed again only if its size or mtime changed."""
+    stat = os.stat(path)
+    name = os.path.basename(path)
+    known = hashes.get(name)
+    if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return stat.st_size, known[2]
+    digest = _hash_file(path)
+    hashes[name] = [stat.st_size, stat.st_mtime_ns, digest]
+    return stat.st_size, digest
+
+
+def hash_files(folder, paths):
+    """{path: SHA-256} of some of the folder's files (those refresh() could not vouch for)."""
+    hashes = _load_hashes(folder)
+    digests = {path: _digest(path, hashes)[1] for path in paths}
+    _save_hashes(folder, hashes)
+    return digests
+
+
+def refresh(folder, entries):
+    """Index entries patched to match the folder without reading any file; returns (entries, paths to hash).
+
+    Entries whose file still has the indexed size are kept. New or resized
+    files get an entry from their image header with "sha256" None (keeping
+    the old entry's metadata), to be filled in from hash_files().
+    """
+    old = {entry["path"]: entry for entry in entries}
+    refreshed = []
+    pending = []
+    for path in scan(folder):
+        nbytes = os.path.getsize(path)
+        entry = old.get(path)
+        if entry is None or entry["bytes"] != nbytes:
+            described = _describe(path, nbytes, None)
+            if entry is not None:
+                described["meta"] = entry.get("meta", {})
+            entry = described
+            pending.append(path)
+        refreshed.append(entry)
+    return refreshed, pending
+
+
+def build(folder, metadata=None, write=True):
+    """Creates or updates the folder's index; returns (entries, number of new or changed files).
+
+    metadata maps file names to dicts merged into their entries' "meta". With
+    write=False the index file is left as it is.
+    """
+    old = {entry["path"]: entry for entry in (load(folder) or [])}
+    hashes = _load_hashes(folder)
+    entries = []
+    changed = 0
+    for path in scan(folder):
+        nbytes, digest = _digest(path, hashes)
+        entry = old.get(path)
+        if entry is None or (entry["bytes"], entry["sha256"]) != (nbytes, digest):
+            described = _describe(path, nbytes, digest)
+            changed += 1
+            if entry is not None:
+                described["meta"] = entry.get("meta", {})
+            entry = described
+        else:
+            entry.pop("mtime_ns", None)  # Stored by older versions of this script
+        if metadata and os.path.basename(path) in metadata:
+            entry["meta"].update(metadata[os.path.basename(path)])
+        entries.append(entry)
+    _save_hashes(folder, hashes)
+    if write:
+        path = index_path(folder)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "stimuli": entries}, f, indent=1)
+        os.replace(path + ".tmp", path)
+    return entries, changed
+
+
+def scaled_size(entry, width, height, dpr=1.0):
+    """Device-pixel size of the stimulus scaled to fit width x height (keeping its aspect ratio)."""
+    box_w, box_h = round(width * dpr), round(height * dpr)
+    if not entry["width"] or not entry["height"]:
+        return 0, 0
+    scale = min(box_w / entry["width"], box_h / entry["height"])
+    return max(1, round(entry["width"] * scale)), max(1, round(entry["height"] * scale))
+
+
+def scaled_bytes(entry, width, height, dpr=1.0):
+    """Memory the stimulus will take once scaled to fit width x height."""
+    w, h = scaled_size(entry, width, height, dpr)
+    return w * h * BYTES_PER_PIXEL
+
+
+def _read_metadata(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row.pop("file"): row for row in csv.DictReader(f)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or update the stimulus index of a maps folder")
+    parser.add_argument("folder", nargs="?", default="maps")
+    parser.add_argument("--metadata", help="CSV with a 'file' column and per-map metadata columns")
+    args = parser.parse_args(argv)
+    metadata = _read_metadata(args.metadata) if args.metadata else None
+    entries, changed = build(args.folder, metadata)
+    total = sum(entry["bytes"] for entry in entries)
+    print(f"{index_path(args.folder)}: {len(entries)} stimuli ({total / 2 ** 20:.1f} MB), {changed} new or changed",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
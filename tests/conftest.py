@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to mainqt.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The QApplication for widget tests (offscreen)."""
+    QApplication = pytest.importorskip("PyQt6.QtWidgets").QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,59 @@
+import json
+
+import analyze
+import sessionfile
+
+
+def _key(t, page, map_index, score=None, overlay=False):
+    event = {"event": "key", "t": t, "key": "space", "page": page, "map_index": map_index, "overlay": overlay}
+    if score is not None:
+        event.update(key="left", before=0, after=0, score=score)
+    return event
+
+
+def test_score_per_trial(tmp_path):
+    events = [
+        {"event": "session_start", "t": 0, "pages": ["welcome", "game"]},
+        _key(1_000_000_000, 1, 0),
+        _key(1_100_000_000, 1, 0, score=4),
+        _key(1_200_000_000, 1, 0, score=12),
+        _key(2_000_000_000, 1, 1, overlay=True),
+        _key(2_500_000_000, 1, 1, score=16, overlay=True),
+        _key(3_000_000_000, 0, -1),
+        {"event": "session_end", "t": 4_000_000_000},
+    ]
+    path = tmp_path / "session.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in events))
+    session, trials = analyze.analyze_session(str(path))
+    assert [(t["map"], t["moves"], t["score_gained"], t["score_end"]) for t in trials] == [(0, 2, 12, 12), (1, 1, 4, 16)]
+    assert [t["overlay"] for t in trials] == [False, True]
+    assert session["final_score"] == 16
+    assert session["page_seconds"] == {"welcome": 2.0}
+
+
+def _switch(t, page, map_index, overlay=False):
+    return {"event": "sync_step", "t": t, "step": page, "page": page, "map_index": map_index, "overlay": overlay,
+            "apply_at": t, "shared_apply_at": t + 7}
+
+
+def test_linked_stations_split_on_switches(tmp_path):
+    # SPACE only asks for the step (its key event shows the page before); the
+    # switch at 2 s comes from the partner's station and has no key here at all
+    events = [
+        {"event": "session_start", "t": 0, "pages": ["welcome", "game", "end"]},
+        _key(900_000_000, 0, -1),
+        _switch(1_000_000_000, 1, 0),
+        _key(1_100_000_000, 1, 0, score=4),
+        _switch(2_000_000_000, 1, 1, overlay=True),
+        _key(2_500_000_000, 1, 1, score=8, overlay=True),
+        _key(2_900_000_000, 1, 1, overlay=True),
+        _switch(3_000_000_000, 2, -1),
+        {"event": "session_end", "t": 4_000_000_000},
+    ]
+    path = tmp_path / "session.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in events))
+    for log in (str(path), sessionfile.convert(str(path))):
+        session, trials = analyze.analyze_session(log)
+        assert [(t["map"], t["seconds"], t["moves"], t["score_end"]) for t in trials] == [(0, 1.0, 1, 4),
+                                                                                        (1, 1.0, 1, 8)]
+        assert session["page_seconds"] == {"welcome": 1.0, "end": 1.0}
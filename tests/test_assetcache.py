@@ -0,0 +1,36 @@
+import os
+
+from PyQt6.QtGui import QColor, QImage
+
+import assetcache
+
+
+def _image(path, color):
+    image = QImage(200, 100, QImage.Format.Format_RGB32)
+    image.fill(QColor(color))
+    assert image.save(str(path))
+
+
+def test_cache_is_validated_by_content(tmp_path):
+    source = tmp_path / "map.png"
+    _image(source, "red")
+    folder = str(tmp_path / "cache")
+    assert assetcache.build([str(source)], [(100, 100)], folder=folder) == 1
+
+    image = assetcache.CompiledAssets(folder).load_image(str(source), 100, 100, 1.0)
+    assert (image.width(), image.height()) == (100, 50)
+    assert image.pixelColor(50, 25) == QColor("red")
+
+    # A new mtime (a fresh checkout or copy) with the same pixels keeps the entry
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 10))
+    assert assetcache.CompiledAssets(folder).load_image(str(source), 100, 100, 1.0) is not None
+    assert assetcache.build([str(source)], [(100, 100)], folder=folder) == 0
+
+    # Edited pixels do not, even within one run
+    assets = assetcache.CompiledAssets(folder)
+    assert assets.load_image(str(source), 100, 100, 1.0) is not None
+    _image(source, "blue")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 10))
+    assert assets.load_image(str(source), 100, 100, 1.0) is None
+    assert assets.load_image(str(source), 50, 50, 1.0) is None  # Never built
@@ -0,0 +1,63 @@
+"""batch.py against the scalar bitboard engine, on random boards."""
+import random
+
+import numpy as np
+import pytest
+
+import batch
+import bitboard
+
+BOARDS = 2000
+
+
+def _random_boards(seed, fill):
+    """Packed boards with about fill of the cells taken, by small tiles so that many rows can merge."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(BOARDS):
+        board = 0
+        for cell in range(16):
+            if rng.random() < fill:
+                board |= rng.randint(1, 6) << (4 * cell)
+        boards.append(board)
+    return boards
+
+
+@pytest.mark.parametrize("fill", [0.3, 0.7, 1.0])
+def test_move_matches_bitboard(fill):
+    boards = _random_boards(int(fill * 10), fill)
+    moves = np.array([random.Random(n).randrange(4) for n in range(BOARDS)])
+    new, gained = batch.move(np.array(boards, dtype=np.uint64), moves)
+    for board, code, got, score in zip(boards, moves, new.tolist(), gained.tolist()):
+        assert (got, score) == bitboard.move(board, bitboard.DIRECTIONS[code]), bitboard.to_cells(board)
+
+
+def test_terminal_and_cells_match_bitboard():
+    # Full boards of 1s and 2s are stuck about as often as not
+    rng = random.Random(0)
+    boards = [sum(rng.randint(1, 2) << (4 * cell) for cell in range(16)) for _ in range(BOARDS)]
+    boards += _random_boards(1, 0.9)
+    array = np.array(boards, dtype=np.uint64)
+    stuck = batch.terminal(array).tolist()
+    assert stuck == [not bitboard.can_move(board) for board in boards]
+    assert 0 < sum(stuck) < len(boards)
+    exponents = batch.cells(array)
+    for n in (0, 1, BOARDS, len(boards) - 1):
+        assert [int(e) for e in exponents[:, n]] == [
+            (boards[n] >> (4 * cell)) & 0xF for cell in range(16)]
+
+
+def test_step_spawns_one_tile_on_an_empty_cell():
+    grid = batch.BatchGrid(500, seed=3)
+    assert (np.count_nonzero(batch.cells(grid.boards), axis=0) == 2).all()
+    for _ in range(20):
+        before = grid.boards.copy()
+        moves = grid.rng.integers(0, 4, len(before))
+        moved, _ = batch.move(before, moves)
+        result = grid.step(moves)
+        added = batch.cells(grid.boards) - batch.cells(moved)
+        placed = np.count_nonzero(added, axis=0)
+        full = np.count_nonzero(batch.cells(moved), axis=0) == 16
+        assert (placed == np.where(full, 0, 1)).all()
+        assert np.isin(added, [0, 1, 2]).all()
+        assert (result.changed == (moved != before)).all()
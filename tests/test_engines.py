@@ -0,0 +1,97 @@
+"""bitboard.py and sizedgrid.py against the original list-of-lists Grid (prev.py)."""
+import random
+
+import pytest
+
+import bitboard
+import prev
+import sizedgrid
+
+MOVES = 300
+
+
+def _play(grid, reference, seed, size):
+    """Plays the same random keys on grid and the reference Grid, comparing every board."""
+    keys = random.Random(seed + 1)
+    for n in range(MOVES):
+        direction = keys.choice(bitboard.DIRECTIONS)
+        grid.move(direction)
+        getattr(reference, "move_" + direction)()
+        assert grid.cells == reference.cells, f"board differs after move {n} ({direction})"
+        if not sizedgrid.can_move(grid.board, size):
+            break
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bitboard_matches_reference(seed):
+    grid = bitboard.Grid(4, seed)
+    random.seed(seed)  # prev.Grid draws from the module-level random, in the same order
+    reference = prev.Grid(4)
+    assert grid.cells == reference.cells
+    _play(grid, reference, seed, 4)
+
+
+@pytest.mark.parametrize("size", [2, 3, 5, 6, 8])
+@pytest.mark.parametrize("seed", range(3))
+def test_sizedgrid_matches_reference(size, seed):
+    grid = sizedgrid.SizedGrid(size, seed)
+    random.seed(seed)
+    reference = prev.Grid(size)
+    assert grid.cells == reference.cells
+    _play(grid, reference, seed, size)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sizedgrid_plays_the_bitboard_game_at_4x4(seed):
+    fast = bitboard.Grid(4, seed)
+    sized = sizedgrid.SizedGrid(4, seed)
+    keys = random.Random(seed)
+    for _ in range(MOVES):
+        direction = keys.choice(bitboard.DIRECTIONS)
+        fast.move(direction)
+        sized.move(direction)
+        assert (sized.board, sized.score, sized.last_spawn) == (fast.board, fast.score, fast.last_spawn)
+
+
+@pytest.mark.parametrize("size", [3, 4, 5])
+def test_paths_end_on_the_moved_board(size):
+    rng = random.Random(size)
+    for _ in range(200):
+        cells = [[rng.choice([0, 0, 2, 4, 8]) for _ in range(size)] for _ in range(size)]
+        board = sizedgrid.from_cells(cells)
+        for direction in bitboard.DIRECTIONS:
+            after = sizedgrid.to_cells(sizedgrid.move(board, size, direction)[0], size)
+            rebuilt = [[0] * size for _ in range(size)]
+            for (si, sj), (di, dj), merged in sizedgrid.tile_paths(board, size, direction):
+                rebuilt[di][dj] += cells[si][sj]
+            assert rebuilt == after
+
+
+@pytest.mark.parametrize("size", [5, 6, 8])
+@pytest.mark.parametrize("direction", bitboard.DIRECTIONS)
+def test_big_boards_have_no_tile_cap(size, direction):
+    top = 1 << (size * size + 1)  # Largest tile an n x n board can ever hold
+    cells = [[0] * size for _ in range(size)]
+    cells[size // 2][size // 2] = cells[size // 2][size // 2 + 1] = top // 2
+    cells[size // 2 + 1][size // 2] = top // 2
+    board = sizedgrid.from_cells(cells)
+    assert sizedgrid.to_cells(board, size) == cells
+    moved, gained = sizedgrid.move(board, size, direction)
+    assert gained == top
+    assert sum(map(sum, sizedgrid.to_cells(moved, size))) == 3 * top // 2
+    assert top in [value for row in sizedgrid.to_cells(moved, size) for value in row]
+
+
+def test_wide_row_tables_are_bounded(monkeypatch):
+    monkeypatch.setattr(sizedgrid, "ROW_CACHE", 64)
+    monkeypatch.setattr(sizedgrid, "_TABLES", {})
+    grid = sizedgrid.SizedGrid(8, 0)
+    keys = random.Random(0)
+    for n in range(2000):
+        grid.move(keys.choice(bitboard.DIRECTIONS))
+        sizedgrid.tile_paths(grid.board, 8, keys.choice(bitboard.DIRECTIONS))
+        if not sizedgrid.can_move(grid.board, 8):
+            grid = sizedgrid.SizedGrid(8, n)
+    table = sizedgrid.row_table(8)
+    assert table.slide.cache_info().misses > 64
+    assert table.slide.cache_info().currsize <= 64 and table.line_paths.cache_info().currsize <= 64
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from evalcache import EvalCache
+
+
+def _entries(n, seed=0):
+    rng = random.Random(seed)
+    return {(rng.getrandbits(64), rng.randint(1, 4)): tuple(None if rng.random() < 0.2 else rng.uniform(-1e5, 1e5)
+                                                             for _ in range(4))
+            for _ in range(n)}
+
+
+def test_put_grow_and_reopen(tmp_path):
+    path = str(tmp_path / "cache.evc")
+    entries = _entries(500)
+    cache = EvalCache(path, 1e-3, True, capacity=16)
+    for (board, depth), values in entries.items():
+        cache.put(board, depth, values)
+    (board, depth), values = next(iter(entries.items()))
+    cache.put(board, depth, values)  # Storing a position again does not count it twice
+    assert (cache.count, cache.capacity) == (500, 1024)
+    assert all(cache.get(board, depth) == values for (board, depth), values in entries.items())
+    assert cache.get(board, depth + 10) is None and (board, depth + 10) not in cache
+    cache.close()
+
+    cache = EvalCache(path, 1e-3, True)
+    assert (cache.count, cache.capacity) == (500, 1024)
+    assert all(cache.get(board, depth) == values for (board, depth), values in entries.items())
+    assert (board, depth) in cache
+    cache.close()
+
+
+def test_other_settings_are_rejected(tmp_path):
+    path = str(tmp_path / "cache.evc")
+    EvalCache(path, 1e-3, True).close()
+    with pytest.raises(ValueError, match="prob_cutoff"):
+        EvalCache(path, 1e-4, True)
+    with pytest.raises(ValueError, match="noop_spawns=True"):
+        EvalCache(path, 1e-3, False)
+    other = tmp_path / "other.evc"
+    other.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError, match="not an evaluation cache"):
+        EvalCache(str(other), 1e-3, True)
+    with pytest.raises(ValueError):
+        EvalCache(str(tmp_path / "new.evc"), 1e-3, True).put(1, 0, (1.0, 2.0, 3.0, 4.0))
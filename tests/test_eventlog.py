@@ -0,0 +1,17 @@
+import json
+
+from eventlog import EventLog, unique_path
+
+
+def test_sessions_in_the_same_second_get_their_own_files(tmp_path):
+    path = str(tmp_path / "logs" / "session_20260101_120000.jsonl")
+    paths = [unique_path(path) for _ in range(3)]
+    assert paths[0] == path
+    assert len(set(paths)) == 3
+    for n, p in enumerate(paths):
+        log = EventLog(p)
+        log.log("session_start", session=n)
+        log.close()
+    for n, p in enumerate(paths):
+        with open(p, encoding="utf-8") as f:
+            assert [json.loads(line)["session"] for line in f] == [n]
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+import bitboard
+from expectimax import MoveScorer
+
+
+def test_best_move_takes_the_big_merge():
+    board = bitboard.from_cells([[1024, 2, 0, 0], [1024, 4, 0, 0], [8, 0, 0, 0], [0, 0, 0, 0]])
+    scorer = MoveScorer(depth=2)
+    assert scorer.best_move(board) in ("up", "down")
+    grade = scorer.grade(bitboard.to_cells(board), "right")
+    assert grade.rank > 1 and grade.loss > 0
+    assert scorer.grade(board, grade.best).rank == 1
+
+
+def test_only_legal_moves_are_searched():
+    cells = [[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 0]]
+    values = MoveScorer(depth=2, noop_spawns=False).evaluate(bitboard.from_cells(cells))
+    assert [d for d, value in values.items() if value is not None] == ["right", "down"]
+    assert MoveScorer(depth=2).evaluate(bitboard.from_cells(cells))["left"] is not None  # Still spawns a tile
+    stuck = bitboard.from_cells([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]])
+    assert MoveScorer(depth=2).best_move(stuck) is None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_canonical_board_has_the_same_values(seed):
+    # The values of a position carry over to its canonical board through the direction map
+    rng = random.Random(seed)
+    board = sum(rng.choice([0, 0, 1, 2, 3, 5]) << (4 * cell) for cell in range(16))
+    canonical, directions = bitboard.canonical(board)
+    assert sorted(directions.values()) == sorted(bitboard.DIRECTIONS)
+    values = MoveScorer(depth=2).evaluate(board)
+    mapped = MoveScorer(depth=2).evaluate(canonical)
+    for direction, value in values.items():
+        other = mapped[directions[direction]]
+        assert (value is None and other is None) or value == pytest.approx(other)
+        assert bitboard.canonical(bitboard.move(board, direction)[0])[0] == \
+            bitboard.canonical(bitboard.move(canonical, directions[direction])[0])[0]
@@ -0,0 +1,99 @@
+"""GameWidget's repaints and move animations while the move thread changes the grid."""
+import pytest
+
+pytest.importorskip("PyQt6")
+import time  # noqa: E402
+
+import bitboard  # noqa: E402
+import mainqt  # noqa: E402
+from sizedgrid import to_cells  # noqa: E402
+
+COLORS = {color: value for value, color in mainqt.TILE_COLORS.items()}
+
+
+def _settle(app):
+    for _ in range(10):
+        app.processEvents()
+
+
+def _on_screen(app, widget):
+    """Cell values read back from what was actually painted (not a fresh render)."""
+    image = app.primaryScreen().grabWindow(widget.winId()).toImage()
+    size = widget.grid.size
+    cells = [[0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            rect = widget.cell_rect(i, j)
+            cells[i][j] = COLORS[image.pixelColor(rect.left() + 3, rect.top() + 3).name()]
+    return cells
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_move_between_update_and_paint(app, seed):
+    widget = mainqt.GameWidget(size=4, seed=seed, animation_ms=0)
+    widget.resize(400, 400)
+    widget.show()
+    _settle(app)
+    try:
+        for n, direction in enumerate(bitboard.DIRECTIONS * 2):
+            widget.grid.move(direction)
+            widget.update_grid()
+            # The move thread applies another move before the scheduled paint runs
+            widget.grid.move(bitboard.DIRECTIONS[(n + 1) % 4])
+            _settle(app)
+            widget.update_grid()
+            _settle(app)
+            assert _on_screen(app, widget) == widget.grid.cells, f"stale board after round {n}"
+    finally:
+        widget.close()
+
+
+def _move(widget, direction):
+    """Applies a move to the grid the way the move thread does; returns animate_move's arguments."""
+    before = widget.grid.board
+    widget.grid.move(direction)
+    return before, direction, widget.grid.board, widget.grid.last_spawn
+
+
+def _animated(seed):
+    widget = mainqt.GameWidget(size=4, seed=seed, animation_ms=60)
+    widget.resize(400, 400)
+    widget.show()
+    return widget
+
+
+def test_move_during_animation_restarts_it(app):
+    widget = _animated(0)
+    _settle(app)
+    try:
+        widget.animate_move(*_move(widget, "left"))
+        _settle(app)
+        assert widget.animation is not None
+        second = _move(widget, "right")
+        widget.animate_move(*second)  # The key arrives before the first animation ends
+        assert widget.animation[1:] == (to_cells(second[0], 4), to_cells(second[2], 4), second[3])
+        assert widget.progress.currentTime() < widget.progress.duration()
+
+        widget.update_grid(_move(widget, "up")[2])  # Several moves taken at once: no animation
+        assert widget.animation is None and widget.frame == widget.grid.cells
+        _settle(app)
+        assert _on_screen(app, widget) == widget.grid.cells
+    finally:
+        widget.close()
+
+
+def test_animation_settles_on_its_own_board(app):
+    widget = _animated(1)
+    _settle(app)
+    try:
+        move = _move(widget, "left")
+        widget.animate_move(*move)
+        _move(widget, "up")  # Applied by the move thread, not taken by the GUI yet
+        deadline = time.monotonic() + 2
+        while widget.animation is not None and time.monotonic() < deadline:
+            app.processEvents()
+        _settle(app)
+        assert widget.animation is None
+        assert _on_screen(app, widget) == to_cells(move[2], 4) != widget.grid.cells
+    finally:
+        widget.close()
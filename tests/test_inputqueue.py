@@ -0,0 +1,58 @@
+import bitboard
+import sizedgrid
+from inputqueue import MoveQueue
+
+
+class _Log:
+    def __init__(self):
+        self.events = []
+
+    def log(self, event, **fields):
+        self.events.append((event, fields))
+
+
+def _queue(policy):
+    grid = bitboard.Grid(4, seed=1)
+    # Tiles that keep sliding between the two left columns: every left/right changes the board
+    grid.board = sizedgrid.from_cells([[2, 0, 0, 0], [0, 0, 0, 4], [0, 0, 0, 0], [0, 0, 0, 0]])
+    log = _Log()
+    return MoveQueue(grid, log, policy), log
+
+
+def _hold(moves, repeats, take_every=None):
+    """A key press followed by held-key repeats; the GUI takes the board every take_every keys."""
+    actions = [moves.submit("right", 0, False, {})]
+    for n in range(repeats):
+        moves.drain()  # The worker has applied everything before the next repeat arrives
+        if take_every and n % take_every == 0:
+            moves.take()
+        actions.append(moves.submit("left" if n % 2 == 0 else "right", n + 1, True, {}))
+    moves.drain()
+    moves.close()
+    return actions
+
+
+def test_accept_applies_every_repeat():
+    moves, log = _queue("accept")
+    assert _hold(moves, 10) == ["applied"] * 11
+    assert moves.counts == {"applied": 11, "coalesced": 0, "rejected": 0}
+    assert [fields["input"] for _, fields in log.events] == ["applied"] * 11
+
+
+def test_reject_keeps_only_the_press():
+    moves, _ = _queue("reject")
+    assert _hold(moves, 10) == ["applied"] + ["rejected"] * 10
+
+
+def test_coalesce_waits_for_the_gui_to_take_the_board():
+    moves, log = _queue("coalesce")
+    # The worker is done with every move long before the next repeat; what counts is the frame
+    actions = _hold(moves, 12, take_every=4)
+    assert actions == ["applied"] + ["applied", "coalesced", "coalesced", "coalesced"] * 3
+    assert moves.counts["coalesced"] == 9
+    assert [fields["input"] for _, fields in log.events] == actions
+
+
+def test_coalesce_drops_nothing_once_the_board_is_taken():
+    moves, _ = _queue("coalesce")
+    assert _hold(moves, 6, take_every=1) == ["applied"] * 7
@@ -0,0 +1,80 @@
+from latency import LatencyHistogram, LatencyTracker
+
+
+class _Log:
+    def __init__(self):
+        self.events = []
+
+    def log(self, event, **fields):
+        self.events.append(fields)
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.add(ms * 1_000_000)
+    summary = histogram.summary()
+    assert summary["count"] == 100 and summary["max_ms"] == 100
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (51, 96, 100)
+    assert sum(summary["buckets_us"].values()) == 100
+    assert LatencyHistogram().summary() == {"count": 0}
+
+
+def test_onset_waits_for_paint_then_flush():
+    log = _Log()
+    tracker = LatencyTracker(log)
+    tracker.begin("board", 100, 200)
+    tracker.flushed()  # Flushed before the board was painted: not its onset
+    assert not log.events
+    tracker.painted("board")
+    tracker.flushed()
+    (onset,) = log.events
+    assert onset["key_t"] == 100 and onset["model_t"] == 200
+    assert onset["key_t"] < onset["paint_t"] <= onset["settle_t"] <= onset["t"] == onset["settle_flush_t"]
+    assert tracker.summary()["board"]["settle"]["count"] == 1
+
+
+def test_map_counts_only_once_ready():
+    log = _Log()
+    tracker = LatencyTracker(log)
+    tracker.begin("map", 100, ready=False)
+    tracker.painted("map")  # Still the old map (or none) while it decodes
+    tracker.flushed()
+    assert not log.events
+    tracker.ready("map")
+    tracker.painted("map")
+    tracker.flushed()
+    assert len(log.events) == 1
+
+
+def test_animated_move_has_start_and_settle():
+    log = _Log()
+    tracker = LatencyTracker(log)
+    tracker.begin("board", 100, 200)
+    tracker.painted("board", settled=False)  # First animation frame
+    tracker.flushed()
+    tracker.painted("board", settled=False)
+    tracker.flushed()
+    assert not log.events
+    tracker.painted("board")  # The animation has run; the new board is all there
+    tracker.flushed()
+    (onset,) = log.events
+    assert onset["paint_t"] <= onset["t"] <= onset["settle_t"] <= onset["settle_flush_t"]
+
+
+def test_move_during_animation_cuts_the_onset_short():
+    log = _Log()
+    tracker = LatencyTracker(log)
+    tracker.begin("board", 100, 200)
+    tracker.begin("board", 150, 250)  # Never reached the screen
+    tracker.painted("board", settled=False)
+    tracker.flushed()
+    tracker.begin("board", 300, 400)  # The next move snaps the animation
+    tracker.painted("board")
+    tracker.flushed()
+    first, second = log.events
+    assert (first["key_t"], first["settle_t"], first["settle_flush_t"]) == (150, None, None)
+    assert second["key_t"] == 300 and second["settle_flush_t"] is not None
+    summary = tracker.summary()["board"]
+    assert summary["superseded"] == 1
+    assert (summary["flush"]["count"], summary["settle"]["count"]) == (2, 1)
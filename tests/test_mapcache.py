@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+from PyQt6.QtGui import QImage  # noqa: E402
+
+from mapcache import POOL, MapCache  # noqa: E402
+from pixmapbudget import PixmapBudget  # noqa: E402
+
+
+def _decoded(cache, key):
+    """Puts key in the cache as if the background decoder had finished it."""
+    image = QImage(key[1], key[2], QImage.Format.Format_ARGB32)
+    image.fill(0)
+    cache._on_done(key, image)
+
+
+def test_resizes_leave_one_copy_of_the_shown_map(app):
+    cache = MapCache(PixmapBudget())
+    cache.steps["a.png"] = [0]
+    for width in (400, 420, 440):
+        key = ("a.png", width, 300, 1.0)
+        _decoded(cache, key)
+        cache.show(key)
+    _decoded(cache, ("b.png", 440, 300, 1.0))
+    assert set(cache.pixmaps) == {("a.png", 440, 300, 1.0), ("b.png", 440, 300, 1.0)}
+    assert cache.budget.bytes == 2 * 440 * 300 * 4
+
+
+def test_shown_map_is_not_evicted(app):
+    budget = PixmapBudget(100 * 100 * 4)
+    cache = MapCache(budget)
+    cache.steps.update({"a.png": [0], "b.png": [1]})
+    shown = ("a.png", 100, 100, 1.0)
+    _decoded(cache, shown)
+    cache.show(shown)
+    budget.set_position(1)  # Next step's map still decoding; the label keeps showing a.png
+    _decoded(cache, ("b.png", 100, 100, 1.0))
+    assert shown in cache.pixmaps and budget.bytes == 2 * 100 * 100 * 4
+    cache.show(("b.png", 100, 100, 1.0))
+    assert shown not in cache.pixmaps and (POOL, shown) not in budget.entries
+    assert budget.bytes == budget.max_bytes
@@ -0,0 +1,105 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+import mapdiff
+
+
+def _components(mask):
+    """8-connected components by breadth-first search, as sets of cells."""
+    seen = np.zeros_like(mask)
+    components = []
+    for start in zip(*np.nonzero(mask)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = deque([start])
+        cells = set()
+        while queue:
+            y, x = queue.popleft()
+            cells.add((y, x))
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    c = (y + dy, x + dx)
+                    if 0 <= c[0] < mask.shape[0] and 0 <= c[1] < mask.shape[1] and mask[c] and not seen[c]:
+                        seen[c] = True
+                        queue.append(c)
+        components.append(cells)
+    return components
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_label_regions_matches_search(seed):
+    rng = np.random.default_rng(seed)
+    mask = rng.random((rng.integers(1, 40), rng.integers(1, 40))) < rng.random()
+    labels, n = mapdiff.label_regions(mask)
+    components = _components(mask)
+    assert n == len(components)
+    assert (labels[~mask] == 0).all()
+    found = {frozenset(zip(*np.nonzero(labels == k))) for k in range(1, n + 1)}
+    assert found == {frozenset(cells) for cells in components}
+
+
+def test_label_regions_long_spiral():
+    # A single winding region, the worst case for label propagation
+    mask = np.zeros((41, 41), bool)
+    mask[::4, :] = True
+    for k, row in enumerate(range(1, 41, 4)):
+        mask[row:row + 3, -1 if k % 2 == 0 else 0] = True
+    labels, n = mapdiff.label_regions(mask)
+    assert n == 1 and (labels[mask] == 1).all()
+
+
+def test_label_regions_empty():
+    labels, n = mapdiff.label_regions(np.zeros((5, 7), bool))
+    assert n == 0 and not labels.any()
+
+
+@pytest.mark.parametrize("shape", [(37, 50), (64, 64), (5, 90)])
+def test_tile_counts_by_band(shape):
+    rng = np.random.default_rng(shape[0])
+    a = rng.integers(0, 256, (*shape, 4), dtype=np.uint8)
+    b = np.where(rng.random((*shape, 1)) < 0.1, rng.integers(0, 256, (*shape, 4), dtype=np.uint8), a)
+    counts, change, x_sum, y_sum = mapdiff.tile_counts(a, b, tile=16, threshold=24)
+    pixel_change = np.abs(a.astype(int) - b.astype(int)).max(axis=2)
+    changed = pixel_change > 24
+    for row in range(counts.shape[0]):
+        for col in range(counts.shape[1]):
+            cell = np.s_[row * 16:(row + 1) * 16, col * 16:(col + 1) * 16]
+            ys, xs = np.nonzero(changed[cell])
+            assert counts[row, col] == len(xs)
+            assert change[row, col] == pixel_change[cell][changed[cell]].sum()
+            assert (x_sum[row, col], y_sum[row, col]) == ((xs + col * 16).sum(), (ys + row * 16).sum())
+
+
+def test_region_centroid_is_in_pixels():
+    a = np.zeros((64, 64, 4), np.uint8)
+    b = a.copy()
+    b[10:13, 20:41] = 255  # Spans three tiles, off their centres
+    found = mapdiff.regions(*mapdiff.tile_counts(a, b, tile=16), tile=16, min_pixels=1)
+    assert len(found) == 1
+    assert found[0]["centroid"] == [30.5, 11.5]
+    assert found[0]["bbox"] == [16, 0, 48, 16] and found[0]["pixels"] == 63
+
+
+def _touch(folder, *names):
+    folder.mkdir()
+    for name in names:
+        (folder / name).write_bytes(b"")
+    return str(folder)
+
+
+def test_pairs_with_reference_folder(tmp_path):
+    maps = _touch(tmp_path / "maps", "Sofi64_Edited_v1.png", "Sofi64_Edited_v2.png", "Other_Edited_v1.png")
+    speaker = _touch(tmp_path / "speaker", "Sofi64.png", "Sofi64_Edited_v1.png")
+    reference = f"{speaker}/Sofi64.png"
+    assert mapdiff.find_pairs([maps], speaker) == [(reference, f"{maps}/Sofi64_Edited_v1.png"),
+                                                    (reference, f"{maps}/Sofi64_Edited_v2.png")]
+    assert mapdiff.find_pairs([maps]) == [(f"{maps}/Sofi64_Edited_v1.png", f"{maps}/Sofi64_Edited_v2.png")]
+
+
+def test_no_pairs_is_an_error(tmp_path):
+    maps = _touch(tmp_path / "maps", "a_Edited_v1.png", "b_Edited_v1.png")
+    assert mapdiff.main([maps]) == 2
+    assert mapdiff.main([maps, "--reference", _touch(tmp_path / "other", "c.png")]) == 2
@@ -0,0 +1,48 @@
+"""Routes drawn on MapLabel, in map image pixels."""
+import pytest
+
+pytest.importorskip("PyQt6")
+from PyQt6.QtCore import QEvent, QPointF, Qt  # noqa: E402
+from PyQt6.QtGui import QMouseEvent  # noqa: E402
+
+import mainqt  # noqa: E402
+
+
+def _mouse(label, kind, x, y):
+    buttons = Qt.MouseButton.NoButton if kind == QEvent.Type.MouseButtonRelease else Qt.MouseButton.LeftButton
+    point = QPointF(x, y)
+    event = QMouseEvent(kind, point, label.mapToGlobal(point), Qt.MouseButton.LeftButton, buttons,
+                        Qt.KeyboardModifier.NoModifier)
+    {QEvent.Type.MouseButtonPress: label.mousePressEvent, QEvent.Type.MouseMove: label.mouseMoveEvent,
+     QEvent.Type.MouseButtonRelease: label.mouseReleaseEvent}[kind](event)
+
+
+@pytest.fixture
+def label(app):
+    label = mainqt.MapLabel()
+    label.resize(500, 500)
+    label.show()
+    app.processEvents()
+    label.set_map((1000, 1000))
+    strokes = label.strokes_emitted = []
+    label.stroke.connect(strokes.append)
+    yield label
+    label.close()
+
+
+def test_stroke_in_map_pixels(label):
+    _mouse(label, QEvent.Type.MouseButtonPress, 100, 100)
+    _mouse(label, QEvent.Type.MouseMove, 250, 250)
+    _mouse(label, QEvent.Type.MouseButtonRelease, 250, 250)
+    assert [point[:2] for point in label.strokes_emitted[-1]["points"]] == [[200.0, 200.0], [500.0, 500.0]]
+
+
+def test_resize_mid_stroke_keeps_the_old_scale(app, label):
+    _mouse(label, QEvent.Type.MouseButtonPress, 100, 100)
+    _mouse(label, QEvent.Type.MouseMove, 250, 250)
+    label.resize(1000, 800)  # The window grows while the participant is drawing
+    app.processEvents()
+    (stroke,) = label.strokes_emitted
+    assert stroke["final"]
+    assert [point[:2] for point in stroke["points"]] == [[200.0, 200.0], [500.0, 500.0]]
+    assert not label.drawing
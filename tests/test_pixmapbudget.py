@@ -0,0 +1,33 @@
+from pixmapbudget import PixmapBudget
+
+
+def test_far_entries_go_first():
+    budget = PixmapBudget(300)
+    evicted = []
+    budget.add("maps", "near", 100, [1], evicted.append)
+    budget.add("maps", "far", 100, [5], evicted.append)
+    budget.add("maps", "behind", 100, [0], evicted.append)
+    budget.set_position(1)
+    budget.add("pages", "current", 100, [1])
+    assert evicted == ["far"]  # 4 steps ahead, vs the step behind counting 2
+    assert budget.bytes == 300
+
+
+def test_current_step_runs_over_budget():
+    budget = PixmapBudget(100)
+    budget.add("maps", "a", 80, [0])
+    budget.add("maps", "b", 80, [0])
+    assert budget.bytes == 160 and budget.over_budget == 1
+
+
+def test_pinned_entry_stays_counted():
+    budget = PixmapBudget(200)
+    evicted = []
+    budget.add("maps", "shown", 100, [0], evicted.append)
+    budget.pin("maps", "shown")
+    budget.set_position(3)  # The map is still on screen while the next one loads
+    budget.add("maps", "next", 150, [3], evicted.append)
+    assert evicted == [] and budget.bytes == 250 and budget.over_budget == 1
+    assert budget.room([3]) == -50
+    budget.unpin("maps", "shown")
+    assert evicted == ["shown"] and budget.bytes == 150
@@ -0,0 +1,50 @@
+import json
+import random
+
+import pytest
+
+import bitboard
+import replay
+import sizedgrid
+
+
+def _write_game(path, seed=7, moves=200, size=4):
+    """A logged game: game_start, then a key event per arrow key with the boards before/ after."""
+    keys = random.Random(seed + 1)
+    grid = sizedgrid.make_grid(size, seed)
+    events = [{"event": "game_start", "t": 0, "size": size, "seed": seed, "board": grid.board}]
+    for n in range(moves):
+        direction = keys.choice(bitboard.DIRECTIONS)
+        before = grid.board
+        grid.move(direction)
+        events.append({"event": "key", "t": n + 1, "key": direction, "before": before, "after": grid.board,
+                       "spawn": grid.last_spawn, "score": grid.score})
+        events.append({"event": "key", "t": n + 1, "key": "space"})  # Not a move
+    path.write_text("".join(json.dumps(e) + "\n" for e in events))
+    return events
+
+
+@pytest.mark.parametrize("size", [4, 5])
+def test_logged_game_replays(tmp_path, size):
+    path = tmp_path / "session.jsonl"
+    _write_game(path, size=size)
+    result = replay.check(str(path))
+    assert (result.seed, result.moves, result.mismatch, result.error) == (7, 200, None, None)
+    assert replay.main([str(path)]) == 0
+
+
+def test_tampered_board_is_found(tmp_path):
+    path = tmp_path / "session.jsonl"
+    events = _write_game(path)
+    moves = [e for e in events if "before" in e]
+    moves[41]["after"] ^= 1 << 60  # One tile of the board after move 42 changed
+    path.write_text("".join(json.dumps(e) + "\n" for e in events))
+    result = replay.check(str(path))
+    assert (result.mismatch, result.error) == (42, "board differs after this move")
+    assert replay.main([str(path)]) == 1
+
+    events[0]["board"] = moves[0]["after"]
+    path.write_text("".join(json.dumps(e) + "\n" for e in events))
+    assert replay.check(str(path)).error == "start board differs"
+    path.write_text("".join(json.dumps(e) + "\n" for e in events[1:]))
+    assert replay.check(str(path)).seed is None
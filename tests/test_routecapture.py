@@ -0,0 +1,61 @@
+import math
+import random
+
+from routecapture import RouteBuffer, simplify
+
+
+def _distance_to_segment(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    f = 0.0 if not length else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length))
+    return math.hypot(px - ax - f * dx, py - ay - f * dy)
+
+
+def test_buffer_keeps_order_across_wrap_around():
+    buffer = RouteBuffer(capacity=8)
+    samples = [(t, float(t), float(-t)) for t in range(30)]
+    drained = []
+    for t, x, y in samples:
+        if buffer.append(t, x, y):
+            ts, xs, ys = buffer.drain(keep_last=True)
+            drained.append(ts)
+            assert buffer.count == 1 and buffer.last() == (xs[-1], ys[-1])
+    drained.append(buffer.drain()[0])
+    # Each part starts with the last sample of the previous one, so the parts join up
+    joined = drained[0] + [t for part in drained[1:] for t in part[1:]]
+    assert joined == [t for t, _, _ in samples]
+    assert buffer.count == 0
+
+
+def test_buffer_full_after_capacity_samples():
+    buffer = RouteBuffer(capacity=4)
+    assert [buffer.append(t, 0.0, 0.0) for t in range(4)] == [False, False, False, True]
+
+
+def test_simplify_keeps_ends_and_corners():
+    xs = [float(x) for x in range(11)] + [10.0] * 10
+    ys = [0.0] * 11 + [float(y) for y in range(1, 11)]
+    kept = simplify(xs, ys, tolerance=0.5)
+    assert kept == [0, 10, 20]
+
+
+def test_simplify_stays_within_tolerance():
+    rng = random.Random(3)
+    xs, ys = [0.0], [0.0]
+    for _ in range(2000):
+        xs.append(xs[-1] + rng.uniform(-1, 2))
+        ys.append(ys[-1] + rng.uniform(-1, 2))
+    tolerance = 2.0
+    kept = simplify(xs, ys, tolerance)
+    assert kept[0] == 0 and kept[-1] == len(xs) - 1 and kept == sorted(kept)
+    assert len(kept) < len(xs) // 2
+    # The radial pass may drop points up to the tolerance from a kept neighbour, so allow twice it
+    for a, b in zip(kept, kept[1:]):
+        for i in range(a + 1, b):
+            assert _distance_to_segment(xs[i], ys[i], xs[a], ys[a], xs[b], ys[b]) <= 2 * tolerance
+
+
+def test_simplify_short_strokes():
+    assert simplify([], []) == []
+    assert simplify([1.0], [2.0]) == [0]
+    assert simplify([1.0, 5.0], [2.0, 2.0]) == [0, 1]
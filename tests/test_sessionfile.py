@@ -0,0 +1,103 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+import bitboard
+import sessionfile
+import sizedgrid
+
+
+def _session(size=4, moves=500, seed=0):
+    """A session log as MainWindow writes it: SPACE through the pages, then arrow keys on the map trials."""
+    rng = random.Random(seed)
+    grid = sizedgrid.make_grid(size, seed)
+    t = 1_000_000
+    events = [{"event": "session_start", "t": t, "pages": ["welcome", "game"]},
+              {"event": "game_start", "t": t + 1, "size": size, "seed": seed, "board": grid.board}]
+    for step in range(3):
+        t += 10_000_000
+        events.append({"event": "key", "t": t, "key": "space", "auto_repeat": False, "prev_step": step,
+                       "step": step + 1, "prev_page": 0, "page": 1, "map_index": step, "overlay": step == 1})
+        for _ in range(moves // 3):
+            t += rng.randrange(1_000_000, 90_000_000)
+            direction = rng.choice(bitboard.DIRECTIONS)
+            repeat = rng.random() < 0.3
+            event = {"event": "key", "t": t, "key": direction, "input": "applied", "auto_repeat": repeat,
+                     "prev_step": step + 1, "step": step + 1, "prev_page": 1, "page": 1, "map_index": step,
+                     "overlay": step == 1}
+            if repeat and rng.random() < 0.3:
+                event["input"] = "coalesced"
+            else:
+                before = grid.board
+                grid.move(direction)
+                event.update(before=before, after=grid.board, spawn=grid.last_spawn, score=grid.score)
+            events.append(event)
+    events.append({"event": "session_end", "t": t + 1})
+    return events
+
+
+def _keys(events):
+    return [e for e in events if e["event"] == "key"]
+
+
+@pytest.mark.parametrize("codec", sessionfile.CODECS)
+def test_round_trip(tmp_path, codec):
+    events = _session()
+    path = str(tmp_path / "session.lems")
+    sessionfile.write(path, events, codec, chunk_records=64)
+    session = sessionfile.SessionFile(path)
+    keys = _keys(events)
+
+    assert session.count == len(keys)
+    assert list(session.column("t")) == [e["t"] for e in keys]
+    assert list(session.column("map")) == [e["map_index"] for e in keys]
+    flags = session.column("flags")
+    assert list((flags & sessionfile.MOVE) != 0) == ["before" in e for e in keys]
+    assert list((flags & sessionfile.DROPPED) != 0) == [e.get("input", "applied") != "applied" for e in keys]
+    moves = [i for i, e in enumerate(keys) if "before" in e]
+    assert list(session.column("after")[moves]) == [keys[i]["after"] for i in moves]
+    assert list(session.column("score")[moves]) == [keys[i]["score"] for i in moves]
+    assert session.events() == [e for e in events if e["event"] != "key"]
+
+
+def test_trial_reads_only_its_records(tmp_path):
+    events = _session()
+    path = str(tmp_path / "session.lems")
+    sessionfile.write(path, events, chunk_records=50)
+    session = sessionfile.SessionFile(path)
+    t = session.column("t")
+    for index, (_, _, start, stop) in enumerate(session.trials):
+        assert np.array_equal(session.trial(index, ("t",))["t"], t[start:stop])
+
+
+def test_convert_matches_jsonl(tmp_path):
+    events = _session(moves=90)
+    jsonl = tmp_path / "session.jsonl"
+    jsonl.write_text("".join(json.dumps(e) + "\n" for e in events))
+    out = sessionfile.convert(str(jsonl))
+    assert sessionfile.SessionFile(out).count == len(_keys(events))
+
+
+@pytest.mark.parametrize("size", [3, 5, 6, 12])
+def test_round_trip_other_board_sizes(tmp_path, size):
+    events = _session(size=size, moves=240, seed=size)
+    path = str(tmp_path / "session.lems")
+    sessionfile.write(path, events, chunk_records=64)
+    session = sessionfile.SessionFile(path)
+    assert session.size == size
+    keys = _keys(events)
+    cells = session.column("spawn_cell")
+    exponents = session.column("spawn_exponent")
+    for i, event in enumerate(keys):
+        spawn = event.get("spawn")
+        if spawn:
+            assert divmod(int(cells[i]), size) == tuple(spawn[:2])
+            assert 1 << int(exponents[i]) == spawn[2]
+        else:
+            assert cells[i] == -1
+    moves = [i for i, e in enumerate(keys) if "before" in e]
+    stored = size <= 4
+    assert session.footer["boards"] == stored
+    assert list(session.column("after")[moves]) == [keys[i]["after"] if stored else 0 for i in moves]
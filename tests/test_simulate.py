@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+import simulate
+
+
+@pytest.mark.parametrize("name", simulate.POLICY_NAMES)
+def test_play_game_is_fixed_by_its_seed(name):
+    policy = simulate.make_policy(name, depth=1)
+    max_moves = 30 if name == "expectimax" else None
+    games = [simulate.play_game(policy, seed, max_moves) for seed in range(8)]
+    assert games == [simulate.play_game(simulate.make_policy(name, depth=1), seed, max_moves) for seed in range(8)]
+    assert len(set(games)) > 1
+
+
+def _summary(tmp_path, *args):
+    path = tmp_path / "summary.json"
+    simulate.main(["--games", "60", "--policy", "greedy", "--seed", "5", "--output", str(path), *args])
+    summary = json.loads(path.read_text())
+    del summary["seconds"]
+    return summary
+
+
+def test_summary_does_not_depend_on_workers_or_chunks(tmp_path):
+    one = _summary(tmp_path, "--workers", "1")
+    assert one["games"] == 60 and one["seeds"] == [5, 64]
+    assert _summary(tmp_path, "--workers", "3", "--chunk", "7") == one
@@ -0,0 +1,142 @@
+import asyncio
+import socket
+import threading
+import time
+
+import stationsync
+from stationsync import SAMPLES, PING_BURST, SyncStation
+
+OFFSET = 7_000_000  # Coordinator clock ahead of the follower's by 7 ms
+
+
+def _exchange(t0, out_ns, back_ns, hold_ns=50_000):
+    """Ping/pong timestamps (t0, t1, t2, t3) for the given one-way delays."""
+    t1 = t0 + out_ns + OFFSET
+    t2 = t1 + hold_ns
+    return t0, t1, t2, t2 - OFFSET + back_ns
+
+
+def test_symmetric_delay_gives_exact_offset():
+    station = SyncStation(False)
+    station._add_sample(*_exchange(1_000_000, 300_000, 300_000))
+    assert station.offset_ns == OFFSET
+    assert station.delay_ns == 600_000
+
+
+def test_smallest_round_trip_wins():
+    station = SyncStation(False)
+    clocks = []
+    station.on_clock = lambda **fields: clocks.append(fields)
+    # Asymmetric, slow exchanges bias the offset; the quick symmetric one does not
+    station._add_sample(*_exchange(0, 4_000_000, 500_000))
+    station._add_sample(*_exchange(10_000_000, 200_000, 200_000))
+    station._add_sample(*_exchange(20_000_000, 300_000, 3_000_000))
+    assert station.offset_ns == OFFSET
+    assert station.delay_ns == 400_000
+    assert len(clocks) == 3 and clocks[-1]["offset_ns"] == OFFSET
+
+
+def test_old_samples_are_forgotten():
+    station = SyncStation(False)
+    station._add_sample(*_exchange(0, 10_000, 10_000))
+    for k in range(SAMPLES):
+        station._add_sample(*_exchange((k + 1) * 10_000_000, 500_000, 500_000))
+    assert station.delay_ns == 1_000_000
+
+
+def test_connected_after_ping_burst():
+    station = SyncStation(False)
+    for k in range(PING_BURST):
+        assert not station.connected.is_set()
+        station._add_sample(*_exchange(k * 1_000_000, 100_000, 100_000))
+    assert station.connected.is_set()
+
+
+def test_loopback_stations_switch_together():
+    applied = {}
+    lock = threading.Lock()
+
+    def recorder(name):
+        def on_step(step, apply_at):
+            with lock:
+                applied.setdefault(step, {})[name] = apply_at
+        return on_step
+
+    coordinator = SyncStation(True, port=0, on_step=recorder("coordinator")).start()
+    follower = SyncStation(False, port=coordinator.port, on_step=recorder("follower")).start()
+    try:
+        assert follower.connected.wait(5)
+        done = threading.Event()
+        follower.on_step = lambda step, apply_at: (recorder("follower")(step, apply_at), done.set())
+        follower.announce(3)
+        assert done.wait(5)
+    finally:
+        follower.stop()
+        coordinator.stop()
+    # Both stations share one clock here, so their apply times differ only by the offset error
+    assert abs(applied[3]["coordinator"] - applied[3]["follower"]) < 5_000_000
+
+
+def test_unconnected_follower_switches_alone():
+    # Nothing listens on this port, so the follower never connects
+    follower = SyncStation(False, port=1)
+    steps = []
+    errors = []
+    done = threading.Event()
+    follower.on_step = lambda step, apply_at: (steps.append(step), done.set())
+    follower.on_error = lambda **fields: errors.append(fields)
+    follower.start()
+    try:
+        follower.announce(4)
+        assert done.wait(5)
+    finally:
+        follower.stop()
+    assert steps == [4] and follower.step == 4
+    assert errors == [{"error": "not connected", "step": 4}]
+
+
+def _closed(sock):
+    try:
+        return sock.recv(1) == b""
+    except ConnectionResetError:  # Closed with our unread bytes still queued
+        return True
+
+
+def test_coordinator_survives_bad_peers():
+    errors = []
+    coordinator = SyncStation(True, port=0, on_error=lambda **fields: errors.append(fields["error"])).start()
+    try:
+        with socket.create_connection(("127.0.0.1", coordinator.port)) as bad:
+            bad.sendall(b"not json\n[1, 2]\n{\"type\": \"go\"}\n" + b"x" * 200_000 + b"\n")
+            bad.settimeout(5)
+            assert _closed(bad)  # Disconnected after the over-long line
+        applied = threading.Event()
+        coordinator.on_step = lambda step, apply_at: applied.set()
+        follower = SyncStation(False, port=coordinator.port).start()
+        try:
+            assert follower.connected.wait(5)
+            follower.announce(2)
+            assert applied.wait(5)
+        finally:
+            follower.stop()
+    finally:
+        coordinator.stop()
+    assert errors == ["bad message", "bad message", "bad message", "message too long"]
+
+
+def test_stop_while_the_coordinator_host_does_not_answer(monkeypatch):
+    attempts = []
+
+    async def blackholed(host, port):
+        attempts.append(time.monotonic())
+        await asyncio.sleep(3600)  # No SYN-ACK ever comes back
+
+    monkeypatch.setattr(stationsync.asyncio, "open_connection", blackholed)
+    monkeypatch.setattr(stationsync, "CONNECT_TIMEOUT", 0.1)
+    monkeypatch.setattr(stationsync, "RETRY_INTERVAL", 0.05)
+    follower = SyncStation(False, host="192.0.2.1", port=1).start()
+    time.sleep(0.5)
+    assert len(attempts) >= 2  # Timed out and tried again
+    started = time.monotonic()
+    follower.stop()
+    assert time.monotonic() - started < 0.5
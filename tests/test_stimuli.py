@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("PyQt6")
+from PyQt6.QtGui import QImage  # noqa: E402
+
+import stimuli  # noqa: E402
+
+
+def _image(path, width, height, color=0xff336699):
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(color)
+    assert image.save(str(path))
+
+
+@pytest.fixture
+def folder(tmp_path):
+    _image(tmp_path / "a.png", 30, 20)
+    _image(tmp_path / "b.png", 10, 40)
+    stimuli.build(str(tmp_path), {"a.png": {"expected_differences": "3"}})
+    return tmp_path
+
+
+def test_index_has_no_mtimes(folder):
+    with open(stimuli.index_path(str(folder)), encoding="utf-8") as f:
+        entries = json.load(f)["stimuli"]
+    assert [(e["width"], e["height"]) for e in entries] == [(30, 20), (10, 40)]
+    assert not any("mtime_ns" in e for e in entries)
+
+
+def test_touched_files_are_still_fresh(folder):
+    os.utime(folder / "a.png", ns=(1, 1))  # A fresh checkout gives every file a new mtime
+    entries = stimuli.load(str(folder))
+    assert stimuli.stale(str(folder), entries) is None
+    assert stimuli.build(str(folder))[1] == 0
+
+
+def test_added_removed_and_resized_maps_are_stale(folder):
+    entries = stimuli.load(str(folder))
+    _image(folder / "c.png", 5, 5)
+    assert "c.png" in stimuli.stale(str(folder), entries)
+    os.remove(folder / "c.png")
+    os.remove(folder / "b.png")
+    assert "b.png" in stimuli.stale(str(folder), entries)
+    _image(folder / "b.png", 10, 40)
+    _image(folder / "a.png", 300, 200)
+    assert stimuli.stale(str(folder), entries) == f"{folder / 'a.png'} changed size"
+
+
+def test_rebuild_in_memory_keeps_metadata(folder):
+    before = stimuli.index_path(str(folder))
+    with open(before, "rb") as f:
+        index = f.read()
+    _image(folder / "a.png", 300, 200, 0xff000000)
+    entries, changed = stimuli.build(str(folder), write=False)
+    assert changed == 1
+    assert (entries[0]["width"], entries[0]["meta"]) == (300, {"expected_differences": "3"})
+    with open(before, "rb") as f:
+        assert f.read() == index
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """Names of the files read and hashed from now on."""
+    names = []
+    hash_file = stimuli._hash_file
+
+    def counting(path):
+        names.append(os.path.basename(path))
+        return hash_file(path)
+
+    monkeypatch.setattr(stimuli, "_hash_file", counting)
+    return names
+
+
+def test_update_hashes_only_new_or_changed_files(folder, hashed):
+    assert stimuli.build(str(folder))[1] == 0
+    _image(folder / "c.png", 5, 5)
+    os.utime(folder / "a.png", ns=(1, 1))
+    entries, changed = stimuli.build(str(folder))
+    assert changed == 1
+    assert sorted(hashed) == ["a.png", "c.png"]
+    assert entries[0]["meta"] == {"expected_differences": "3"}
+
+
+def test_refresh_reads_headers_and_hashes_later(folder, hashed):
+    entries = stimuli.load(str(folder))
+    _image(folder / "a.png", 300, 200, 0xff000000)
+    _image(folder / "c.png", 5, 5)
+    refreshed, pending = stimuli.refresh(str(folder), entries)
+    assert hashed == []
+    assert pending == [str(folder / "a.png"), str(folder / "c.png")]
+    assert [(e["width"], e["sha256"] is None) for e in refreshed] == [(300, True), (10, False), (5, True)]
+    assert refreshed[0]["meta"] == {"expected_differences": "3"}
+    assert refreshed[1] is entries[1]
+
+    digests = stimuli.hash_files(str(folder), pending)
+    rebuilt, _ = stimuli.build(str(folder), write=False)
+    assert digests == {e["path"]: e["sha256"] for e in rebuilt if e["path"] in pending}
+    assert sorted(hashed) == ["a.png", "c.png"]  # build() reused what hash_files() had just hashed
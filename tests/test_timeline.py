@@ -0,0 +1,44 @@
+import pytest
+
+import timeline
+
+MAPS = ["maps/a.png", "maps/b.png", "maps/c.png", "maps/d.png"]
+
+
+def test_repository_timeline():
+    compiled = timeline.compile(timeline.load(), MAPS)
+    names = [page["name"] for page in compiled.pages]
+    assert compiled.game_page == names.index("game")
+    trials = [i for i, step in enumerate(compiled.steps) if step.map is not None]
+    assert [compiled.steps[i].map for i in trials] == [0, 1, 2, 3]
+    assert [compiled.steps[i].game_visible for i in trials] == [True, False, True, False]
+    assert compiled.steps[trials[0]].assets == (("page", compiled.game_page), ("map", MAPS[0]))
+    # Q from any trial goes back to the step before the block; SPACE on the last step stays there
+    assert {compiled.back[i] for i in trials} == {trials[0] - 1}
+    assert compiled.next[-1] == len(compiled.steps) - 1
+    assert compiled.next[:-1] == list(range(1, len(compiled.steps)))
+
+
+def test_step_assets():
+    spec = {"pages": [{"name": "intro", "image": "intro.png"}, {"name": "game", "game": True}],
+            "steps": [{"page": "intro"}, {"page": "game", "maps": [1]}]}
+    compiled = timeline.compile(spec, MAPS)
+    assert [step.assets for step in compiled.steps] == [(("page", 0),), (("page", 1), ("map", MAPS[1]))]
+
+
+def test_upcoming():
+    compiled = timeline.compile(timeline.load(), MAPS)
+    first_trial = next(i for i, step in enumerate(compiled.steps) if step.map is not None)
+    assert timeline.upcoming(compiled, first_trial, 1) == [first_trial + 1, first_trial - 1]
+    assert timeline.upcoming(compiled, 0, 2) == [1, 2]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"pages": [{"name": "p", "text": "x", "game": True}], "steps": [{"page": "p"}]}, "exactly one"),
+    ({"pages": [{"name": "p", "text": "x"}], "steps": [{"page": "q"}]}, "unknown page"),
+    ({"pages": [{"name": "p", "game": True}], "steps": [{"page": "p", "maps": [4]}]}, "map 4"),
+    ({"pages": [{"name": "p", "text": "x"}], "steps": []}, "no steps"),
+])
+def test_invalid_timelines(spec, message):
+    with pytest.raises(ValueError, match=message):
+        timeline.compile(spec, MAPS)
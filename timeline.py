@@ -0,0 +1,83 @@
+"""Experiment timeline: which pages and map trials the participant goes through.
+
+The timeline is described in timeline.json:
+    "pages": the right-panel pages, in order. Each has a "name" and one of
+        "text" (a text page), "image" (an image scaled to the window) or
+        "game": true (the 2048 game, optionally with a board "size", default 4,
+        a fixed spawn "seed", otherwise every session gets its own, and
+        "animation_ms" for the move animation, 0 for none).
+    "steps": what SPACE walks through. {"page": name} shows a page on its own;
+        {"page": name, "maps": "all" or [map indices], "hide_game": [...]}
+        expands to one map trial per map, shown next to the page, with the
+        game covered by the white overlay on the listed map indices.
+
+compile() turns this into a flat list of steps plus next/back transition
+tables, so navigation is one lookup, and lists the assets every step needs so
+upcoming ones can be preloaded. Q from any trial goes back to the step before
+its block of trials, like the original page chain did.
+
+No Qt dependency.
+"""
+import json
+from collections import namedtuple
+
+TIMELINE_FILE = "timeline.json"
+
+# page: index into Timeline.pages; map: index into the maps list or None;
+# assets: what has to be ready before the step is shown, as ("page", page index)
+# (built once; an image page decodes its image then) and ("map", map file) pairs
+Step = namedtuple("Step", ["page", "map", "game_visible", "assets"])
+Timeline = namedtuple("Timeline", ["pages", "steps", "next", "back", "game_page"])
+
+
+def load(path=TIMELINE_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compile(spec, maps):
+    """Builds the Timeline for spec (as loaded from timeline.json) and the map files."""
+    pages = spec["pages"]
+    page_index = {}
+    game_page = None
+    for i, page in enumerate(pages):
+        if sum(key in page for key in ("text", "image", "game")) != 1:
+            raise ValueError(f"page {page.get('name')!r} needs exactly one of text, image or game")
+        page_index[page["name"]] = i
+        if page.get("game"):
+            game_page = i
+
+    steps = []
+    back = []
+    for entry in spec["steps"]:
+        if entry["page"] not in page_index:
+            raise ValueError(f"unknown page {entry['page']!r} in timeline steps")
+        page = page_index[entry["page"]]
+        previous = max(len(steps) - 1, 0)
+        if "maps" not in entry:
+            steps.append(Step(page, None, True, (("page", page),)))
+            back.append(previous)
+            continue
+        indices = range(len(maps)) if entry["maps"] == "all" else entry["maps"]
+        hidden = set(entry.get("hide_game", ()))
+        for index in indices:
+            if not 0 <= index < len(maps):
+                raise ValueError(f"timeline uses map {index} but there are {len(maps)} maps")
+            steps.append(Step(page, index, index not in hidden, (("page", page), ("map", maps[index]))))
+            back.append(previous)
+    if not steps:
+        raise ValueError("timeline has no steps")
+
+    # SPACE on the last step stays there
+    next_step = [min(i + 1, len(steps) - 1) for i in range(len(steps))]
+    return Timeline(pages, steps, next_step, back, game_page)
+
+
+def upcoming(timeline, step, ahead):
+    """Steps the participant can reach from step within `ahead` key presses."""
+    reachable = []
+    frontier = [step]
+    for _ in range(ahead):
+        frontier = [t for s in frontier for t in (timeline.next[s], timeline.back[s])]
+        reachable.extend(s for s in frontier if s != step and s not in reachable)
+    return reachable